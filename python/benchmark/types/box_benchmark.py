@@ -0,0 +1,117 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Time and memory to materialize the boxes of a batch of annotations.
+
+Usage: python box_benchmark.py [num_boxes] [times]
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+
+from pyspark.sql import Row
+
+from rikai.spark.types.geometry import Box2dType, Box3dType
+from rikai.types import Box2d, Box3d, Point
+
+
+class DictBox2d:
+    """Box2d before it had slots, with a __dict__ and a validated
+    constructor.
+    """
+
+    def __init__(self, xmin: float, ymin: float, xmax: float, ymax: float):
+        assert 0 <= xmin <= xmax
+        assert 0 <= ymin <= ymax
+        self.xmin = float(xmin)
+        self.ymin = float(ymin)
+        self.xmax = float(xmax)
+        self.ymax = float(ymax)
+
+
+def a_random_row():
+    xmin = random.uniform(0, 1)
+    ymin = random.uniform(0, 1)
+    return Row(
+        xmin=xmin,
+        ymin=ymin,
+        xmax=random.uniform(xmin, 1),
+        ymax=random.uniform(ymin, 1),
+    )
+
+
+def a_random_box3d_row():
+    return Row(
+        center=Row(
+            x=random.uniform(-50, 50),
+            y=random.uniform(-50, 50),
+            z=random.uniform(-2, 2),
+        ),
+        length=random.uniform(1, 5),
+        width=random.uniform(1, 3),
+        height=random.uniform(1, 3),
+        heading=random.uniform(-3, 3),
+    )
+
+
+def peak_memory(func) -> int:
+    """Peak memory allocated while running func, in bytes."""
+    tracemalloc.start()
+    try:
+        result = func()  # noqa: F841, keep the objects alive until measured
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(num_boxes: int = 50000, times: int = 10):
+    rows = [a_random_row() for _ in range(num_boxes)]
+    rows3d = [a_random_box3d_row() for _ in range(num_boxes)]
+    box2d_type = Box2dType()
+    box3d_type = Box3dType()
+
+    cases = {
+        "Box2d with __dict__, validated": lambda: [
+            DictBox2d(*row) for row in rows
+        ],
+        "Box2d with __dict__, deserialized by index": lambda: [
+            DictBox2d(*row[:4]) for row in rows
+        ],
+        "Box2d, validated": lambda: [Box2d(*row) for row in rows],
+        "Box2dType.deserialize": lambda: [
+            box2d_type.deserialize(row) for row in rows
+        ],
+        "Box3d, converted": lambda: [
+            Box3d(Point(*row[0]), row[1], row[2], row[3], row[4])
+            for row in rows3d
+        ],
+        "Box3dType.deserialize": lambda: [
+            box3d_type.deserialize(row) for row in rows3d
+        ],
+    }
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=times)
+        print(
+            "{} throughput {:.0f} boxes/second, peak memory {:.1f} MB".format(
+                name,
+                num_boxes * times / seconds,
+                peak_memory(func) / 1024 / 1024,
+            )
+        )
+
+
+if __name__ == "__main__":
+    benchmark(*[int(x) for x in sys.argv[1:]])
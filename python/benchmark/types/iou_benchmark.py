@@ -15,11 +15,13 @@
 import random
 import sys
 import timeit
+import tracemalloc
 from typing import Sequence
 
 import numpy as np
 
 from rikai.types import Box2d
+from rikai.types.geometry import match_boxes, nms, soft_nms
 
 
 def iou_matrix_naive_version(
@@ -42,14 +44,103 @@ def iou_matrix_naive_version(
     return np.asarray(result)
 
 
-def benchmark(list1_len: int, list2_len: int, times: int):
-    def a_random_box2d():
-        x_min = random.uniform(0, 1)
-        y_min = random.uniform(0, 1)
-        x_max = random.uniform(x_min, 1)
-        y_max = random.uniform(y_min, 1)
-        return Box2d(x_min, y_min, x_max, y_max)
+def iou_matrix_untiled_version(
+    boxes1: np.ndarray, boxes2: np.ndarray
+) -> np.ndarray:
+    """The vectorized IoU before tiling, which materializes all the N*M
+    intermediates at once.
+    """
+    row_count = boxes1.shape[0]
+    area1 = Box2d._area(boxes1).reshape(row_count, -1)
+    area2 = Box2d._area(boxes2)
+    xmin = np.maximum(boxes1[:, 0].reshape((row_count, -1)), boxes2[:, 0])
+    ymin = np.maximum(boxes1[:, 1].reshape((row_count, -1)), boxes2[:, 1])
+    xmax = np.minimum(boxes1[:, 2].reshape((row_count, -1)), boxes2[:, 2])
+    ymax = np.minimum(boxes1[:, 3].reshape((row_count, -1)), boxes2[:, 3])
+    inter_area = np.maximum(0, xmax - xmin) * np.maximum(0, ymax - ymin)
+    return inter_area / (area1 + area2 - inter_area)
+
+
+def nms_naive_version(
+    boxes: Sequence[Box2d], scores: Sequence[float], iou_threshold: float
+) -> np.ndarray:
+    kept = []
+    for i in np.argsort(-np.asarray(scores)):
+        if all(boxes[i].iou(boxes[k]) <= iou_threshold for k in kept):
+            kept.append(i)
+    return np.asarray(kept)
+
+
+def a_random_box2d():
+    x_min = random.uniform(0, 1)
+    y_min = random.uniform(0, 1)
+    x_max = random.uniform(x_min, 1)
+    y_max = random.uniform(y_min, 1)
+    return Box2d(x_min, y_min, x_max, y_max)
+
+
+def benchmark_post_processing(list1_len: int, list2_len: int, times: int):
+    """Throughput of NMS and box matching, in boxes per second."""
+    boxes = [a_random_box2d() for _ in range(0, list1_len)]
+    scores = [random.uniform(0, 1) for _ in range(0, list1_len)]
+    ground_truth = [a_random_box2d() for _ in range(0, list2_len)]
 
+    cases = {
+        "naive nms": lambda: nms_naive_version(boxes, scores, 0.5),
+        "nms": lambda: nms(boxes, scores, 0.5),
+        "soft-nms": lambda: soft_nms(boxes, scores),
+        "greedy matching": lambda: match_boxes(
+            ground_truth, boxes, scores=scores
+        ),
+        "hungarian matching": lambda: match_boxes(
+            ground_truth, boxes, method="hungarian"
+        ),
+    }
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=times)
+        print(
+            "{} throughput {:.0f} boxes/second".format(
+                name, list1_len * times / seconds
+            )
+        )
+
+
+def peak_memory(func) -> int:
+    """Peak memory allocated while running func, in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_memory(list1_len: int, list2_len: int):
+    """Peak memory of the IoU variants over N*M box pairs."""
+    boxes1 = Box2d._to_array([a_random_box2d() for _ in range(list1_len)])
+    boxes2 = Box2d._to_array([a_random_box2d() for _ in range(list2_len)])
+    out = np.empty((list1_len, list2_len), dtype=np.float32)
+
+    cases = {
+        "untiled ious": lambda: iou_matrix_untiled_version(boxes1, boxes2),
+        "tiled ious": lambda: Box2d.ious(boxes1, boxes2),
+        "tiled ious, float32 out=": lambda: Box2d.ious(
+            boxes1, boxes2, out=out
+        ),
+        "iou_pairs(threshold=0.5)": lambda: Box2d.iou_pairs(
+            boxes1, boxes2, threshold=0.5
+        ),
+        "iou_pairs(topk=5)": lambda: Box2d.iou_pairs(boxes1, boxes2, topk=5),
+    }
+    for name, func in cases.items():
+        print(
+            "{} peak memory {:.1f} MB".format(
+                name, peak_memory(func) / 1024 / 1024
+            )
+        )
+
+
+def benchmark(list1_len: int, list2_len: int, times: int):
     list1 = [a_random_box2d() for _ in range(0, list1_len)]
     list2 = [a_random_box2d() for _ in range(0, list2_len)]
 
@@ -64,6 +155,9 @@ def benchmark(list1_len: int, list2_len: int, times: int):
     print("vectorized method cost {} seconds".format(vectorized_seconds))
     print("naive/vectorized {}".format(naive_seconds / vectorized_seconds))
 
+    benchmark_post_processing(list1_len, list2_len, times)
+    benchmark_memory(list1_len, list2_len)
+
 
 if __name__ == "__main__":
     benchmark(*[int(x) for x in sys.argv[1:]])
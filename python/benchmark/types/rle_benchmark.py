@@ -0,0 +1,73 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sys
+import timeit
+from typing import Tuple
+
+import numpy as np
+
+from rikai.types import rle
+
+
+def decode_naive_version(
+    counts: np.ndarray, shape: Tuple[int, int], order: str = "C"
+) -> np.ndarray:
+    val = 0
+    start_idx = 0
+    arr = np.full(np.sum(counts), 0, dtype=np.uint8)
+    for length in counts:
+        arr[start_idx : start_idx + length] = val
+        start_idx += length
+        val = 1 - val
+    return arr.reshape(shape, order=order)
+
+
+def a_random_mask(height: int, width: int) -> np.ndarray:
+    """A mask of a few random rectangles, with realistic run lengths."""
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(5):
+        y, x = np.random.randint(0, height), np.random.randint(0, width)
+        mask[y : y + height // 4, x : x + width // 4] = 1
+    return mask
+
+
+def benchmark(mask_count: int, height: int, width: int, times: int):
+    masks = [a_random_mask(height, width) for _ in range(mask_count)]
+    rles = [rle.encode(m, order="F") for m in masks]
+    out = np.empty((mask_count, height, width), dtype=np.uint8)
+
+    cases = {
+        "naive decode": lambda: [
+            decode_naive_version(r, (height, width), "F") for r in rles
+        ],
+        "vectorized decode": lambda: [
+            rle.decode(r, (height, width), "F") for r in rles
+        ],
+        "batch decode": lambda: rle.decode_batch(
+            rles, (height, width), "F", out=out
+        ),
+        "encode": lambda: [rle.encode(m, order="F") for m in masks],
+    }
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=times)
+        print(
+            "{} throughput {:.0f} masks/second".format(
+                name, mask_count * times / seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    benchmark(*[int(x) for x in sys.argv[1:]])
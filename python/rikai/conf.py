@@ -55,6 +55,23 @@ CONF_RIKAI_IMAGE_DEFAULT_FORMAT = "rikai.image.default.format"
 DEFAULT_IMAGE_DEFAULT_FORMAT = "PNG"
 register_option(CONF_RIKAI_IMAGE_DEFAULT_FORMAT, DEFAULT_IMAGE_DEFAULT_FORMAT)
 
+# Name of the default encoder profile, see rikai.types.vision.ENCODER_PROFILES
+CONF_RIKAI_IMAGE_DEFAULT_PROFILE = "rikai.image.default.profile"
+DEFAULT_IMAGE_DEFAULT_PROFILE = None
+register_option(
+    CONF_RIKAI_IMAGE_DEFAULT_PROFILE, DEFAULT_IMAGE_DEFAULT_PROFILE
+)
+
+# Byte budget of the process-level decoded image cache. 0 disables the cache.
+CONF_RIKAI_IMAGE_CACHE_SIZE = "rikai.image.cache.size"
+DEFAULT_RIKAI_IMAGE_CACHE_SIZE = 0
+register_option(CONF_RIKAI_IMAGE_CACHE_SIZE, DEFAULT_RIKAI_IMAGE_CACHE_SIZE)
+
+# Byte budget of the cache of deduplicated blobs, see rikai.parquet.blobs.
+CONF_RIKAI_BLOB_CACHE_SIZE = "rikai.blob.cache.size"
+DEFAULT_RIKAI_BLOB_CACHE_SIZE = 64 * 1024 * 1024
+register_option(CONF_RIKAI_BLOB_CACHE_SIZE, DEFAULT_RIKAI_BLOB_CACHE_SIZE)
+
 CONF_RIKAI_IO_HTTP_AGENT = "rikai.io.http_agent"
 DEFAULT_RIKAI_IO_HTTP_AGENT = f"rikai/{_rikai_version}"
 register_option(CONF_RIKAI_IO_HTTP_AGENT, DEFAULT_RIKAI_IO_HTTP_AGENT)
@@ -62,3 +79,12 @@ register_option(CONF_RIKAI_IO_HTTP_AGENT, DEFAULT_RIKAI_IO_HTTP_AGENT)
 CONF_RIKAI_VIZ_COLOR = "rikai.viz.color"
 DEFAULT_RIKAI_VIZ_COLOR = "red"
 register_option(CONF_RIKAI_VIZ_COLOR, DEFAULT_RIKAI_VIZ_COLOR)
+
+CONF_RIKAI_IO_MEMORY_MAP = "rikai.io.memory_map"
+DEFAULT_RIKAI_IO_MEMORY_MAP = False
+register_option(CONF_RIKAI_IO_MEMORY_MAP, DEFAULT_RIKAI_IO_MEMORY_MAP)
+
+# Rasterizer of polygon masks, "pil" or "scanline", see rikai.types.polygon.
+CONF_RIKAI_MASK_RASTERIZER = "rikai.mask.rasterizer"
+DEFAULT_RIKAI_MASK_RASTERIZER = "pil"
+register_option(CONF_RIKAI_MASK_RASTERIZER, DEFAULT_RIKAI_MASK_RASTERIZER)
@@ -0,0 +1,102 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Read Arrow struct arrays, i.e., the storage of UDT columns, one field at a
+time instead of one row at a time.
+"""
+
+from itertools import compress
+from typing import Any, Callable, Collection, List, Union
+
+import pyarrow as pa
+
+__all__ = ["struct_columns", "deserialize_struct"]
+
+
+def _list_views(array: pa.ListArray) -> list:
+    """Numpy views of the values of each list, or None for the null lists."""
+    values = array.values.to_numpy(zero_copy_only=False)
+    offsets = array.offsets.to_numpy()
+    views = [
+        values[start:end]
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    if array.null_count:
+        valid = array.is_valid().to_pylist()
+        views = [view if ok else None for view, ok in zip(views, valid)]
+    return views
+
+
+def _to_list(array: pa.Array) -> list:
+    if array.null_count == 0 and (
+        pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+    ):
+        # Much faster than to_pylist() for primitive values.
+        return array.to_numpy().tolist()
+    return array.to_pylist()
+
+
+def struct_columns(
+    array: pa.StructArray, views: Collection[str] = ()
+) -> List[list]:
+    """The Python values of each field of a struct array.
+
+    Parameters
+    ----------
+    array : pa.StructArray
+        The struct array.
+    views : Collection[str]
+        The list fields of primitive values to read as numpy views of the
+        Arrow buffer instead of Python lists.
+    """
+    columns = []
+    for idx, field in enumerate(array.type):
+        if field.name in views:
+            columns.append(_list_views(array.field(idx)))
+        else:
+            columns.append(_to_list(array.field(idx)))
+    return columns
+
+
+def deserialize_struct(
+    array: Union[pa.StructArray, pa.ChunkedArray],
+    deserialize: Callable[[tuple], Any],
+    views: Collection[str] = (),
+) -> list:
+    """Deserialize each row of a struct array from the tuple of its field
+    values. Null rows are deserialized to None.
+
+    Parameters
+    ----------
+    array : pa.StructArray or pa.ChunkedArray
+        The struct array.
+    deserialize : Callable[[tuple], Any]
+        Deserialize one row, i.e., ``UserDefinedType.deserialize``.
+    views : Collection[str]
+        See :py:func:`struct_columns`.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        return [
+            value
+            for chunk in array.chunks
+            for value in deserialize_struct(chunk, deserialize, views)
+        ]
+    rows = zip(*struct_columns(array, views))
+    if array.null_count == 0:
+        return [deserialize(row) for row in rows]
+    valid = array.is_valid().to_pylist()
+    result = [None] * len(array)
+    for idx, row in compress(enumerate(rows), valid):
+        result[idx] = deserialize(row)
+    return result
@@ -0,0 +1,95 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""In-process caches."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Union
+
+__all__ = ["LRUCache"]
+
+
+class LRUCache:
+    """A thread-safe LRU cache bounded by the total size (in bytes) of
+    the cached values.
+
+    Parameters
+    ----------
+    capacity : int or Callable[[], int]
+        The byte budget of the cache. It can be a callable, which is
+        evaluated on every access, so that the budget can follow a config
+        option. A non-positive capacity disables the cache.
+    """
+
+    def __init__(self, capacity: Union[int, Callable[[], int]]):
+        self._capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        if callable(self._capacity):
+            return int(self._capacity())
+        return int(self._capacity)
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes of the cached values."""
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value of the key, or None if it is missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        """Cache a value that occupies ``nbytes``.
+
+        Values larger than the whole budget are not cached.
+        """
+        capacity = self.capacity
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            if nbytes <= capacity:
+                self._entries[key] = (value, nbytes)
+                self._nbytes += nbytes
+            self._evict(capacity)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _evict(self, capacity: int) -> None:
+        while self._nbytes > capacity and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
@@ -14,6 +14,8 @@
 
 # Standard
 import functools
+import mmap
+import re
 import shutil
 from io import BytesIO
 from os.path import basename, join
@@ -29,7 +31,17 @@ from pyarrow import fs
 import rikai.conf
 from rikai.logging import logger
 
-__all__ = ["copy", "open_uri", "open_output_stream", "exists"]
+__all__ = [
+    "copy",
+    "open_uri",
+    "open_output_stream",
+    "exists",
+    "read_range",
+    "range_uri",
+]
+
+# URI fragment of a byte range, i.e., "pack.bin#offset=100&length=20".
+_RANGE_FRAGMENT = re.compile(r"#offset=(\d+)&length=(\d+)$")
 
 
 def _normalize_uri(uri: str) -> str:
@@ -49,6 +61,27 @@ def _normalize_uri(uri: str) -> str:
     ).geturl()
 
 
+def range_uri(uri: str, offset: int, length: int) -> str:
+    """The URI of ``length`` bytes from ``offset`` of an object.
+
+    Range URIs are understood by all the read functions in this module,
+    which only transfer the bytes in the range.
+    """
+    return f"{uri}#offset={offset}&length={length}"
+
+
+def _parse_range_uri(uri: str) -> Optional[Tuple[str, int, int]]:
+    """Returns ``(uri, offset, length)`` of a range URI, or None."""
+    matched = _RANGE_FRAGMENT.search(uri)
+    if matched is None:
+        return None
+    return (
+        uri[: matched.start()],
+        int(matched.group(1)),
+        int(matched.group(2)),
+    )
+
+
 @functools.lru_cache(maxsize=1)
 def _gcsfs(project="", token=None, block_size=None) -> "GCSFileSystem":
     try:
@@ -62,16 +95,53 @@ def _gcsfs(project="", token=None, block_size=None) -> "GCSFileSystem":
     )
 
 
+def _use_memory_map() -> bool:
+    return bool(rikai.conf.get_option(rikai.conf.CONF_RIKAI_IO_MEMORY_MAP))
+
+
+def _filesystem_from_uri(uri: str) -> Tuple[fs.FileSystem, str]:
+    """Resolve the pyarrow filesystem of a URI.
+
+    Local files are memory-mapped if ``rikai.io.memory_map`` is enabled,
+    so that pyarrow can read parquet pages without copying them.
+    """
+    filesystem, path = fs.FileSystem.from_uri(uri)
+    if isinstance(filesystem, fs.LocalFileSystem) and _use_memory_map():
+        filesystem = fs.LocalFileSystem(use_mmap=True)
+    return filesystem, path
+
+
+def _mmap_local_file(path: str) -> BinaryIO:
+    """Open a local file as a read-only :py:class:`mmap.mmap`."""
+    with open(path, mode="rb") as fobj:
+        try:
+            return mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be memory-mapped.
+            return BytesIO()
+
+
 def open_input_stream(uri: str) -> BinaryIO:
     """Open a URI and returns the content as a File Object."""
     parsed = urlparse(uri)
     if parsed.scheme == "gs":
         return _gcsfs().open(uri)
     else:
-        filesystem, path = fs.FileSystem.from_uri(uri)
+        filesystem, path = _filesystem_from_uri(uri)
         return filesystem.open_input_file(path)
 
 
+def _create_parent_dir(uri: str) -> None:
+    """Create the parent directory of a file to write, if it is on a local
+    filesystem. Object stores have no directories to create.
+    """
+    if urlparse(uri).scheme == "gs":
+        return
+    filesystem, path = fs.FileSystem.from_uri(uri)
+    if isinstance(filesystem, fs.LocalFileSystem):
+        filesystem.create_dir(path.rsplit("/", 1)[0], recursive=True)
+
+
 def open_output_stream(uri: str) -> BinaryIO:
     parsed = urlparse(uri)
     if parsed.scheme == "gs":
@@ -99,6 +169,9 @@ def copy(source: str, dest: str) -> str:
     str
         Return the URI of destination.
     """
+    byte_range = _parse_range_uri(source)
+    if byte_range is not None:
+        source, offset, length = byte_range
     source = _normalize_uri(source)
     dest = _normalize_uri(dest)
     parsed_source = urlparse(source)
@@ -107,6 +180,11 @@ def copy(source: str, dest: str) -> str:
     parsed_dest = urlparse(dest)
     logger.debug("Copying %s to %s", source, dest)
 
+    if byte_range is not None:
+        with open_output_stream(dest) as out_stream:
+            out_stream.write(read_range(source, offset, length))
+        return dest
+
     if parsed_dest.scheme == parsed_source.scheme:
         # Direct copy with the same file system
         scheme = parsed_dest.scheme
@@ -157,12 +235,26 @@ def open_uri(
     ------
     File
         A file-like object for sequential read.
+
+    Notes
+    -----
+    If ``rikai.io.memory_map`` is enabled, local files opened in ``rb`` mode
+    are memory-mapped instead of being read through buffered I/O.
     """
     if isinstance(uri, Path):
         return uri.open()
+    byte_range = _parse_range_uri(uri)
+    if byte_range is not None:
+        return BytesIO(
+            read_range(
+                *byte_range, http_auth=http_auth, http_headers=http_headers
+            )
+        )
     parsed_uri = urlparse(uri)
     if not parsed_uri.scheme:
         # This is a local file
+        if mode == "rb" and _use_memory_map():
+            return _mmap_local_file(uri)
         return open(uri, mode=mode)
     elif parsed_uri.scheme in ("http", "https"):
         if http_headers is None:
@@ -176,10 +268,63 @@ def open_uri(
     elif parsed_uri.scheme == "gs":
         return _gcsfs().open(uri, mode=mode)
     else:
-        filesystem, path = fs.FileSystem.from_uri(uri)
+        filesystem, path = _filesystem_from_uri(uri)
         return filesystem.open_input_file(path)
 
 
+def read_range(
+    uri: str,
+    offset: int,
+    length: int,
+    http_auth: Optional[Union[requests.auth.AuthBase, Tuple[str, str]]] = None,
+    http_headers: Optional[Dict] = None,
+) -> bytes:
+    """Read at most ``length`` bytes from ``offset`` of a URI.
+
+    Http(s) URIs are read via a ``Range`` request, and other URIs via a
+    random-access file, so that only the requested range is transferred.
+
+    Parameters
+    ----------
+    uri : str
+        URI of the object
+    offset : int
+        The offset to start reading from.
+    length : int
+        The max number of bytes to read.
+    http_auth : requests.auth.AuthBase or a tuple of (user, pass), optional
+        Http credentials / auth provider when downloading via http(s)
+        protocols.
+    http_headers : Dict, optional
+        Http headers.
+    """
+    byte_range = _parse_range_uri(uri)
+    if byte_range is not None:
+        # Read within the range.
+        uri, start, size = byte_range
+        offset = start + min(offset, size)
+        length = max(0, min(length, start + size - offset))
+        if length == 0:
+            return b""
+    parsed_uri = urlparse(uri)
+    if parsed_uri.scheme in ("http", "https"):
+        http_headers = dict(http_headers) if http_headers else {}
+        if "User-Agent" not in http_headers:
+            http_headers["User-Agent"] = rikai.conf.get_option(
+                rikai.conf.CONF_RIKAI_IO_HTTP_AGENT
+            )
+        http_headers["Range"] = f"bytes={offset}-{offset + length - 1}"
+        resp = requests.get(uri, auth=http_auth, headers=http_headers)
+        resp.raise_for_status()
+        if resp.status_code == 206:
+            return resp.content
+        # The server does not support range requests.
+        return resp.content[offset : offset + length]
+    with open_uri(uri) as fobj:
+        fobj.seek(offset)
+        return fobj.read(length)
+
+
 def exists(
     uri: Union[str, Path],
     http_auth: Optional[Union[requests.auth.AuthBase, Tuple[str, str]]] = None,
@@ -188,6 +333,9 @@ def exists(
     """Returns True if the URI/file exists."""
     if isinstance(uri, Path):
         return uri.exists()
+    byte_range = _parse_range_uri(uri)
+    if byte_range is not None:
+        uri = byte_range[0]
     parsed_uri = urlparse(uri)
     if parsed_uri.scheme in ("http", "https"):
         if http_headers is None:
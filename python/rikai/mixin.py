@@ -41,6 +41,8 @@ __all__ = [
 class ToNumpy(ABC):
     """ToNumpy Mixin."""
 
+    __slots__ = ()
+
     @abstractmethod
     def to_numpy(self) -> np.ndarray:
         """Returns the content as a numpy ndarray."""
@@ -49,6 +51,8 @@ class ToNumpy(ABC):
 class ToPIL(ABC):
     """ToPIL Mixin."""
 
+    __slots__ = ()
+
     @abstractmethod
     def to_pil(self) -> "PIL.Image.Image":
         pass
@@ -57,6 +61,8 @@ class ToPIL(ABC):
 class ToDict(ABC):
     """ToDict Mixin"""
 
+    __slots__ = ()
+
     @abstractmethod
     def to_dict(self) -> dict:
         pass
@@ -65,6 +71,8 @@ class ToDict(ABC):
 class Displayable(ABC):
     """Mixin for notebook viz"""
 
+    __slots__ = ()
+
     @abstractmethod
     def display(self, **kwargs) -> "IPython.display.DisplayObject":
         """Return an IPython.display.DisplayObject"""
@@ -73,6 +81,8 @@ class Displayable(ABC):
 class Drawable(ABC):
     """Mixin for a class that is drawable"""
 
+    __slots__ = ()
+
     @abstractmethod
     def _render(self, render: "rikai.viz.Renderer", **kwargs) -> None:
         """Render the object using render."""
@@ -31,6 +31,9 @@ automatically converted into the appropriate format, i.e.,
 
 """
 
+# Standard
+from typing import NamedTuple, Tuple
+
 # Third Party
 import numpy as np
 
@@ -52,6 +55,21 @@ class ndarray(np.ndarray, ToNumpy):  # pylint: disable=invalid-name
         return np.copy(self)
 
 
+class ArrayRef(NamedTuple):
+    """A reference to the bytes of an array that are stored out of line,
+    i.e., in a pack file of the dataset.
+
+    It is only used to write an array. The referenced bytes are read back as
+    :py:class:`ndarray`.
+    """
+
+    dtype: str
+    shape: Tuple[int, ...]
+    uri: str
+
+    __UDT__ = NDArrayType()
+
+
 def view(data: np.ndarray) -> np.ndarray:
     """Create a Spark/Parquet compatible view for a numpy array.
 
@@ -0,0 +1,177 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Blobs stored out of the rows of a Rikai dataset.
+
+When a dataset is written with deduplication enabled, each distinct embedded
+blob is stored once in the ``_rikai/blobs`` side table, with the schema
+``(hash: string, data: binary)``. The rows of the dataset reference a blob by
+its content hash, i.e., ``Image(uri="blob:<sha1>")``.
+
+Large blobs can also be appended to the pack files in ``_rikai/packs``. The
+rows then reference a blob by a range URI of its pack file, i.e.,
+``Image(uri="s3://bucket/dataset/_rikai/packs/<id>.pack#offset=0&length=1024")``,
+which is read on demand. As these URIs are absolute, a dataset with pack
+files must be read from the location it was written to.
+"""  # noqa: E501
+
+import hashlib
+import os
+from typing import BinaryIO, Dict, Optional, Tuple
+
+import pyarrow.parquet as pq
+
+from rikai.conf import CONF_RIKAI_BLOB_CACHE_SIZE, get_option
+from rikai.internal.cache import LRUCache
+from rikai.io import (
+    _create_parent_dir,
+    open_input_stream,
+    open_output_stream,
+    range_uri,
+)
+from rikai.parquet.resolver import DefaultResolver
+
+__all__ = [
+    "BlobPacker",
+    "BlobStore",
+    "blob_uri",
+    "content_hash",
+    "parse_blob_uri",
+]
+
+BLOB_URI_SCHEME = "blob"
+BLOB_DIR = os.path.join("_rikai", "blobs")
+PACK_DIR = os.path.join("_rikai", "packs")
+
+
+def content_hash(data: bytes) -> str:
+    """The content hash of a blob."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def blob_uri(digest: str) -> str:
+    """The URI that references a blob by its content hash."""
+    return f"{BLOB_URI_SCHEME}:{digest}"
+
+
+def parse_blob_uri(uri: Optional[str]) -> Optional[str]:
+    """Returns the content hash of a blob URI, or None if it is not one."""
+    if uri is None or not uri.startswith(BLOB_URI_SCHEME + ":"):
+        return None
+    return uri[len(BLOB_URI_SCHEME) + 1 :]
+
+
+class BlobStore:
+    """Read access to the blob side table of a dataset.
+
+    The hash column of the side table is loaded on first access to locate
+    the row group of each blob. Blobs are then read one row group at a time,
+    and kept in a LRU cache bounded by ``rikai.blob.cache.size`` bytes.
+
+    Parameters
+    ----------
+    uri : str
+        The URI of the dataset.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = os.path.join(uri, BLOB_DIR)
+        self._index: Optional[Dict[str, Tuple[str, int]]] = None
+        self._cache = LRUCache(lambda: get_option(CONF_RIKAI_BLOB_CACHE_SIZE))
+
+    def __repr__(self) -> str:
+        return f"BlobStore({self.uri})"
+
+    def _build_index(self) -> Dict[str, Tuple[str, int]]:
+        index = {}
+        for file_uri in sorted(DefaultResolver().resolve(self.uri)):
+            with open_input_stream(file_uri) as fobj:
+                parquet = pq.ParquetFile(fobj)
+                for group_idx in range(parquet.num_row_groups):
+                    hashes = parquet.read_row_group(
+                        group_idx, columns=["hash"]
+                    ).column("hash")
+                    for digest in hashes.to_pylist():
+                        index[digest] = (file_uri, group_idx)
+        return index
+
+    def get(self, digest: str) -> bytes:
+        """Read the blob of a content hash.
+
+        Raises
+        ------
+        KeyError
+            If the blob does not exist.
+        """
+        data = self._cache.get(digest)
+        if data is not None:
+            return data
+
+        if self._index is None:
+            self._index = self._build_index()
+        file_uri, group_idx = self._index[digest]
+        with open_input_stream(file_uri) as fobj:
+            row_group = pq.ParquetFile(fobj).read_row_group(group_idx)
+        # Blobs in the same row group are likely to be read together.
+        for key, blob in zip(
+            row_group.column("hash").to_pylist(),
+            row_group.column("data").to_pylist(),
+        ):
+            if key == digest:
+                data = blob
+            self._cache.put(key, blob, len(blob))
+        return data
+
+
+class BlobPacker:
+    """Append blobs to a pack file.
+
+    The pack file is only created once the first blob is appended.
+
+    Parameters
+    ----------
+    uri : str
+        The URI of the pack file.
+
+    Example
+    -------
+    >>> with BlobPacker("s3://bucket/dataset/_rikai/packs/0.pack") as packer:
+    ...     image = Image(packer.append(data))
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self._stream: Optional[BinaryIO] = None
+        self._offset = 0
+
+    def __enter__(self) -> "BlobPacker":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def append(self, data: bytes) -> str:
+        """Append a blob, and return the range URI to read it back."""
+        if self._stream is None:
+            _create_parent_dir(self.uri)
+            self._stream = open_output_stream(self.uri)
+        self._stream.write(data)
+        uri = range_uri(self.uri, self._offset, len(data))
+        self._offset += len(data)
+        return uri
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
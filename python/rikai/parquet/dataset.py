@@ -19,29 +19,38 @@
 import importlib
 import json
 import os
-from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, Optional, Union
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
 # Third Party
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
-from pyarrow import fs
 from pyspark.ml.linalg import Matrix, Vector
 from pyspark.sql import Row
 from pyspark.sql.types import UserDefinedType
 
 # Rikai
 from rikai.exceptions import ColumnNotFoundError
-from rikai.io import exists, open_input_stream, open_uri
+from rikai.io import (
+    _filesystem_from_uri,
+    exists,
+    open_input_stream,
+    open_uri,
+)
 from rikai.logging import logger
 from rikai.mixin import ToNumpy, ToPIL
+from rikai.parquet.blobs import BlobStore, parse_blob_uri
 from rikai.parquet.resolver import Resolver
+from rikai.types.geometry import Box2dArray, Box2dIndex
+from rikai.types.vision import Image
 
 __all__ = ["Dataset"]
 
+INDEX_DIR = os.path.join("_rikai", "index")
+
 
 class Dataset:
     """Rikai Dataset.
@@ -73,6 +82,9 @@ class Dataset:
 
     Notes
     -----
+    - Images of a dataset written with ``dedup_images=True`` (see
+      :py:func:`rikai.spark.utils.df_to_rikai`) are resolved from the blob
+      side table transparently.
     - Typically user should not directly use this class. Instead, users are
       encouraged to use framework-native readers, for example, using
       :py:class:`rikai.pytorch.data.Dataset` in
@@ -114,6 +126,7 @@ class Dataset:
             logger.info("Loading parquet files: %s", self.files)
 
         self.spark_row_metadata = Resolver.get_schema(self.uri)
+        self._blobs = BlobStore(self.uri)
 
         if columns:
             # TODO: check nested columns
@@ -143,6 +156,54 @@ class Dataset:
         with open_uri(metadata_path) as fobj:
             return json.load(fobj)
 
+    def _box_index_uri(self, column: str) -> str:
+        return os.path.join(self.uri, INDEX_DIR, f"{column}.npz")
+
+    def build_box_index(
+        self, column: str, node_capacity: int = 16
+    ) -> Box2dIndex:
+        """Build a spatial index over a :py:class:`~rikai.types.Box2d`
+        column, and save it into the ``_rikai`` directory of the dataset.
+
+        The ids of the index are the positions of the rows in the dataset,
+        ignoring ``offset``, ``rank`` and ``world_size``. Null boxes are
+        not indexed.
+
+        Parameters
+        ----------
+        column : str
+            A top-level Box2d column.
+        node_capacity : int, default 16
+            The max number of children of a tree node.
+
+        Return
+        ------
+        Box2dIndex
+        """
+        self._check_column(column, self.spark_row_metadata)
+        boxes, ids = [], []
+        row_count = 0
+        for file_uri in self.files:
+            with open_input_stream(file_uri) as fobj:
+                chunks = pq.read_table(fobj, columns=[column]).column(column)
+            valid = chunks.is_valid().to_numpy(zero_copy_only=False)
+            boxes.append(Box2dArray.from_arrow(chunks).to_numpy()[valid])
+            ids.append(row_count + np.flatnonzero(valid))
+            row_count += len(chunks)
+        index = Box2dIndex(
+            np.concatenate(boxes) if boxes else np.zeros((0, 4)),
+            ids=np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64),
+            node_capacity=node_capacity,
+        )
+        index.save(self._box_index_uri(column))
+        return index
+
+    def box_index(self, column: str) -> Box2dIndex:
+        """Load the spatial index of a Box2d column, built by
+        :py:meth:`build_box_index`.
+        """
+        return Box2dIndex.load(self._box_index_uri(column))
+
     @classmethod
     def _find_udt(cls, pyclass: str) -> UserDefinedType:
         """Find UDT class specified by the python class path."""
@@ -163,45 +224,86 @@ class Dataset:
         cls._UDT_CACHE[pyclass] = udt_class()
         return cls._UDT_CACHE[pyclass]
 
-    def _convert(
-        self, raw_row: Dict[str, Any], schema: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Convert Spark UDT to native rikai or numpy types.
+    def _convert_column(
+        self, array: Union[pa.Array, pa.ChunkedArray], field_type: Any
+    ) -> list:
+        """Convert an Arrow column into native rikai or numpy types.
+
+        UDT columns are deserialized a column at a time by the
+        ``deserialize_arrow`` method of the UDT, if it has one, including
+        the UDTs nested in arrays and structs.
 
         Parameters
         ----------
-        raw_row : Dict[str, Any]
-        schema : Dict[str, Any]
-            Spark schema in the JSON format
+        array : pa.Array or pa.ChunkedArray
+        field_type : str or Dict[str, Any]
+            Spark data type in the JSON format
         """
-        assert schema["type"] == "struct"
-        converted = {}
-        for field in schema["fields"]:
+        if isinstance(array, pa.ChunkedArray):
+            return [
+                value
+                for chunk in array.chunks
+                for value in self._convert_column(chunk, field_type)
+            ]
+        if not isinstance(field_type, dict):
+            return array.to_pylist()
+        elif field_type["type"] == "udt":
+            udt = self._find_udt(field_type["pyClass"])
+            if hasattr(udt, "deserialize_arrow"):
+                values = udt.deserialize_arrow(array)
+            else:
+                values = [
+                    _convert_udt_value(value, udt)
+                    for value in array.to_pylist()
+                ]
+            return [self._resolve_blob(value) for value in values]
+        elif field_type["type"] == "array" and isinstance(
+            field_type["elementType"], dict
+        ):
+            offsets = array.offsets.to_numpy().tolist()
+            first = offsets[0]
+            elements = self._convert_column(
+                array.values.slice(first, offsets[-1] - first),
+                field_type["elementType"],
+            )
+            return [
+                elements[start - first : end - first] if valid else None
+                for start, end, valid in zip(
+                    offsets[:-1], offsets[1:], array.is_valid().to_pylist()
+                )
+            ]
+        elif field_type["type"] == "struct":
+            names = [
+                f["name"]
+                for f in field_type["fields"]
+                if array.type.get_field_index(f["name"]) >= 0
+            ]
+            columns = [
+                self._convert_column(array.field(f["name"]), f["type"])
+                for f in field_type["fields"]
+                if f["name"] in names
+            ]
+            return [
+                dict(zip(names, values)) if valid else None
+                for values, valid in zip(
+                    zip(*columns), array.is_valid().to_pylist()
+                )
+            ]
+        return array.to_pylist()
+
+    def _convert_batch(self, batch: pa.RecordBatch) -> List[Dict[str, Any]]:
+        """Convert a batch of rows, one column at a time."""
+        names, columns = [], []
+        for field in self.spark_row_metadata["fields"]:
             name = field["name"]
-            if name not in raw_row:
+            if name not in batch.schema.names:
                 # This column is not selected, skip
                 continue
-            field_type = field["type"]
-            if not isinstance(field_type, dict):
-                converted[name] = raw_row[name]
-            elif field_type["type"] == "udt":
-                udt = self._find_udt(field_type["pyClass"])
-                converted[name] = _convert_udt_value(raw_row[name], udt)
-            elif field_type["type"] == "array" and isinstance(
-                field_type["elementType"], dict
-            ):
-                converted[name] = self._convert_array(
-                    raw_row[name], field_type["elementType"]
-                )
-            elif field_type["type"] == "struct":
-                converted[name] = {
-                    f["name"]: self._convert(raw_row[f["name"]], f["type"])
-                    for f in field_type["type"]["fields"]
-                }
-            else:
-                converted[name] = raw_row[name]
-
-        return converted
+            names.append(name)
+            columns.append(
+                self._convert_column(batch.column(name), field["type"])
+            )
+        return [dict(zip(names, values)) for values in zip(*columns)]
 
     def __iter__(self):
         offset = self.offset
@@ -243,11 +345,7 @@ class Dataset:
                     for (
                         batch
                     ) in row_group.to_batches():  # type: pyarrow.RecordBatch
-                        for row in batch.to_pylist()[offset:]:
-                            yield self._convert(
-                                row,
-                                self.spark_row_metadata,
-                            )
+                        yield from self._convert_batch(batch.slice(offset))
 
     def to_pandas(self, limit=None):
         """Create a pandas dataframe from the parquet data in this Dataset
@@ -258,41 +356,31 @@ class Dataset:
             The max number of rows to retrieve. If none, 0, or negative
             then retrieve all rows
         """
-        filesystem, path = fs.FileSystem.from_uri(self.uri)
+        filesystem, path = _filesystem_from_uri(self.uri)
         dataset = ds.dataset(path, filesystem=filesystem, format="parquet")
         if limit is None or limit <= 0:
-            raw_df = dataset.to_table(columns=self.columns).to_pandas()
+            table = dataset.to_table(columns=self.columns)
         else:
-            raw_df = dataset.head(limit, columns=self.columns).to_pandas()
+            table = dataset.head(limit, columns=self.columns)
         types = {
             f["name"]: f["type"] for f in self.spark_row_metadata["fields"]
         }
         return pd.DataFrame(
             {
-                name: self._convert_col(col, types.get(name))
-                for name, col in raw_df.iteritems()
+                name: pd.Series(self._convert_column(col, types[name]))
+                if isinstance(types.get(name), dict)
+                else col.to_pandas()
+                for name, col in zip(table.column_names, table.columns)
             }
         )
 
-    def _convert_col(self, col: pd.Series, field_type) -> pd.Series:
-        if field_type is None:
-            return col
-        if not isinstance(field_type, dict):
-            return col
-        elif field_type["type"] == "udt":
-            udt = self._find_udt(field_type["pyClass"])
-            return col.apply(partial(_convert_udt_value, udt=udt))
-        elif field_type["type"] == "struct":
-            return col.apply(lambda d: self._convert(d, field_type))
-        elif field_type["type"] == "array":
-            return col.apply(
-                lambda d: self._convert_array(d, field_type["elementType"])
-            )
-        else:
-            return col
-
-    def _convert_array(self, arr, element_type):
-        return [self._convert(x, element_type) for x in arr]
+    def _resolve_blob(self, value):
+        """Replace the reference to a deduplicated blob with its content."""
+        if isinstance(value, Image):
+            digest = parse_blob_uri(value.uri)
+            if digest is not None:
+                return Image(self._blobs.get(digest))
+        return value
 
 
 def _convert_udt_value(value, udt):
@@ -306,15 +394,24 @@ def _convert_udt_value(value, udt):
     return converted_value
 
 
-def convert_tensor(row, use_pil: bool = False):
+def convert_tensor(
+    row, use_pil: bool = False, image_size: Optional[Tuple[int, int]] = None
+):
     """
     Convert a parquet row into tensors.
 
     If use_pil is set to True, this method returns a PIL image instead,
     and relies on the customer code to convert PIL image to tensors.
+
+    If image_size is set, images are decoded into ``(width, height)``
+    directly, which is cheaper than resizing them in the transforms.
     """
+    # Images are the only values that can be decoded into a given size.
+    size_kwargs = {} if image_size is None else {"size": image_size}
     if use_pil and isinstance(row, ToPIL):
-        return row.to_pil()
+        return row.to_pil(**size_kwargs)
+    elif isinstance(row, ToPIL):
+        return row.to_numpy(**size_kwargs)
     elif isinstance(row, ToNumpy):
         return row.to_numpy()
     elif not isinstance(row, (Mapping, pd.Series)):
@@ -324,11 +421,15 @@ def convert_tensor(row, use_pil: bool = False):
     tensors = {}
     for key, value in row.items():
         if isinstance(value, dict):
-            tensors[key] = convert_tensor(value)
+            tensors[key] = convert_tensor(value, image_size=image_size)
         elif isinstance(value, (list, tuple)):
-            tensors[key] = np.array([convert_tensor(elem) for elem in value])
+            tensors[key] = np.array(
+                [convert_tensor(elem, image_size=image_size) for elem in value]
+            )
         elif use_pil and isinstance(value, ToPIL):
-            tensors[key] = value.to_pil()
+            tensors[key] = value.to_pil(**size_kwargs)
+        elif isinstance(value, ToPIL):
+            tensors[key] = value.to_numpy(**size_kwargs)
         elif isinstance(value, ToNumpy):
             tensors[key] = value.to_numpy()
         else:
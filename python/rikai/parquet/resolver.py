@@ -97,6 +97,7 @@ class DefaultResolver(BaseResolver):
                 finfo.path
                 for finfo in fs.get_file_info(selector)
                 if finfo.path.endswith(".parquet")
+                and not _is_hidden(finfo.path, base_dir)
             )
         return (scheme + "://" + path for path in paths)
 
@@ -128,6 +129,17 @@ class DefaultResolver(BaseResolver):
             ) from exp
 
 
+def _is_hidden(path: str, base_dir: str) -> bool:
+    """Whether the path is under a hidden directory of base_dir, i.e., whose
+    name starts with "_" or ".", such as the ``_rikai`` metadata directory.
+    Spark skips these directories as well.
+    """
+    relpath = os.path.relpath(path, base_dir)
+    return any(
+        part.startswith(("_", ".")) for part in relpath.split(os.sep)[:-1]
+    )
+
+
 class Resolver:
     """Extensible Dataset Resolver"""
 
@@ -13,15 +13,17 @@
 #  limitations under the License.
 
 # Standard
-from typing import Any, Callable, Optional, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 # Third Party
 import pandas as pd
+from PIL import Image as PILImage
 from torch.utils.data import Dataset
 
 # Rikai
 from rikai.pytorch.transforms import convert_tensor
 from rikai.spark.sql.codegen.base import unpickle_transform
+from rikai.types.vision import Image, decode_batch
 
 __all__ = ["PandasDataset"]
 
@@ -43,12 +45,14 @@ class PandasDataset(Dataset):
         transform: Optional[Callable] = None,
         unpickle: bool = False,
         use_pil: bool = False,
+        image_size: Optional[Tuple[int, int]] = None,
     ) -> None:
         assert isinstance(data, (pd.DataFrame, pd.Series))
         self.data = data
         self.transform = transform
         self.unpickle = unpickle
         self.use_pil = use_pil
+        self.image_size = image_size
 
     def __len__(self) -> int:
         return self.data.shape[0]
@@ -57,11 +61,39 @@ class PandasDataset(Dataset):
         row = self.data.iloc[index]
         if self.unpickle:
             row = unpickle_transform(row)
-        row = convert_tensor(row, use_pil=self.use_pil)
+        return self._convert(row)
+
+    def _convert(self, row: Any) -> Any:
+        row = convert_tensor(
+            row, use_pil=self.use_pil, image_size=self.image_size
+        )
         if self.transform:
             row = self.transform(row)
         return row
 
+    def __getitems__(self, indices: List[int]) -> List[Any]:
+        """Fetch a batch of rows.
+
+        If the rows are images, they are decoded in parallel via
+        :py:func:`~rikai.types.vision.decode_batch`.
+        :py:class:`torch.utils.data.DataLoader` uses it to fetch a
+        whole batch at once since torch 2.0. Older versions fetch the rows
+        one at a time via :py:meth:`__getitem__`.
+        """
+        rows = [self.data.iloc[index] for index in indices]
+        if self.unpickle:
+            rows = [unpickle_transform(row) for row in rows]
+        if not rows or not all(isinstance(row, Image) for row in rows):
+            return [self._convert(row) for row in rows]
+
+        arrays = decode_batch(rows, size=self.image_size)
+        rows = [
+            PILImage.fromarray(arr) if self.use_pil else arr for arr in arrays
+        ]
+        if self.transform:
+            rows = [self.transform(row) for row in rows]
+        return rows
+
     def __call__(self, *args: Any, **kwds: Any) -> Any:
         "Return itself as an generator"
         return iter(self)
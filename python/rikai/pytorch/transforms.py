@@ -12,7 +12,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-from typing import Any, Mapping
+from typing import Any, Mapping, Optional, Tuple
 
 from rikai.parquet.dataset import convert_tensor
 
@@ -22,16 +22,30 @@ __all__ = ["RikaiToTensor"]
 class RikaiToTensor:
     """Convert a Row in the ``Rikai`` parquet dataset into Pytorch Tensors
 
+    Parameters
+    ----------
+    use_pil : bool
+        Convert images into :py:class:`PIL.Image.Image` instead of tensors.
+    image_size : Tuple[int, int], optional
+        Decode images into ``(width, height)``.
+
     Warnings
     --------
     Internal use only
     """
 
-    def __init__(self, use_pil: bool = False):
+    def __init__(
+        self,
+        use_pil: bool = False,
+        image_size: Optional[Tuple[int, int]] = None,
+    ):
         self.use_pil = use_pil
+        self.image_size = image_size
 
     def __repr__(self) -> str:
         return "ToTensor"
 
     def __call__(self, record) -> Any:
-        return convert_tensor(record, use_pil=self.use_pil)
+        return convert_tensor(
+            record, use_pil=self.use_pil, image_size=self.image_size
+        )
@@ -19,7 +19,7 @@
 """
 
 from pathlib import Path
-from typing import Callable, Iterator, List, Optional, Union
+from typing import Callable, Iterator, List, Optional, Tuple, Union
 
 import rikai.pytorch.data
 from rikai.pytorch.transforms import RikaiToTensor
@@ -44,6 +44,10 @@ class Dataset(rikai.pytorch.data.Dataset):
         :py:class:`torchvision.transforms.ToTensor`
     target_transform : Callable, optional
         A function/transform that takes in the target and transforms it.
+    image_size : Tuple[int, int], optional
+        Decode the images into ``(width, height)`` before ``transform``.
+        For JPEG images, it is much cheaper than resizing the full-size
+        images in ``transform``.
 
     Yields
     ------
@@ -83,6 +87,7 @@ class Dataset(rikai.pytorch.data.Dataset):
         target_column: Optional[Union[str, List[str]]] = None,
         transform: Optional[Callable] = None,
         target_transform: Optional[Callable] = None,
+        image_size: Optional[Tuple[int, int]] = None,
     ):
         self.image_column = image_column
         self.target_columns = []
@@ -95,7 +100,7 @@ class Dataset(rikai.pytorch.data.Dataset):
         super().__init__(
             uri_or_df,
             [self.image_column] + self.target_columns,
-            transform=RikaiToTensor(use_pil=True),
+            transform=RikaiToTensor(use_pil=True, image_size=image_size),
         )
 
         self.transform = transform if transform else lambda x: x
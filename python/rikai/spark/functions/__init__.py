@@ -24,8 +24,20 @@ from rikai.spark.functions.vision import *
 __all__ = ["init"]
 
 
+def _has_native_function(spark: SparkSession, name: str) -> bool:
+    """Whether the function is registered in the JVM, i.e., by
+    ``RikaiSparkSessionExtensions``.
+    """
+    return spark._jsparkSession.catalog().functionExists(name)
+
+
 def init(spark: SparkSession):
-    """Register all rikai UDFs"""
+    """Register all rikai UDFs.
+
+    The geometry functions that Rikai SQL extension implements natively as
+    Catalyst expressions are not registered as Python UDFs, so they run in
+    the JVM without a round trip to the Python workers.
+    """
     from rikai.spark.functions import geometry, io, vision
 
     all_geo_udfs = [
@@ -43,8 +55,11 @@ def init(spark: SparkSession):
         "video_to_images",
         "spectrogram_image",
         "video_metadata",
+        "image_info",
     ]
     for name in all_geo_udfs:
+        if _has_native_function(spark, name):
+            continue
         spark.udf.register(name, getattr(geometry, name))
     for name in all_io_udfs:
         spark.udf.register(name, getattr(io, name))
@@ -55,6 +55,8 @@ __all__ = [
     "spectrogram_image",
     "video_metadata",
     "video_metadata_schema",
+    "image_info",
+    "image_info_schema",
 ]
 
 
@@ -217,6 +219,52 @@ def video_to_images(
     ]
 
 
+image_info_schema = StructType(
+    [
+        StructField("width", IntegerType(), True),
+        StructField("height", IntegerType(), True),
+        StructField("format", StringType(), True),
+        StructField("mode", StringType(), True),
+    ]
+)
+
+
+@udf(returnType=image_info_schema)
+def image_info(img: Image) -> Optional[dict]:
+    """Return the width, height, format and mode of an image,
+    by only reading the image header.
+
+    Parameters
+    ----------
+    img : Image
+        An image object.
+
+    Returns
+    -------
+    dict
+        The keys are: width, height, format and mode.
+
+    Examples
+    --------
+
+    >>> spark.sql(\"\"\"SELECT image_info(image).width AS width,
+    ...     image_info(image).height AS height FROM dataset\"\"\")
+
+    See Also
+    --------
+    :py:attr:`rikai.types.vision.Image.size`
+    """
+    if img is None:
+        return None
+    width, height = img.size
+    return {
+        "width": width,
+        "height": height,
+        "format": img.format,
+        "mode": img.mode,
+    }
+
+
 video_metadata_schema = StructType(
     [
         StructField("width", IntegerType(), True),
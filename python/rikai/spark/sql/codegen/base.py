@@ -14,7 +14,7 @@
 
 import importlib
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Optional, Tuple, Union
 
 from pyspark.serializers import CloudPickleSerializer
 from pyspark.sql.functions import udf
@@ -132,3 +132,24 @@ def pickle_udt(input):
 
 def unpickle_transform(data: bytes) -> Any:
     return _pickler.loads(data)
+
+
+def parse_image_size(
+    value: Optional[Union[str, int, list, tuple]]
+) -> Optional[Tuple[int, int]]:
+    """Parse the ``image_size`` model option into ``(width, height)``.
+
+    It accepts ``"300"``, ``"300,300"``, ``"300x300"`` or a sequence of ints.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.lower().replace("x", ",").split(",")
+    elif isinstance(value, int):
+        value = [value]
+    size = [int(v) for v in value]
+    if len(size) == 1:
+        size = size * 2
+    if len(size) != 2 or min(size) <= 0:
+        raise SpecError(f"Invalid image_size: {value}")
+    return tuple(size)
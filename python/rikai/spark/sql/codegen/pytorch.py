@@ -24,6 +24,7 @@ from torch.utils.data import DataLoader
 
 from rikai.io import open_uri
 from rikai.pytorch.pandas import PandasDataset
+from rikai.spark.sql.codegen.base import parse_image_size
 from rikai.spark.sql.model import ModelSpec
 
 DEFAULT_NUM_WORKERS = 8
@@ -63,6 +64,7 @@ def _generate(spec: ModelSpec, is_udf: bool = True):
         options.get("num_workers", min(os.cpu_count(), DEFAULT_NUM_WORKERS))
     )
     batch_size = int(options.get("batch_size", DEFAULT_BATCH_SIZE))
+    image_size = parse_image_size(options.get("image_size"))
 
     return_type = Iterator[pd.Series]
 
@@ -80,6 +82,7 @@ def _generate(spec: ModelSpec, is_udf: bool = True):
                         transform=model.transform(),
                         unpickle=is_udf,
                         use_pil=True,
+                        image_size=image_size,
                     )
                     results = []
                     for batch in DataLoader(
@@ -16,10 +16,12 @@ from typing import Iterator
 
 import pandas as pd
 import tensorflow as tf
+from PIL import Image as PILImage
 from pyspark.serializers import CloudPickleSerializer
 from pyspark.sql.functions import pandas_udf
 from pyspark.sql.types import BinaryType
 
+from rikai.spark.sql.codegen.base import parse_image_size
 from rikai.spark.sql.model import ModelSpec
 from rikai.tensorflow.pandas import PandasDataset
 from rikai.types import Image
@@ -39,22 +41,10 @@ def infer_output_signature(blob, is_udf: bool):
         row = blob
 
     if isinstance(row, Image):
-        image_arr = row.to_numpy()
-        if len(image_arr.shape) == 2:
-            return tf.TensorSpec(shape=(None, None), dtype=tf.uint8)
-        elif len(image_arr.shape) == 3:
-            return tf.TensorSpec(
-                shape=(
-                    None,
-                    None,
-                    image_arr.shape[2],
-                ),
-                dtype=tf.uint8,
-            )
-        else:
-            raise ValueError(
-                f"Image should only have 2d or 3d shape, got {image_arr.shape}"
-            )
+        # Images of any mode are decoded into RGB (see Image.to_numpy), so
+        # there is no need to decode one to find out its shape.
+        channels = PILImage.getmodebands("RGB")
+        return tf.TensorSpec(shape=(None, None, channels), dtype=tf.uint8)
     else:
         return tf.TensorSpec.from_tensor(row)
 
@@ -65,6 +55,7 @@ def _generate(payload: ModelSpec, is_udf: bool = True):
     model = payload.model_type
     options = payload.options
     batch_size = int(options.get("batch_size", DEFAULT_BATCH_SIZE))
+    image_size = parse_image_size(options.get("image_size"))
 
     def tf_inference_udf(
         iter: Iterator[pd.DataFrame],
@@ -77,7 +68,11 @@ def _generate(payload: ModelSpec, is_udf: bool = True):
                 signature = infer_output_signature(df.iloc[0], is_udf)
 
             data = PandasDataset(
-                df, model.transform(), unpickle=is_udf, use_pil=True
+                df,
+                model.transform(),
+                unpickle=is_udf,
+                use_pil=True,
+                image_size=image_size,
             ).batch(batch_size)
 
             results = []
@@ -15,8 +15,11 @@
 """Spark User Defined Types
 """
 
+from typing import List
+
 # Third Party
 import numpy as np
+import pyarrow as pa
 from pyspark.sql import Row
 from pyspark.sql.types import (
     ArrayType,
@@ -30,10 +33,12 @@ from pyspark.sql.types import (
 
 # Rikai
 import rikai
+from rikai.internal.arrow_utils import deserialize_struct
 from rikai.spark.types.geometry import (
     Box2dType,
     Box3dType,
     MaskType,
+    PointCloudType,
     PointType,
 )
 from rikai.spark.types.video import (
@@ -52,6 +57,7 @@ __all__ = [
     "VideoStreamType",
     "YouTubeVideoType",
     "MaskType",
+    "PointCloudType",
     "SegmentType",
 ]
 
@@ -60,6 +66,9 @@ class NDArrayType(UserDefinedType):
     """User define type for an arbitrary :py:class:`numpy.ndarray`.
 
     This UDT serializes :py:class:`numpy.ndarray` into bytes buffer.
+    Alternatively, the bytes can be stored out of line, referenced by a
+    range URI (see :py:class:`rikai.numpy.ArrayRef`), and are then read on
+    demand.
     """
 
     def __repr__(self) -> str:
@@ -83,7 +92,12 @@ class NDArrayType(UserDefinedType):
                 StructField(
                     "data",
                     BinaryType(),
-                    False,
+                    True,
+                ),
+                StructField(
+                    "uri",
+                    StringType(),
+                    True,
                 ),
             ]
         )
@@ -98,20 +112,35 @@ class NDArrayType(UserDefinedType):
 
     def serialize(self, obj: np.ndarray):
         """Serialize an :py:class:`numpy.ndarray` into Spark Row"""
+        import rikai.numpy
+
+        if isinstance(obj, rikai.numpy.ArrayRef):
+            return (obj.dtype, list(obj.shape), None, obj.uri)
         return (
             str(obj.dtype),
             list(obj.shape),
             obj.tobytes(),
+            None,
         )
 
     def deserialize(self, datum: Row) -> np.ndarray:
         import rikai.numpy
+        from rikai.io import open_uri
 
+        data = datum[2]
+        # Datasets written before out-of-line storage have no uri field.
+        if data is None and len(datum) > 3 and datum[3] is not None:
+            with open_uri(datum[3]) as fobj:
+                data = fobj.read()
         return (
-            np.frombuffer(datum[2], dtype=np.dtype(datum[0]))
+            np.frombuffer(data, dtype=np.dtype(datum[0]))
             .reshape(datum[1])
             .view(rikai.numpy.ndarray)
         )
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List[np.ndarray]:
+        """Deserialize an Arrow column of arrays at once."""
+        return deserialize_struct(array, self.deserialize)
+
     def simpleString(self) -> str:
         return "ndarray"
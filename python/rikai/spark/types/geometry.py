@@ -17,23 +17,29 @@
 
 from __future__ import annotations
 
+from typing import List
+
 # Third-Party
+import pyarrow as pa
 from pyspark.sql import Row
 from pyspark.sql.types import (
     ArrayType,
+    BinaryType,
     DoubleType,
     FloatType,
     IntegerType,
     ShortType,
+    StringType,
     StructField,
     StructType,
     UserDefinedType,
 )
 
 # Rikai
+from rikai.internal.arrow_utils import deserialize_struct
 from rikai.logging import logger
 
-__all__ = ["PointType", "Box3dType", "Box2dType", "MaskType"]
+__all__ = ["PointType", "Box3dType", "Box2dType", "MaskType", "PointCloudType"]
 
 
 class Box2dType(UserDefinedType):
@@ -73,7 +79,14 @@ class Box2dType(UserDefinedType):
         if len(datum) < 4:
             logger.error(f"Deserialize box2d: not sufficient data: {datum}")
 
-        return Box2d(*datum[:4])
+        # Unpacking skips the per-field Row.__getitem__ lookups.
+        return Box2d._from_trusted(*datum)
+
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Box2d"]:
+        """Deserialize an Arrow column of boxes at once."""
+        from rikai.types.geometry import Box2d
+
+        return deserialize_struct(array, lambda row: Box2d._from_trusted(*row))
 
     def simpleString(self) -> str:
         return "box2d"
@@ -110,7 +123,13 @@ class PointType(UserDefinedType):
         if len(datum) < 3:
             logger.error(f"Deserialize Point: not sufficient data: {datum}")
 
-        return Point(datum[0], datum[1], datum[2])
+        return Point._from_trusted(*datum)
+
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Point"]:
+        """Deserialize an Arrow column of points at once."""
+        from rikai.types.geometry import Point
+
+        return deserialize_struct(array, lambda row: Point._from_trusted(*row))
 
     def simpleString(self) -> str:
         return "point"
@@ -144,18 +163,33 @@ class Box3dType(UserDefinedType):
         return Row(obj.center, obj.length, obj.width, obj.height, obj.heading)
 
     def deserialize(self, datum: Row) -> "Box3d":
-        from rikai.types.geometry import Box3d
+        from rikai.types.geometry import Box3d, Point
 
         if len(datum) < 5:
             logger.error(f"Deserialize Box3d: not sufficient data: {datum}")
-        return Box3d(datum[0], datum[1], datum[2], datum[3], datum[4])
+        center, length, width, height, heading = datum
+        if not isinstance(center, Point):
+            # The nested struct is not converted when read from parquet.
+            if isinstance(center, dict):
+                center = center.values()
+            center = Point._from_trusted(*center)
+        return Box3d._from_trusted(center, length, width, height, heading)
+
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Box3d"]:
+        """Deserialize an Arrow column of boxes at once."""
+        return deserialize_struct(array, self.deserialize)
 
     def simpleString(self) -> str:
         return "box3d"
 
 
 class MaskType(UserDefinedType):
-    """Spark UDT for 2-D mask"""
+    """Spark UDT for 2-D mask
+
+    Polygons are stored flat, as one float ``coords`` buffer and the
+    ``offsets`` of each polygon into it. The nested ``polygon`` field is only
+    read, from datasets written before.
+    """
 
     @classmethod
     def sqlType(cls) -> StructType:
@@ -170,6 +204,8 @@ class MaskType(UserDefinedType):
                     True,
                 ),
                 StructField("rle", ArrayType(IntegerType(), False), True),
+                StructField("coords", ArrayType(FloatType(), False), True),
+                StructField("offsets", ArrayType(IntegerType(), False), True),
             ]
         )
 
@@ -186,20 +222,36 @@ class MaskType(UserDefinedType):
 
         mask_type = mask.type.value
         if mask.type == Mask.Type.RLE or mask.type == Mask.Type.COCO_RLE:
-            return Row(mask_type, mask.height, mask.width, None, mask.data)
+            return Row(
+                mask_type, mask.height, mask.width, None, mask.data, None, None
+            )
         elif mask.type == Mask.Type.POLYGON:
-            return Row(mask_type, mask.height, mask.width, mask.data, None)
+            polygons = mask.polygons
+            return Row(
+                mask_type,
+                mask.height,
+                mask.width,
+                None,
+                None,
+                polygons.coords.tolist(),
+                polygons.offsets.tolist(),
+            )
         else:
             raise ValueError(f"Unrecognized mask type: {mask.type}")
 
     def deserialize(self, datum: Row) -> "Mask":
         from rikai.types.geometry import Mask
+        from rikai.types.polygon import PolygonList
 
         mask_type = Mask.Type(datum[0])
         height = datum[1]
         width = datum[2]
         if mask_type == Mask.Type.POLYGON:
-            return Mask.from_polygon(datum[3], height=height, width=width)
+            if len(datum) > 5 and datum[5] is not None:
+                polygons = PolygonList(datum[5], datum[6])
+            else:
+                polygons = datum[3]
+            return Mask.from_polygon(polygons, height=height, width=width)
         elif mask_type == Mask.Type.RLE:
             return Mask.from_rle(datum[4], height=height, width=width)
         elif mask_type == Mask.Type.COCO_RLE:
@@ -207,5 +259,54 @@ class MaskType(UserDefinedType):
         else:
             raise ValueError(f"Unrecognized mask type: {datum[0]}")
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Mask"]:
+        """Deserialize an Arrow column of masks at once.
+
+        The polygons are views of the Arrow buffers, without copies.
+        """
+        return deserialize_struct(
+            array, self.deserialize, views=("coords", "offsets")
+        )
+
     def simpleString(self) -> str:
         return "mask"
+
+
+class PointCloudType(UserDefinedType):
+    """Spark UDT for :py:class:`~rikai.types.geometry.PointCloud`.
+
+    The points are stored in one binary buffer of little-endian float32, row
+    by row, with one value per field.
+    """
+
+    @classmethod
+    def sqlType(cls) -> StructType:
+        return StructType(
+            fields=[
+                StructField("fields", ArrayType(StringType(), False), False),
+                StructField("data", BinaryType(), False),
+            ]
+        )
+
+    @classmethod
+    def module(cls) -> str:
+        return "rikai.spark.types.geometry"
+
+    @classmethod
+    def scalaUDT(cls) -> str:
+        return "org.apache.spark.sql.rikai.PointCloudType"
+
+    def serialize(self, obj: "PointCloud") -> Row:
+        return Row(list(obj.fields), obj.to_bytes())
+
+    def deserialize(self, datum: Row) -> "PointCloud":
+        from rikai.types.geometry import PointCloud
+
+        return PointCloud.from_bytes(datum[1], datum[0])
+
+    def deserialize_arrow(self, array: pa.StructArray) -> List["PointCloud"]:
+        """Deserialize an Arrow column of point clouds at once."""
+        return deserialize_struct(array, self.deserialize)
+
+    def simpleString(self) -> str:
+        return "pointcloud"
@@ -12,6 +12,9 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+from typing import List
+
+import pyarrow as pa
 from pyspark.sql.types import (
     IntegerType,
     StringType,
@@ -20,6 +23,8 @@ from pyspark.sql.types import (
     UserDefinedType,
 )
 
+from rikai.internal.arrow_utils import deserialize_struct
+
 __all__ = ["YouTubeVideoType", "VideoStreamType"]
 
 
@@ -59,6 +64,10 @@ class VideoStreamType(UserDefinedType):
 
         return VideoStream(datum[0])
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List["VideoStream"]:
+        """Deserialize an Arrow column of video streams at once."""
+        return deserialize_struct(array, self.deserialize)
+
     def simpleString(self) -> str:
         return "videostream"
 
@@ -100,6 +109,10 @@ class YouTubeVideoType(UserDefinedType):
 
         return YouTubeVideo(datum[0])
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List["YouTubeVideo"]:
+        """Deserialize an Arrow column of YouTube videos at once."""
+        return deserialize_struct(array, self.deserialize)
+
     def simpleString(self) -> str:
         return "youtubevideo"
 
@@ -144,5 +157,9 @@ class SegmentType(UserDefinedType):
 
         return Segment(datum[0], datum[1])
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Segment"]:
+        """Deserialize an Arrow column of segments at once."""
+        return deserialize_struct(array, self.deserialize)
+
     def simpleString(self) -> str:
         return "segment"
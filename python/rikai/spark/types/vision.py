@@ -13,6 +13,9 @@
 #  limitations under the License.
 
 
+from typing import List
+
+import pyarrow as pa
 from pyspark.sql.types import (
     BinaryType,
     StringType,
@@ -21,6 +24,8 @@ from pyspark.sql.types import (
     UserDefinedType,
 )
 
+from rikai.internal.arrow_utils import deserialize_struct
+
 __all__ = ["ImageType"]
 
 
@@ -60,5 +65,9 @@ class ImageType(UserDefinedType):
 
         return Image(datum[0] or datum[1])
 
+    def deserialize_arrow(self, array: pa.StructArray) -> List["Image"]:
+        """Deserialize an Arrow column of images at once."""
+        return deserialize_struct(array, self.deserialize)
+
     def simpleString(self) -> str:
         return "image"
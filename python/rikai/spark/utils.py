@@ -11,19 +11,344 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
+import os
+import pickle
 import re
+import uuid
+from functools import reduce
+from typing import Any, List, Optional, Union
+
+import numpy as np
+from pyspark.sql.functions import col, collect_list, explode, expr, struct, udf
+from pyspark.sql.types import (
+    BinaryType,
+    StringType,
+    StructField,
+    StructType,
+)
 
 import rikai
 from rikai.__version__ import version
-from rikai.conf import CONF_PARQUET_BLOCK_SIZE
+from rikai.internal.uri_utils import normalize_uri
+from rikai.io import range_uri
+from rikai.numpy import ArrayRef
+from rikai.parquet.blobs import (
+    BLOB_DIR,
+    PACK_DIR,
+    BlobPacker,
+    blob_uri,
+    content_hash,
+)
 from rikai.spark.functions import init
+from rikai.spark.types import ImageType, NDArrayType
+from rikai.types.vision import Image
+
+_blob_schema = StructType(
+    [
+        StructField("hash", StringType(), False),
+        StructField("data", BinaryType(), False),
+    ]
+)
+
+
+@udf(returnType=_blob_schema)
+def _image_blob(image: Optional[Image]):
+    if image is None or not image.is_embedded:
+        return None
+    return content_hash(image.data), bytes(image.data)
+
+
+@udf(returnType=ImageType())
+def _image_blob_ref(image: Optional[Image]) -> Optional[Image]:
+    if image is None or not image.is_embedded:
+        return image
+    return Image(blob_uri(content_hash(image.data)))
+
+
+# Bounds of the row group size that df_to_rikai picks for a target number of
+# rows per group.
+MIN_ROW_GROUP_BYTES = 1024 * 1024
+MAX_ROW_GROUP_BYTES = 256 * 1024 * 1024
+
+# Number of rows sampled to estimate the size of a row.
+_SIZE_SAMPLE_ROWS = 64
+
+
+def _pack_value(value: Any, packer: BlobPacker, threshold: int) -> Any:
+    if (
+        isinstance(value, Image)
+        and value.is_embedded
+        and len(value.data) > threshold
+    ):
+        return Image(packer.append(value.data))
+    elif isinstance(value, np.ndarray) and value.nbytes > threshold:
+        return ArrayRef(
+            str(value.dtype), value.shape, packer.append(value.tobytes())
+        )
+    return value
+
+
+def _pack_blobs(
+    df: "pyspark.sql.DataFrame", uri: str, threshold: int
+) -> "pyspark.sql.DataFrame":
+    """Move the large images and arrays of the top-level columns into pack
+    files, one per partition.
+    """
+    columns = [
+        idx
+        for idx, field in enumerate(df.schema.fields)
+        if isinstance(field.dataType, (ImageType, NDArrayType))
+    ]
+    if not columns:
+        return df
+    pack_dir = os.path.join(normalize_uri(uri), PACK_DIR)
+
+    def pack_partition(rows):
+        pack_uri = os.path.join(pack_dir, f"{uuid.uuid4().hex}.pack")
+        with BlobPacker(pack_uri) as packer:
+            for row in rows:
+                values = list(row)
+                for idx in columns:
+                    values[idx] = _pack_value(values[idx], packer, threshold)
+                yield values
+
+    return df.sql_ctx.createDataFrame(
+        df.rdd.mapPartitions(pack_partition), df.schema
+    )
+
+
+class _SizingPacker:
+    """Stands in for BlobPacker to size rows as if blobs were packed."""
+
+    @staticmethod
+    def append(data: bytes) -> str:
+        return range_uri("", 0, len(data))
+
+
+def _estimate_row_bytes(
+    df: "pyspark.sql.DataFrame", blob_threshold: Optional[int]
+) -> Optional[float]:
+    """Estimate the average size of a row from the first rows, or returns
+    None for an empty DataFrame.
+    """
+
+    def row_bytes(row) -> int:
+        if blob_threshold is not None:
+            row = [_pack_value(v, _SizingPacker, blob_threshold) for v in row]
+        return len(pickle.dumps(tuple(row), protocol=pickle.HIGHEST_PROTOCOL))
+
+    sizes = df.limit(_SIZE_SAMPLE_ROWS).rdd.map(row_bytes).collect()
+    if not sizes:
+        return None
+    return sum(sizes) / len(sizes)
 
 
-def df_to_rikai(df: "pyspark.sql.DataFrame", uri: str):
-    (
-        df.write.format("rikai")
-        .option(CONF_PARQUET_BLOCK_SIZE, rikai.options.parquet.block.size)
-        .save(uri)
+def df_to_rikai(
+    df: "pyspark.sql.DataFrame",
+    uri: str,
+    dedup_images: bool = False,
+    blob_threshold: Optional[int] = None,
+    rows_per_group: Optional[int] = None,
+    min_group_bytes: int = MIN_ROW_GROUP_BYTES,
+    max_group_bytes: int = MAX_ROW_GROUP_BYTES,
+    groups_per_file: Optional[int] = None,
+):
+    """Write a Spark DataFrame as a Rikai dataset.
+
+    Parameters
+    ----------
+    df : pyspark.sql.DataFrame
+        The DataFrame to write.
+    uri : str
+        The URI of the dataset.
+    dedup_images : bool, default False
+        Store each distinct embedded image once, in the ``_rikai/blobs``
+        side table, and reference it by content hash from the rows. Only
+        top-level image columns are deduplicated. The references are
+        resolved by :py:class:`rikai.parquet.Dataset`.
+    blob_threshold : int, optional
+        If set, embedded images and arrays larger than this number of bytes
+        are stored in the pack files under ``_rikai/packs``, and the rows
+        only keep their range URIs. Scans that do not touch these columns
+        then skip the large payloads entirely. The range URIs are absolute,
+        so the dataset can not be copied or moved, i.e., staged locally
+        then uploaded to S3, without breaking its packed images and arrays.
+        Write it at its final URI instead.
+    rows_per_group : int, optional
+        The target number of rows of a parquet row group. The row group
+        size in bytes is derived from the average size of the sampled rows.
+        Without it, ``rikai.options.parquet.block.size`` is used.
+    min_group_bytes : int, default 1MB
+        The lower bound of the row group size derived from
+        ``rows_per_group``, in bytes.
+    max_group_bytes : int, default 256MB
+        The upper bound of the row group size derived from
+        ``rows_per_group``, in bytes.
+    groups_per_file : int, optional
+        If set, each parquet file holds at most about this number of row
+        groups. Together with ``rows_per_group``, it leaves enough row
+        groups and files to balance them across the workers of a
+        distributed :py:class:`rikai.parquet.Dataset`.
+    """
+    # Sized before the blobs are moved out of line, which would otherwise
+    # write pack files for the sampled rows.
+    block_size = rikai.options.parquet.block.size
+    row_bytes = None
+    if rows_per_group is not None or groups_per_file is not None:
+        row_bytes = _estimate_row_bytes(df, blob_threshold)
+    if rows_per_group is not None and row_bytes is not None:
+        block_size = int(
+            min(
+                max(rows_per_group * row_bytes, min_group_bytes),
+                max_group_bytes,
+            )
+        )
+
+    image_columns = [
+        field.name
+        for field in df.schema.fields
+        if dedup_images and isinstance(field.dataType, ImageType)
+    ]
+    source = df.persist() if image_columns else None
+    try:
+        # Both the dataset and its blobs side table read every image.
+        blobs = [
+            df.select(_image_blob(col(name)).alias("blob"))
+            .where(col("blob").isNotNull())
+            .select("blob.*")
+            for name in image_columns
+        ]
+        for name in image_columns:
+            df = df.withColumn(name, _image_blob_ref(col(name)))
+        if blob_threshold is not None:
+            df = _pack_blobs(df, uri, blob_threshold)
+
+        writer = df.write.format("rikai").option(
+            "rikai.block.size", block_size
+        )
+        if groups_per_file is not None and row_bytes is not None:
+            writer = writer.option(
+                "maxRecordsPerFile",
+                max(1, int(groups_per_file * block_size / row_bytes)),
+            )
+        writer.save(uri)
+        if blobs:
+            # Written after the dataset, which overwrites the whole directory.
+            (
+                reduce(lambda a, b: a.union(b), blobs)
+                .dropDuplicates(["hash"])
+                .write.mode("overwrite")
+                .parquet(os.path.join(uri, BLOB_DIR))
+            )
+    finally:
+        if source is not None:
+            source.unpersist()
+
+
+def _collect_boxes(
+    df: "pyspark.sql.DataFrame",
+    on: List[str],
+    box: str,
+    score: Optional[str] = None,
+) -> "pyspark.sql.DataFrame":
+    """Group the rows of ``df`` by ``on`` into an array of
+    ``struct<row, box[, score]>``.
+    """
+    fields = [
+        struct(*[c for c in df.columns if c not in on]).alias("row"),
+        col(box).alias("box"),
+    ]
+    if score is not None:
+        fields.append(col(score).cast("double").alias("score"))
+    return df.groupBy(*on).agg(collect_list(struct(*fields)).alias("rows"))
+
+
+def iou_join(
+    left: "pyspark.sql.DataFrame",
+    right: "pyspark.sql.DataFrame",
+    on: Union[str, List[str]],
+    threshold: float = 0.5,
+    left_box: str = "box",
+    right_box: str = "box",
+    greedy: bool = False,
+    score: Optional[str] = None,
+) -> "pyspark.sql.DataFrame":
+    """Join the rows of two DataFrames of the same images, i.e., the ground
+    truth and the predictions of a detection model, whose boxes overlap by
+    an IoU of at least ``threshold``.
+
+    The rows of each image are collected, and their boxes are joined by
+    the native ``iou_pairs`` and ``match_boxes`` SQL functions, which sweep
+    over the boxes sorted along the x axis, instead of cross joining the
+    rows of each image and filtering them by ``iou(a.box, b.box)``.
+    It requires the Rikai Spark SQL extensions.
+
+    Parameters
+    ----------
+    left : pyspark.sql.DataFrame
+        The left rows, i.e., the ground truth.
+    right : pyspark.sql.DataFrame
+        The right rows, i.e., the predictions.
+    on : str or list of str
+        The columns identifying an image, in both DataFrames.
+    threshold : float, default 0.5
+        The minimal IoU of a pair, which must be positive.
+    left_box : str, default "box"
+        The :py:class:`~rikai.types.geometry.Box2d` column of ``left``.
+    right_box : str, default "box"
+        The :py:class:`~rikai.types.geometry.Box2d` column of ``right``.
+    greedy : bool, default False
+        Match each right box to at most one left box, and the other way
+        around, like :py:func:`rikai.types.geometry.match_boxes`. Otherwise,
+        return all the pairs.
+    score : str, optional
+        The score column of ``right``. The greedy matching visits the right
+        rows by descending score, or in an arbitrary order if not set.
+
+    Return
+    ------
+    pyspark.sql.DataFrame
+        The ``on`` columns, the ``left`` and ``right`` struct columns with
+        the other columns of the joined rows, and their ``iou``.
+
+    Example
+    -------
+
+    >>> matches = iou_join(
+    ...     annotations, predictions, on="image_id", greedy=True, score="score"
+    ... )
+    >>> matches.groupBy("image_id").count()
+    """
+    if threshold <= 0:
+        raise ValueError("IoU threshold must be positive")
+    on = [on] if isinstance(on, str) else list(on)
+    images = (
+        _collect_boxes(left, on, left_box)
+        .withColumnRenamed("rows", "left_rows")
+        .join(
+            _collect_boxes(right, on, right_box, score).withColumnRenamed(
+                "rows", "right_rows"
+            ),
+            on=on,
+        )
+    )
+    boxes = (
+        "transform(left_rows, r -> r.box), transform(right_rows, r -> r.box)"
+    )
+    if greedy:
+        scores = ", transform(right_rows, r -> r.score)" if score else ""
+        pairs = expr(f"match_boxes({boxes}, {float(threshold)}{scores})")
+        left_pos, right_pos = "pair.ground_truth", "pair.prediction"
+    else:
+        pairs = expr(f"iou_pairs({boxes}, {float(threshold)})")
+        left_pos, right_pos = "pair.left", "pair.right"
+    return images.select(
+        *on, "left_rows", "right_rows", explode(pairs).alias("pair")
+    ).select(
+        *on,
+        expr(f"left_rows[{left_pos}].row").alias("left"),
+        expr(f"right_rows[{right_pos}].row").alias("right"),
+        col("pair.iou").alias("iou"),
     )
 
 
@@ -13,7 +13,7 @@
 #  limitations under the License.
 
 # Standard
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 # Third Party
 import numpy as np
@@ -44,30 +44,37 @@ class PandasDataset:
         transform: Optional[Callable] = None,
         unpickle: bool = False,
         use_pil: bool = False,
+        image_size: Optional[Tuple[int, int]] = None,
     ) -> None:
         assert isinstance(df, pd.Series)
         self.df = df
         self.transform = transform
         self.unpickle = unpickle
         self.use_pil = use_pil
+        self.image_size = image_size
 
     def batch(self, batch_size):
-        def upickle_convent_transform(entity):
-            if self.unpickle:
-                entity = unpickle_transform(entity)
-            entity = convert_tensor(entity, use_pil=self.use_pil)
+        from rikai.types.vision import Image, decode_batch
 
-            from rikai.types.vision import Image
-
-            ret = Image.from_pil(entity).to_numpy()
-            if self.transform:
-                ret = self.transform(ret)
-            return ret
-
-        # TODO I want to use
-        # `tensors = self.df.map(upickle_convent_transform).to_numpy()`
-        # here, but it will cause unintelligible error
-        tensors = np.array([upickle_convent_transform(x) for x in self.df])
+        entities = [
+            unpickle_transform(x) if self.unpickle else x for x in self.df
+        ]
+        if entities and all(isinstance(e, Image) for e in entities):
+            # Decode all images in parallel, into one (N, H, W, C) array
+            # if they have the same size.
+            tensors = decode_batch(entities, size=self.image_size)
+        else:
+            tensors = [
+                np.asarray(
+                    convert_tensor(
+                        e, use_pil=self.use_pil, image_size=self.image_size
+                    )
+                )
+                for e in entities
+            ]
+        if self.transform:
+            tensors = [self.transform(t) for t in tensors]
+        tensors = np.asarray(tensors)
 
         data = tf.data.Dataset.from_tensor_slices(tensors)
         # data = tf.data.Dataset.from_tensors(img)
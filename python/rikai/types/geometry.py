@@ -18,22 +18,45 @@
 from __future__ import annotations
 
 from enum import Enum
+from io import BytesIO
 from numbers import Real
-from typing import List, Optional, Sequence, Tuple, Union
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
+import pyarrow as pa
 from PIL import Image, ImageDraw
 
+from rikai.conf import CONF_RIKAI_MASK_RASTERIZER, get_option
 from rikai.mixin import Drawable, ToDict, ToNumpy
 from rikai.spark.types.geometry import (
     Box2dType,
     Box3dType,
     MaskType,
+    PointCloudType,
     PointType,
 )
-from rikai.types import rle
-
-__all__ = ["Point", "Box3d", "Box2d", "Mask"]
+from rikai.types import polygon, rle
+
+__all__ = [
+    "Point",
+    "PointCloud",
+    "Box3d",
+    "Box2d",
+    "Box2dArray",
+    "Box2dIndex",
+    "Box3dArray",
+    "Mask",
+    "nms",
+    "soft_nms",
+    "match_boxes",
+]
+
+# Number of boxes in each dimension of an IoU tile, which bounds the memory
+# of the box operations over many boxes.
+_IOU_TILE_SIZE = 1024
+# Number of boxes in each dimension of a tile of rotated box pairs, whose
+# intersections take much more memory per pair than for axis-aligned boxes.
+_ROTATED_IOU_TILE_SIZE = 256
 
 
 class Point(ToNumpy, ToDict):
@@ -51,12 +74,26 @@ class Point(ToNumpy, ToDict):
 
     __UDT__ = PointType()
 
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x: float, y: float, z: float):
         # pylint: disable=invalid-name
         self.x = float(x)
         self.y = float(y)
         self.z = float(z)
 
+    @classmethod
+    def _from_trusted(cls, x: float, y: float, z: float) -> Point:
+        """Build a point from float coordinates without conversion.
+
+        For the coordinates read back from storage, i.e., by the UDT.
+        """
+        point = cls.__new__(cls)
+        point.x = x
+        point.y = y
+        point.z = z
+        return point
+
     def __repr__(self) -> str:
         return f"Point({self.x}, {self.y}, {self.z})"
 
@@ -75,6 +112,137 @@ class Point(ToNumpy, ToDict):
         return {"x": self.x, "y": self.y, "z": self.z}
 
 
+class PointCloud(ToNumpy, ToDict):
+    """A point cloud, i.e., a LiDAR sweep, backed by a ``(N, 3 + K)`` float32
+    array.
+
+    The first three fields are the ``(x, y, z)`` coordinates of the points,
+    followed by ``K`` optional channels, i.e., ``intensity``.
+
+    Parameters
+    ----------
+    data : array-like
+        The ``(N, 3 + K)`` values of the points.
+    fields : Sequence[str], default ``("x", "y", "z")``
+        The names of the values of each point.
+
+    Example
+    -------
+
+    >>> cloud = PointCloud(points, fields=["x", "y", "z", "intensity"])
+    >>> cloud["intensity"].mean()
+    >>> cloud.voxel_downsample(0.2).crop(box)
+    """
+
+    __UDT__ = PointCloudType()
+
+    def __init__(
+        self,
+        data: Union[np.ndarray, Sequence],
+        fields: Sequence[str] = ("x", "y", "z"),
+    ):
+        fields = list(fields)
+        if len(fields) < 3:
+            raise ValueError(
+                f"A point cloud has at least x, y and z: {fields}"
+            )
+        data = np.asarray(data, dtype=np.float32)
+        if data.size == 0:
+            data = data.reshape(0, len(fields))
+        if data.ndim != 2 or data.shape[1] != len(fields):
+            raise ValueError(
+                f"Expect a (N, {len(fields)}) array for fields {fields}, "
+                f"got {data.shape}"
+            )
+        self.fields = fields
+        self._data = data
+
+    @classmethod
+    def from_bytes(cls, data: bytes, fields: Sequence[str]) -> PointCloud:
+        """Decode the points from a buffer of little-endian float32, without
+        copying it. The points are read-only if the buffer is.
+        """
+        values = np.frombuffer(data, dtype="<f4")
+        return cls(values.reshape(-1, len(fields)), fields)
+
+    def to_bytes(self) -> bytes:
+        """Encode the points into a buffer of little-endian float32."""
+        return self._data.astype("<f4", copy=False).tobytes()
+
+    def __repr__(self) -> str:
+        return f"PointCloud(points={len(self)}, fields={self.fields})"
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """The values of a field of all the points."""
+        return self._data[:, self.fields.index(field)]
+
+    def __eq__(self, o: object) -> bool:
+        return (
+            isinstance(o, PointCloud)
+            and self.fields == o.fields
+            and np.array_equal(self._data, o._data)
+        )
+
+    @property
+    def points(self) -> np.ndarray:
+        """The ``(N, 3)`` coordinates of the points."""
+        return self._data[:, :3]
+
+    def voxel_downsample(self, voxel_size: float) -> PointCloud:
+        """Downsample the points to one point per voxel, i.e., the average of
+        all the values of the points within each voxel.
+
+        Parameters
+        ----------
+        voxel_size : float
+            The edge length of the cubic voxels.
+        """
+        if voxel_size <= 0:
+            raise ValueError("voxel_size must be positive")
+        if len(self) == 0:
+            return PointCloud(self._data, self.fields)
+        voxels = np.floor(self.points / voxel_size).astype(np.int64)
+        _, inverse, counts = np.unique(
+            voxels, axis=0, return_inverse=True, return_counts=True
+        )
+        inverse = inverse.reshape(-1)
+        sums = np.column_stack(
+            [
+                np.bincount(inverse, weights=column, minlength=len(counts))
+                for column in self._data.T
+            ]
+        )
+        return PointCloud(sums / counts[:, None], self.fields)
+
+    def crop(self, box: Box3d) -> PointCloud:
+        """The points inside or on the surface of a :py:class:`Box3d`."""
+        offsets = self.points.astype(np.float64) - [
+            box.center.x,
+            box.center.y,
+            box.center.z,
+        ]
+        cos, sin = np.cos(box.heading), np.sin(box.heading)
+        # The offsets in the frame of the box.
+        along = offsets[:, 0] * cos + offsets[:, 1] * sin
+        across = -offsets[:, 0] * sin + offsets[:, 1] * cos
+        inside = (
+            (np.abs(along) <= box.length / 2)
+            & (np.abs(across) <= box.width / 2)
+            & (np.abs(offsets[:, 2]) <= box.height / 2)
+        )
+        return PointCloud(self._data[inside], self.fields)
+
+    def to_numpy(self) -> np.ndarray:
+        """Returns the ``(N, 3 + K)`` float32 values of the points."""
+        return self._data
+
+    def to_dict(self) -> dict:
+        return {"fields": self.fields, "data": self._data}
+
+
 class Box2d(ToNumpy, Sequence, ToDict, Drawable):
     """2-D Bounding Box, defined by ``(xmin, ymin, xmax, ymax)``
 
@@ -104,6 +272,8 @@ class Box2d(ToNumpy, Sequence, ToDict, Drawable):
 
     __UDT__ = Box2dType()
 
+    __slots__ = ("xmin", "ymin", "xmax", "ymax")
+
     def __init__(self, xmin: float, ymin: float, xmax: float, ymax: float):
         assert (
             0 <= xmin <= xmax
@@ -116,6 +286,23 @@ class Box2d(ToNumpy, Sequence, ToDict, Drawable):
         self.xmax = float(xmax)
         self.ymax = float(ymax)
 
+    @classmethod
+    def _from_trusted(
+        cls, xmin: float, ymin: float, xmax: float, ymax: float
+    ) -> Box2d:
+        """Build a box from float coordinates without validation.
+
+        For the coordinates that were already validated, i.e., read back by
+        the UDT or from a :py:class:`Box2dArray`, which checks all its boxes
+        when it is built.
+        """
+        box = cls.__new__(cls)
+        box.xmin = xmin
+        box.ymin = ymin
+        box.xmax = xmax
+        box.ymax = ymax
+        return box
+
     @classmethod
     def from_center(
         cls, center_x: float, center_y: float, width: float, height: float
@@ -292,19 +479,104 @@ class Box2d(ToNumpy, Sequence, ToDict, Drawable):
             0, arr[:, 3] - arr[:, 1]
         )
 
+    @staticmethod
+    def _to_array(boxes: Union[List[Box2d], np.ndarray, Box2dArray]):
+        """Convert boxes into a ``(N, 4)`` array."""
+        if isinstance(boxes, Box2dArray):
+            return boxes.to_numpy()
+        elif isinstance(boxes, np.ndarray):
+            return boxes
+        # Read the attributes directly, which is much faster than going
+        # through the Sequence protocol of each box.
+        return np.array(
+            [
+                (b.xmin, b.ymin, b.xmax, b.ymax)
+                if isinstance(b, Box2d)
+                else tuple(b)
+                for b in boxes
+            ],
+            dtype=np.float64,
+        )
+
+    @staticmethod
+    def _ious_tile(
+        boxes1: np.ndarray,
+        boxes2: np.ndarray,
+        area1: np.ndarray,
+        area2: np.ndarray,
+        out: np.ndarray,
+    ) -> np.ndarray:
+        """Compute the IoUs of one tile into ``out``, reusing the buffers of
+        the intermediates.
+        """
+        inter = np.minimum(boxes1[:, 2, None], boxes2[:, 2])
+        inter -= np.maximum(boxes1[:, 0, None], boxes2[:, 0])
+        np.maximum(inter, 0, out=inter)
+        height = np.minimum(boxes1[:, 3, None], boxes2[:, 3])
+        height -= np.maximum(boxes1[:, 1, None], boxes2[:, 1])
+        np.maximum(height, 0, out=height)
+        inter *= height
+
+        union = np.add(area1[:, None], area2, out=height)
+        union -= inter
+        return np.divide(inter, union, out=out)
+
+    @staticmethod
+    def _iou_tiles(
+        boxes1: np.ndarray, boxes2: np.ndarray, dtype: np.dtype
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Yield ``(row, col, ious)`` tiles of the IoU matrix, where ``row``
+        and ``col`` are the offsets of the tile.
+        """
+        boxes1 = boxes1.astype(dtype, copy=False)
+        boxes2 = boxes2.astype(dtype, copy=False)
+        area1 = Box2d._area(boxes1)
+        area2 = Box2d._area(boxes2)
+        buffer = np.empty(
+            (
+                min(len(boxes1), _IOU_TILE_SIZE),
+                min(len(boxes2), _IOU_TILE_SIZE),
+            ),
+            dtype=dtype,
+        )
+        for row in range(0, len(boxes1), _IOU_TILE_SIZE):
+            row_end = row + _IOU_TILE_SIZE
+            for col in range(0, len(boxes2), _IOU_TILE_SIZE):
+                col_end = col + _IOU_TILE_SIZE
+                tile1 = boxes1[row:row_end]
+                tile2 = boxes2[col:col_end]
+                yield row, col, Box2d._ious_tile(
+                    tile1,
+                    tile2,
+                    area1[row:row_end],
+                    area2[col:col_end],
+                    out=buffer[: len(tile1), : len(tile2)],
+                )
+
     @staticmethod
     def ious(
-        boxes1: Union[List[Box2d], np.ndarray],
-        boxes2: Union[List[Box2d], np.ndarray],
+        boxes1: Union[List[Box2d], np.ndarray, Box2dArray],
+        boxes2: Union[List[Box2d], np.ndarray, Box2dArray],
+        out: Optional[np.ndarray] = None,
+        dtype: Optional[np.dtype] = None,
     ) -> Optional[np.ndarray]:
         """Compute intersection over union(IOU).
 
+        The matrix is computed in tiles, so that the intermediates only take
+        the memory of one tile, regardless of N and M.
+
         Parameters
         ----------
-        boxes1 : :py:class:`numpy.ndarray`
+        boxes1 : list, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
             a list of Box2d with length of N
-        boxes2 : :py:class:`numpy.ndarray`
+        boxes2 : list, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
             a list of Box2d with length of M
+        out : :py:class:`numpy.ndarray`, optional
+            A N*M array to write the result into.
+        dtype : numpy dtype, optional
+            The precision of the computation, i.e., ``np.float32`` halves the
+            memory. Defaults to the dtype of ``out`` if provided, otherwise
+            ``np.float64``.
 
         Return
         ------
@@ -331,34 +603,107 @@ class Box2d(ToNumpy, Sequence, ToDict, Drawable):
         >>> list2 = [a_random_box2d() for _ in range(0, 3)]
         >>>
         >>> Box2d.ious(list1, list2)
+
+        See Also
+        --------
+        :py:meth:`Box2d.iou_pairs` to find the overlapping pairs without
+        the dense matrix.
         """  # noqa: E501
 
-        if not isinstance(boxes1, (list, np.ndarray)) or not isinstance(
-            boxes2, (list, np.ndarray)
-        ):
+        if not isinstance(
+            boxes1, (list, np.ndarray, Box2dArray)
+        ) or not isinstance(boxes2, (list, np.ndarray, Box2dArray)):
             raise ValueError("Input must be a list/np.array fo box2d objects")
 
-        if not isinstance(boxes1, np.ndarray):
-            boxes1 = np.array(boxes1)
-        if not isinstance(boxes2, np.ndarray):
-            boxes2 = np.array(boxes2)
+        boxes1 = Box2d._to_array(boxes1)
+        boxes2 = Box2d._to_array(boxes2)
         if np.size(boxes1) == 0 or np.size(boxes2) == 0:
             return None
 
-        row_count = boxes1.shape[0]
-        area1 = Box2d._area(boxes1).reshape(row_count, -1)
-        area2 = Box2d._area(boxes2)
+        shape = (len(boxes1), len(boxes2))
+        if dtype is None:
+            dtype = out.dtype if out is not None else np.float64
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"Expect out of shape {shape}, got {out.shape}")
 
-        xmin = np.maximum(boxes1[:, 0].reshape((row_count, -1)), boxes2[:, 0])
-        ymin = np.maximum(boxes1[:, 1].reshape((row_count, -1)), boxes2[:, 1])
-        xmax = np.minimum(boxes1[:, 2].reshape((row_count, -1)), boxes2[:, 2])
-        ymax = np.minimum(boxes1[:, 3].reshape((row_count, -1)), boxes2[:, 3])
+        for row, col, tile in Box2d._iou_tiles(boxes1, boxes2, dtype):
+            rows, cols = tile.shape
+            out[row : row + rows, col : col + cols] = tile
+        return out
 
-        inter_area = np.maximum(0, xmax - xmin) * np.maximum(0, ymax - ymin)
+    @staticmethod
+    def iou_pairs(
+        boxes1: Union[List[Box2d], np.ndarray, Box2dArray],
+        boxes2: Union[List[Box2d], np.ndarray, Box2dArray],
+        threshold: float = 0.0,
+        topk: Optional[int] = None,
+        dtype: np.dtype = np.float32,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the pairs of boxes whose IoU is above a threshold, without
+        building the dense N*M matrix.
 
-        iou_mat = inter_area / (area1 + area2 - inter_area)
+        Parameters
+        ----------
+        boxes1 : list, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+            a list of Box2d with length of N
+        boxes2 : list, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+            a list of Box2d with length of M
+        threshold : float, default 0.0
+            Only the pairs with IoU strictly greater than this are returned.
+        topk : int, optional
+            If set, only keep the ``topk`` pairs of the highest IoU for each
+            box of ``boxes1``.
+        dtype : numpy dtype, default ``np.float32``
+            The precision of the computation.
+
+        Return
+        ------
+        Tuple[:py:class:`numpy.ndarray`, ...]
+            ``(rows, cols, ious)`` of the pairs, i.e., ``boxes1[rows[i]]``
+            and ``boxes2[cols[i]]`` overlap by ``ious[i]``. The pairs are
+            sorted by rows, then by descending IoU if ``topk`` is set, or by
+            columns otherwise.
+        """
+        boxes1 = Box2d._to_array(boxes1)
+        boxes2 = Box2d._to_array(boxes2)
+        if np.size(boxes1) == 0 or np.size(boxes2) == 0:
+            return (
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=dtype),
+            )
 
-        return iou_mat
+        rows, cols, values = [], [], []
+        for row, col, tile in Box2d._iou_tiles(boxes1, boxes2, dtype):
+            if topk is not None and tile.shape[1] > topk:
+                # Only the top k of each tile can be the top k of the row.
+                top = np.argpartition(-tile, topk - 1, axis=1)[:, :topk]
+                top_values = np.take_along_axis(tile, top, axis=1)
+                tile_rows, idx = np.nonzero(top_values > threshold)
+                tile_cols = top[tile_rows, idx]
+            else:
+                tile_rows, tile_cols = np.nonzero(tile > threshold)
+            rows.append(tile_rows + row)
+            cols.append(tile_cols + col)
+            values.append(tile[tile_rows, tile_cols])
+
+        rows = np.concatenate(rows).astype(np.int64, copy=False)
+        cols = np.concatenate(cols).astype(np.int64, copy=False)
+        values = np.concatenate(values)
+        if topk is None:
+            order = np.lexsort((cols, rows))
+            return rows[order], cols[order], values[order]
+
+        order = np.lexsort((-values, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        # The rank of each pair within its row.
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        lengths = np.diff(np.r_[starts, len(rows)])
+        rank = np.arange(len(rows)) - np.repeat(starts, lengths)
+        keep = rank < topk
+        return rows[keep], cols[keep], values[keep]
 
     def iou(
         self, other: Union[Box2d, List[Box2d], np.ndarray]
@@ -393,6 +738,765 @@ class Box2d(ToNumpy, Sequence, ToDict, Drawable):
         return iou_arr
 
 
+class Box2dArray(ToNumpy, Sequence):
+    """A columnar array of 2-D bounding boxes, backed by a ``(N, 4)``
+    array of ``(xmin, ymin, xmax, ymax)``.
+
+    The geometry operations are vectorized over all the boxes. Indexing
+    with an integer builds a :py:class:`Box2d` on access, while indexing
+    with a slice, a boolean mask or an index array returns a
+    :py:class:`Box2dArray`.
+
+    Parameters
+    ----------
+    data : array-like
+        A ``(N, 4)`` array of ``(xmin, ymin, xmax, ymax)``.
+
+    Example
+    -------
+
+    >>> boxes = Box2dArray.from_top_left([0, 10], [0, 10], [5, 5], [5, 5])
+    >>> boxes.area
+    array([25., 25.])
+    >>> boxes[1]
+    Box2d(xmin=10.0, ymin=10.0, xmax=15.0, ymax=15.0)
+    >>> Box2dArray.from_boxes([Box2d(1, 2, 3, 4)]) * 2
+    Box2dArray([[2. 4. 6. 8.]])
+    """
+
+    _FIELDS = ["xmin", "ymin", "xmax", "ymax"]
+
+    def __init__(self, data: Union[np.ndarray, Sequence]):
+        data = np.asarray(data, dtype=np.float64)
+        if data.size == 0:
+            data = data.reshape(0, 4)
+        if data.ndim != 2 or data.shape[1] != 4:
+            raise ValueError(
+                f"Box2dArray expects a (N, 4) array, got {data.shape}"
+            )
+        valid = (
+            (data[:, 0] >= 0)
+            & (data[:, 0] <= data[:, 2])
+            & (data[:, 1] >= 0)
+            & (data[:, 1] <= data[:, 3])
+        )
+        if not valid.all():
+            raise ValueError(
+                f"Boxes must satisfy 0 <= xmin <= xmax and 0 <= ymin <= ymax,"
+                f" got {data[~valid][0].tolist()}"
+            )
+        self._data = data
+
+    @classmethod
+    def from_boxes(cls, boxes: Sequence[Box2d]) -> Box2dArray:
+        """Build from a sequence of :py:class:`Box2d`."""
+        return cls(Box2d._to_array(boxes))
+
+    @classmethod
+    def from_center(
+        cls,
+        center_x: np.ndarray,
+        center_y: np.ndarray,
+        width: np.ndarray,
+        height: np.ndarray,
+    ) -> Box2dArray:
+        """Build from the arrays of center points and sizes.
+
+        See Also
+        --------
+        :py:meth:`Box2d.from_center`
+        """
+        center_x, center_y, width, height = (
+            np.asarray(v, dtype=np.float64)
+            for v in (center_x, center_y, width, height)
+        )
+        return cls(
+            np.stack(
+                [
+                    center_x - width / 2,
+                    center_y - height / 2,
+                    center_x + width / 2,
+                    center_y + height / 2,
+                ],
+                axis=-1,
+            )
+        )
+
+    @classmethod
+    def from_top_left(
+        cls,
+        xmin: np.ndarray,
+        ymin: np.ndarray,
+        width: np.ndarray,
+        height: np.ndarray,
+    ) -> Box2dArray:
+        """Build from the arrays of top-left points and sizes.
+
+        See Also
+        --------
+        :py:meth:`Box2d.from_top_left`
+        """
+        xmin, ymin, width, height = (
+            np.asarray(v, dtype=np.float64)
+            for v in (xmin, ymin, width, height)
+        )
+        return cls(np.stack([xmin, ymin, xmin + width, ymin + height], -1))
+
+    @classmethod
+    def from_arrow(
+        cls, array: Union[pa.StructArray, pa.ChunkedArray]
+    ) -> Box2dArray:
+        """Build from an Arrow struct column of ``Box2dType``, without
+        creating a :py:class:`Box2d` per row.
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = (
+                pa.concat_arrays(array.chunks)
+                if array.num_chunks
+                else pa.array([], type=array.type)
+            )
+        return cls(
+            np.stack(
+                [
+                    array.field(name).to_numpy(zero_copy_only=False)
+                    for name in cls._FIELDS
+                ],
+                axis=-1,
+            )
+        )
+
+    def to_arrow(self) -> pa.StructArray:
+        """Convert to an Arrow struct column of ``Box2dType``."""
+        return pa.StructArray.from_arrays(
+            [pa.array(self._data[:, i]) for i in range(4)],
+            names=self._FIELDS,
+        )
+
+    def __repr__(self) -> str:
+        return f"Box2dArray({self._data})"
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __getitem__(
+        self, key: Union[int, slice, np.ndarray]
+    ) -> Union[Box2d, Box2dArray]:
+        if isinstance(key, (int, np.integer)):
+            return Box2d._from_trusted(*self._data[key].tolist())
+        return Box2dArray(self._data[key])
+
+    def __iter__(self) -> Iterator[Box2d]:
+        for row in self._data.tolist():
+            yield Box2d._from_trusted(*row)
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, Box2dArray) and np.array_equal(
+            self._data, o._data
+        )
+
+    def __truediv__(self, scale: Union[int, float, Tuple]) -> Box2dArray:
+        """Scale down all the boxes, see :py:meth:`Box2d.__truediv__`."""
+        x_scale, y_scale = Box2d._verified_scale(scale)
+        return Box2dArray(
+            self._data / np.array([x_scale, y_scale, x_scale, y_scale])
+        )
+
+    def __mul__(self, scale: Union[int, float, Tuple]) -> Box2dArray:
+        """Scale up all the boxes, see :py:meth:`Box2d.__mul__`."""
+        x_scale, y_scale = Box2d._verified_scale(scale)
+        return Box2dArray(
+            self._data * np.array([x_scale, y_scale, x_scale, y_scale])
+        )
+
+    @property
+    def xmin(self) -> np.ndarray:
+        return self._data[:, 0]
+
+    @property
+    def ymin(self) -> np.ndarray:
+        return self._data[:, 1]
+
+    @property
+    def xmax(self) -> np.ndarray:
+        return self._data[:, 2]
+
+    @property
+    def ymax(self) -> np.ndarray:
+        return self._data[:, 3]
+
+    @property
+    def width(self) -> np.ndarray:
+        return self.xmax - self.xmin
+
+    @property
+    def height(self) -> np.ndarray:
+        return self.ymax - self.ymin
+
+    @property
+    def area(self) -> np.ndarray:
+        """Areas of the bounding boxes"""
+        return Box2d._area(self._data)
+
+    def clip(self, width: float, height: float) -> Box2dArray:
+        """Clip the boxes into an image of ``width`` x ``height``."""
+        return Box2dArray(
+            np.clip(self._data, 0, [width, height, width, height])
+        )
+
+    def ious(
+        self, other: Union[Box2dArray, List[Box2d], np.ndarray]
+    ) -> Optional[np.ndarray]:
+        """Compute the N*M intersection over union(IOU) matrix.
+
+        See Also
+        --------
+        :py:meth:`Box2d.ious`
+        """
+        return Box2d.ious(self, other)
+
+    def to_numpy(self) -> np.ndarray:
+        """Returns the ``(N, 4)`` array of ``(xmin, ymin, xmax, ymax)``."""
+        return self._data
+
+    def to_list(self) -> List[Box2d]:
+        return list(self)
+
+
+def _pairwise_ious(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """IoU matrix of two non-empty ``(N, 4)`` and ``(M, 4)`` arrays."""
+    return Box2d.ious(boxes1, boxes2)
+
+
+def _class_offset_boxes(
+    boxes: np.ndarray, labels: Optional[Sequence]
+) -> np.ndarray:
+    """Shift the boxes of each class apart, so that boxes of different
+    classes never overlap, and one pass of NMS works per class.
+    """
+    if labels is None or len(boxes) == 0:
+        return boxes
+    _, class_ids = np.unique(np.asarray(labels), return_inverse=True)
+    low, high = boxes.min(), boxes.max()
+    offset = class_ids.astype(np.float64) * (high - low + 1) - low
+    return boxes + offset[:, np.newaxis]
+
+
+def nms(
+    boxes: Union[List[Box2d], np.ndarray, Box2dArray],
+    scores: Sequence[float],
+    iou_threshold: float = 0.5,
+    labels: Optional[Sequence] = None,
+) -> np.ndarray:
+    """Non-maximum suppression (NMS).
+
+    Boxes are visited by descending score, and a box is dropped if it
+    overlaps a kept box by more than ``iou_threshold``. The IoUs are
+    computed in tiles, so the memory stays bounded for a large number of
+    boxes.
+
+    Parameters
+    ----------
+    boxes : list of Box2d, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+        N boxes.
+    scores : array-like
+        The N scores of the boxes.
+    iou_threshold : float, default 0.5
+        Boxes that overlap more than this are suppressed.
+    labels : array-like, optional
+        The N class labels of the boxes. If provided, NMS applies to the
+        boxes of each class independently.
+
+    Return
+    ------
+    :py:class:`numpy.ndarray`
+        Indices of the kept boxes, by descending score.
+    """  # noqa: E501
+    boxes = Box2d._to_array(boxes)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(-scores, kind="stable")
+    boxes = _class_offset_boxes(boxes, labels)[order]
+
+    count = len(boxes)
+    suppressed = np.zeros(count, dtype=bool)
+    for start in range(0, count, _IOU_TILE_SIZE):
+        end = min(start + _IOU_TILE_SIZE, count)
+        # Suppress within the tile, in score order.
+        tile_ious = _pairwise_ious(boxes[start:end], boxes[start:end])
+        for i in range(end - start):
+            if not suppressed[start + i]:
+                suppressed[start + i + 1 : end] |= (
+                    tile_ious[i, i + 1 :] > iou_threshold
+                )
+        kept = start + np.flatnonzero(~suppressed[start:end])
+        if len(kept) == 0:
+            continue
+        # Then suppress the following boxes by the kept boxes of the tile.
+        for col in range(end, count, _IOU_TILE_SIZE):
+            col_end = min(col + _IOU_TILE_SIZE, count)
+            remaining = col + np.flatnonzero(~suppressed[col:col_end])
+            if len(remaining) > 0:
+                suppressed[remaining] = (
+                    _pairwise_ious(boxes[kept], boxes[remaining])
+                    > iou_threshold
+                ).any(axis=0)
+    return order[~suppressed]
+
+
+def soft_nms(
+    boxes: Union[List[Box2d], np.ndarray, Box2dArray],
+    scores: Sequence[float],
+    sigma: float = 0.5,
+    iou_threshold: float = 0.3,
+    score_threshold: float = 0.001,
+    method: str = "gaussian",
+    labels: Optional[Sequence] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Soft non-maximum suppression.
+
+    Instead of dropping the overlapping boxes, their scores are decayed by
+    the overlap with the selected box, and boxes whose score falls below
+    ``score_threshold`` are dropped.
+
+    Parameters
+    ----------
+    boxes : list of Box2d, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+        N boxes.
+    scores : array-like
+        The N scores of the boxes.
+    sigma : float, default 0.5
+        The variance of the ``gaussian`` decay, ``exp(-iou^2 / sigma)``.
+    iou_threshold : float, default 0.3
+        The overlap above which the ``linear`` decay, ``1 - iou``, applies.
+    score_threshold : float, default 0.001
+        The minimal score of a kept box.
+    method : str, default "gaussian"
+        The score decay, either ``gaussian`` or ``linear``.
+    labels : array-like, optional
+        The N class labels of the boxes. If provided, soft-NMS applies to the
+        boxes of each class independently.
+
+    Return
+    ------
+    Tuple[:py:class:`numpy.ndarray`, :py:class:`numpy.ndarray`]
+        Indices of the kept boxes, and their decayed scores, by descending
+        decayed score.
+
+    References
+    ----------
+    - Bodla et al., Soft-NMS -- Improving Object Detection With One Line of
+      Code, ICCV 2017.
+    """  # noqa: E501
+    if method not in ("gaussian", "linear"):
+        raise ValueError(f"Unsupported soft-NMS method: {method}")
+    boxes = _class_offset_boxes(Box2d._to_array(boxes), labels)
+    scores = np.array(scores, dtype=np.float64)
+
+    indices = np.arange(len(boxes))
+    kept, kept_scores = [], []
+    while len(indices) > 0:
+        best = np.argmax(scores[indices])
+        selected = indices[best]
+        kept.append(selected)
+        kept_scores.append(scores[selected])
+        indices = np.delete(indices, best)
+        if len(indices) == 0:
+            break
+        overlaps = _pairwise_ious(boxes[[selected]], boxes[indices])[0]
+        if method == "gaussian":
+            decay = np.exp(-(overlaps**2) / sigma)
+        else:
+            decay = np.where(overlaps > iou_threshold, 1 - overlaps, 1.0)
+        scores[indices] *= decay
+        indices = indices[scores[indices] >= score_threshold]
+    return (
+        np.array(kept, dtype=np.int64),
+        np.array(kept_scores, dtype=np.float64),
+    )
+
+
+def _linear_sum_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimal cost assignment of a ``(N, M)`` cost matrix, using the
+    shortest augmenting path (Hungarian) algorithm.
+
+    Returns the row and column indices of the assignment, sorted by rows.
+    """
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, cols = cost.shape
+    # Potentials and assignments are 1-based, where 0 is a virtual column.
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    assigned = np.zeros(cols + 1, dtype=np.int64)
+    way = np.zeros(cols + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        assigned[0] = row
+        col0 = 0
+        min_slack = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            row0 = assigned[col0]
+            free = ~used
+            slack = cost[row0 - 1] - u[row0] - v[1:]
+            better = free[1:] & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = col0
+            col1 = int(np.argmin(np.where(free, min_slack, np.inf)))
+            delta = min_slack[col1]
+            u[assigned[used]] += delta
+            v[used] -= delta
+            min_slack[free] -= delta
+            col0 = col1
+            if assigned[col0] == 0:
+                break
+        while col0 != 0:
+            col1 = way[col0]
+            assigned[col0] = assigned[col1]
+            col0 = col1
+
+    col_ind = np.flatnonzero(assigned[1:])
+    row_ind = assigned[1:][col_ind] - 1
+    if transposed:
+        row_ind, col_ind = col_ind, row_ind
+    order = np.argsort(row_ind)
+    return row_ind[order], col_ind[order]
+
+
+def match_boxes(
+    ground_truth: Union[List[Box2d], np.ndarray, Box2dArray],
+    predictions: Union[List[Box2d], np.ndarray, Box2dArray],
+    iou_threshold: float = 0.5,
+    scores: Optional[Sequence[float]] = None,
+    method: str = "greedy",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Match predicted boxes to ground truth boxes by IoU.
+
+    Parameters
+    ----------
+    ground_truth : list of Box2d, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+        N ground truth boxes.
+    predictions : list of Box2d, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+        M predicted boxes.
+    iou_threshold : float, default 0.5
+        The minimal IoU of a matched pair.
+    scores : array-like, optional
+        The M scores of the predictions. The ``greedy`` method visits the
+        predictions by descending score, or in the given order if not set.
+    method : str, default "greedy"
+        ``greedy`` matches each prediction to the unmatched ground truth
+        box with the highest IoU, as in the COCO evaluation.
+        ``hungarian`` finds the one-to-one matching that maximizes the
+        total IoU.
+
+    Return
+    ------
+    Tuple[:py:class:`numpy.ndarray`, :py:class:`numpy.ndarray`]
+        The indices of the matched ground truth boxes, and of the matched
+        predictions.
+    """  # noqa: E501
+    if method not in ("greedy", "hungarian"):
+        raise ValueError(f"Unsupported matching method: {method}")
+    ground_truth = Box2d._to_array(ground_truth)
+    predictions = Box2d._to_array(predictions)
+    if len(ground_truth) == 0 or len(predictions) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    if method == "hungarian":
+        ious = _pairwise_ious(ground_truth, predictions)
+        gt_ind, pred_ind = _linear_sum_assignment(
+            -np.where(ious >= iou_threshold, ious, 0)
+        )
+        matched = ious[gt_ind, pred_ind] >= iou_threshold
+        return gt_ind[matched], pred_ind[matched]
+
+    if scores is None:
+        order = np.arange(len(predictions))
+    else:
+        order = np.argsort(-np.asarray(scores), kind="stable")
+    gt_matched = np.zeros(len(ground_truth), dtype=bool)
+    gt_ind, pred_ind = [], []
+    for start in range(0, len(order), _IOU_TILE_SIZE):
+        tile = order[start : start + _IOU_TILE_SIZE]
+        tile_ious = _pairwise_ious(predictions[tile], ground_truth)
+        tile_ious[tile_ious < iou_threshold] = -1
+        for pred, row in zip(tile, tile_ious):
+            row[gt_matched] = -1
+            best = int(np.argmax(row))
+            if row[best] >= 0:
+                gt_matched[best] = True
+                gt_ind.append(best)
+                pred_ind.append(pred)
+    return (
+        np.array(gt_ind, dtype=np.int64),
+        np.array(pred_ind, dtype=np.int64),
+    )
+
+
+def _intersects(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Whether each pair of boxes intersects or touches."""
+    return (
+        (boxes1[:, 0] <= boxes2[:, 2])
+        & (boxes2[:, 0] <= boxes1[:, 2])
+        & (boxes1[:, 1] <= boxes2[:, 3])
+        & (boxes2[:, 1] <= boxes1[:, 3])
+    )
+
+
+def _elementwise_ious(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """IoU of each pair of boxes of two ``(N, 4)`` arrays."""
+    inter = np.maximum(
+        0,
+        np.minimum(boxes1[:, 2], boxes2[:, 2])
+        - np.maximum(boxes1[:, 0], boxes2[:, 0]),
+    ) * np.maximum(
+        0,
+        np.minimum(boxes1[:, 3], boxes2[:, 3])
+        - np.maximum(boxes1[:, 1], boxes2[:, 1]),
+    )
+    return inter / (Box2d._area(boxes1) + Box2d._area(boxes2) - inter)
+
+
+def _str_order(bounds: np.ndarray, capacity: int) -> np.ndarray:
+    """Sort-Tile-Recursive (STR) order of boxes, in which each run of
+    ``capacity`` boxes makes a compact tile.
+    """
+    count = len(bounds)
+    tiles = -(-count // capacity)
+    slabs = int(np.ceil(np.sqrt(tiles)))
+    slab_size = capacity * -(-tiles // slabs)
+    slab_ids = np.empty(count, dtype=np.int64)
+    slab_ids[np.argsort(bounds[:, 0] + bounds[:, 2], kind="stable")] = (
+        np.arange(count) // slab_size
+    )
+    return np.lexsort((bounds[:, 1] + bounds[:, 3], slab_ids))
+
+
+class Box2dIndex:
+    """A spatial index over 2-D bounding boxes, i.e., a R-tree bulk loaded
+    with the Sort-Tile-Recursive (STR) packing.
+
+    Queries traverse the tree for many query boxes at once, level by level,
+    so that the whole search stays in numpy.
+
+    Parameters
+    ----------
+    boxes : list of Box2d, :py:class:`numpy.ndarray` or :py:class:`Box2dArray`
+        The boxes to index.
+    ids : array-like, optional
+        The ids of the boxes, returned by the queries. Defaults to the
+        positions of the boxes.
+    node_capacity : int, default 16
+        The max number of children of a tree node.
+
+    Example
+    -------
+
+    >>> index = Box2dIndex(boxes)
+    >>> index.intersection(Box2d(0, 0, 100, 100))
+    array([ 3, 42])
+    >>> # Find duplicated boxes
+    >>> query, ids, ious = index.iou_pairs(boxes, threshold=0.9)
+
+    References
+    ----------
+    - Leutenegger et al., STR: A Simple and Efficient Algorithm for R-Tree
+      Packing, ICDE 1997.
+    """  # noqa: E501
+
+    # Number of query boxes to traverse the tree with at a time.
+    _QUERY_BATCH_SIZE = 4096
+
+    def __init__(
+        self,
+        boxes: Union[List[Box2d], np.ndarray, Box2dArray],
+        ids: Optional[Sequence[int]] = None,
+        node_capacity: int = 16,
+    ):
+        if node_capacity < 2:
+            raise ValueError("node_capacity must be at least 2")
+        boxes = self._queries(boxes)
+        ids = np.arange(len(boxes)) if ids is None else np.asarray(ids)
+        if len(ids) != len(boxes):
+            raise ValueError("boxes and ids must have the same length")
+        self.node_capacity = node_capacity
+
+        order = (
+            _str_order(boxes, node_capacity)
+            if len(boxes)
+            else np.zeros(0, dtype=np.int64)
+        )
+        self._boxes = boxes[order]
+        self._ids = ids[order]
+        # (bounds, first child, number of children) of the nodes of each
+        # level, from the leaves to the root.
+        self._levels: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        children = self._boxes
+        while len(children) > 0:
+            start = np.arange(0, len(children), node_capacity)
+            count = np.minimum(node_capacity, len(children) - start)
+            bounds = np.column_stack(
+                [
+                    np.minimum.reduceat(children[:, 0], start),
+                    np.minimum.reduceat(children[:, 1], start),
+                    np.maximum.reduceat(children[:, 2], start),
+                    np.maximum.reduceat(children[:, 3], start),
+                ]
+            )
+            if len(bounds) > 1:
+                # The nodes are packed by STR too, for the next level.
+                order = _str_order(bounds, node_capacity)
+                bounds, start, count = (
+                    bounds[order],
+                    start[order],
+                    count[order],
+                )
+            self._levels.append((bounds, start, count))
+            if len(bounds) == 1:
+                break
+            children = bounds
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __repr__(self) -> str:
+        return f"Box2dIndex(boxes={len(self)}, depth={len(self._levels)})"
+
+    def _search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the pairs of (query, leaf entry) that intersect."""
+        if len(self._levels) == 0 or len(queries) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        query = np.arange(len(queries))
+        node = np.zeros(len(queries), dtype=np.int64)
+        for bounds, start, count in reversed(self._levels):
+            hit = _intersects(queries[query], bounds[node])
+            query, node = query[hit], node[hit]
+            # Expand the nodes into their children.
+            fanout = count[node]
+            query = np.repeat(query, fanout)
+            offsets = np.arange(len(query)) - np.repeat(
+                np.cumsum(fanout) - fanout, fanout
+            )
+            node = np.repeat(start[node], fanout) + offsets
+        hit = _intersects(queries[query], self._boxes[node])
+        return query[hit], node[hit]
+
+    def _search_batches(
+        self, queries: np.ndarray
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for offset in range(0, len(queries), self._QUERY_BATCH_SIZE):
+            batch = queries[offset : offset + self._QUERY_BATCH_SIZE]
+            query, entry = self._search(batch)
+            yield query + offset, entry
+
+    @staticmethod
+    def _queries(boxes) -> np.ndarray:
+        if isinstance(boxes, Box2d):
+            boxes = [boxes]
+        return Box2d._to_array(boxes).astype(np.float64).reshape(-1, 4)
+
+    def intersection_pairs(
+        self, boxes: Union[List[Box2d], np.ndarray, Box2dArray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the indexed boxes that intersect or touch each query box.
+
+        Return
+        ------
+        Tuple[:py:class:`numpy.ndarray`, :py:class:`numpy.ndarray`]
+            ``(query, ids)``, the positions of the query boxes and the ids
+            of the indexed boxes, sorted by ``(query, ids)``.
+        """
+        queries = self._queries(boxes)
+        pairs = list(self._search_batches(queries))
+        if not pairs:
+            return np.zeros(0, dtype=np.int64), self._ids[:0]
+        query = np.concatenate([q for q, _ in pairs])
+        ids = self._ids[np.concatenate([e for _, e in pairs])]
+        order = np.lexsort((ids, query))
+        return query[order], ids[order]
+
+    def intersection(self, box: Union[Box2d, Sequence[float]]) -> np.ndarray:
+        """Ids of the indexed boxes that intersect or touch a box."""
+        return self.intersection_pairs([box])[1]
+
+    def iou_pairs(
+        self,
+        boxes: Union[List[Box2d], np.ndarray, Box2dArray],
+        threshold: float = 0.5,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the indexed boxes whose IoU with each query box is at least
+        ``threshold``, which must be positive.
+
+        Return
+        ------
+        Tuple[:py:class:`numpy.ndarray`, ...]
+            ``(query, ids, ious)`` sorted by ``(query, ids)``.
+        """
+        if threshold <= 0:
+            raise ValueError("IoU threshold must be positive")
+        queries = self._queries(boxes)
+        results = []
+        for query, entry in self._search_batches(queries):
+            ious = _elementwise_ious(queries[query], self._boxes[entry])
+            matched = ious >= threshold
+            results.append(
+                (query[matched], self._ids[entry[matched]], ious[matched])
+            )
+        if not results:
+            return np.zeros(0, dtype=np.int64), self._ids[:0], np.zeros(0)
+        query, ids, ious = (np.concatenate(r) for r in zip(*results))
+        order = np.lexsort((ids, query))
+        return query[order], ids[order], ious[order]
+
+    def save(self, uri: str) -> None:
+        """Save the index, i.e., into the ``_rikai`` directory of a dataset.
+
+        See Also
+        --------
+        :py:meth:`rikai.parquet.Dataset.build_box_index`
+        """
+        from rikai.io import _create_parent_dir, open_output_stream
+
+        arrays = {"boxes": self._boxes, "ids": self._ids}
+        for level, (bounds, start, count) in enumerate(self._levels):
+            arrays[f"bounds_{level}"] = bounds
+            arrays[f"start_{level}"] = start
+            arrays[f"count_{level}"] = count
+        buf = BytesIO()
+        np.savez(
+            buf,
+            node_capacity=self.node_capacity,
+            levels=len(self._levels),
+            **arrays,
+        )
+        _create_parent_dir(uri)
+        with open_output_stream(uri) as fobj:
+            fobj.write(buf.getvalue())
+
+    @classmethod
+    def load(cls, uri: str) -> Box2dIndex:
+        """Load an index saved by :py:meth:`save`."""
+        from rikai.io import open_uri
+
+        with open_uri(uri) as fobj:
+            arrays = np.load(BytesIO(fobj.read()))
+        index = cls.__new__(cls)
+        index.node_capacity = int(arrays["node_capacity"])
+        index._boxes = arrays["boxes"]
+        index._ids = arrays["ids"]
+        index._levels = [
+            (
+                arrays[f"bounds_{level}"],
+                arrays[f"start_{level}"],
+                arrays[f"count_{level}"],
+            )
+            for level in range(int(arrays["levels"]))
+        ]
+        return index
+
+
 class Box3d(ToNumpy, ToDict):
     """A 3-D bounding box
 
@@ -418,6 +1522,8 @@ class Box3d(ToNumpy, ToDict):
 
     __UDT__ = Box3dType()
 
+    __slots__ = ("center", "length", "width", "height", "heading")
+
     def __init__(
         self,
         center: Point,
@@ -432,6 +1538,26 @@ class Box3d(ToNumpy, ToDict):
         self.height = float(height)
         self.heading = float(heading)
 
+    @classmethod
+    def _from_trusted(
+        cls,
+        center: Point,
+        length: float,
+        width: float,
+        height: float,
+        heading: float,
+    ) -> Box3d:
+        """Build a box from a center :py:class:`Point` and float dimensions
+        without conversion, i.e., read back by the UDT.
+        """
+        box = cls.__new__(cls)
+        box.center = center
+        box.length = length
+        box.width = width
+        box.height = height
+        box.heading = heading
+        return box
+
     def __repr__(self) -> str:
         return (
             f"Box3d(center={self.center}, l={self.length}, "
@@ -449,7 +1575,181 @@ class Box3d(ToNumpy, ToDict):
         )
 
     def to_numpy(self) -> np.ndarray:
-        return None
+        """Returns ``[x, y, z, length, width, height, heading]``."""
+        return np.array(
+            [
+                self.center.x,
+                self.center.y,
+                self.center.z,
+                self.length,
+                self.width,
+                self.height,
+                self.heading,
+            ]
+        )
+
+    @staticmethod
+    def _to_array(
+        boxes: Union[List[Box3d], np.ndarray, Box3dArray]
+    ) -> np.ndarray:
+        """Convert boxes to a ``(N, 7)`` array of
+        ``(x, y, z, length, width, height, heading)``.
+        """
+        if isinstance(boxes, Box3dArray):
+            return boxes.to_numpy()
+        if isinstance(boxes, np.ndarray):
+            return boxes.astype(np.float64).reshape(-1, 7)
+        return np.array(
+            [box.to_numpy() for box in boxes], dtype=np.float64
+        ).reshape(-1, 7)
+
+    @staticmethod
+    def _corners(boxes: np.ndarray) -> np.ndarray:
+        """The ``(N, 8, 3)`` corners of ``(N, 7)`` boxes. The 4 bottom corners
+        come first, counter-clockwise from the front left one when seen from
+        above, followed by the 4 top corners in the same order.
+        """
+        x, y, z, length, width, height, heading = boxes.T
+        signs = np.array([[1, 1], [-1, 1], [-1, -1], [1, -1]])
+        # (N, 4) offsets of the corners in the box frame.
+        dx = signs[:, 0] * length[:, None] / 2
+        dy = signs[:, 1] * width[:, None] / 2
+        cos, sin = np.cos(heading)[:, None], np.sin(heading)[:, None]
+        corner_x = x[:, None] + dx * cos - dy * sin
+        corner_y = y[:, None] + dx * sin + dy * cos
+        bottom = np.broadcast_to((z - height / 2)[:, None], corner_x.shape)
+        top = np.broadcast_to((z + height / 2)[:, None], corner_x.shape)
+        return np.stack(
+            [
+                np.tile(corner_x, 2),
+                np.tile(corner_y, 2),
+                np.hstack([bottom, top]),
+            ],
+            axis=-1,
+        )
+
+    @property
+    def corners(self) -> np.ndarray:
+        """The ``(8, 3)`` corners of the box.
+
+        See Also
+        --------
+        :py:meth:`Box3dArray.corners`
+        """
+        return self._corners(self.to_numpy()[np.newaxis])[0]
+
+    @property
+    def volume(self) -> float:
+        return self.length * self.width * self.height
+
+    @staticmethod
+    def _rotated_ious(
+        boxes1: Union[List[Box3d], np.ndarray, Box3dArray],
+        boxes2: Union[List[Box3d], np.ndarray, Box3dArray],
+        bev: bool,
+    ) -> np.ndarray:
+        boxes1, boxes2 = Box3d._to_array(boxes1), Box3d._to_array(boxes2)
+        result = np.zeros((len(boxes1), len(boxes2)))
+        if len(boxes1) == 0 or len(boxes2) == 0:
+            return result
+        corners1 = Box3d._corners(boxes1)[:, :4, :2]
+        corners2 = Box3d._corners(boxes2)[:, :4, :2]
+        # Boxes can only overlap if their circumscribed circles do.
+        radius1 = np.hypot(boxes1[:, 3], boxes1[:, 4]) / 2
+        radius2 = np.hypot(boxes2[:, 3], boxes2[:, 4]) / 2
+        if bev:
+            sizes1 = boxes1[:, 3] * boxes1[:, 4]
+            sizes2 = boxes2[:, 3] * boxes2[:, 4]
+        else:
+            sizes1 = boxes1[:, 3] * boxes1[:, 4] * boxes1[:, 5]
+            sizes2 = boxes2[:, 3] * boxes2[:, 4] * boxes2[:, 5]
+
+        tile = _ROTATED_IOU_TILE_SIZE
+        for row in range(0, len(boxes1), tile):
+            for col in range(0, len(boxes2), tile):
+                b1 = boxes1[row : row + tile]
+                b2 = boxes2[col : col + tile]
+                distance = np.hypot(
+                    b1[:, None, 0] - b2[None, :, 0],
+                    b1[:, None, 1] - b2[None, :, 1],
+                )
+                near = distance <= (
+                    radius1[row : row + tile, None]
+                    + radius2[None, col : col + tile]
+                )
+                if not bev:
+                    near &= (
+                        np.abs(b1[:, None, 2] - b2[None, :, 2])
+                        <= (b1[:, None, 5] + b2[None, :, 5]) / 2
+                    )
+                i, j = np.nonzero(near)
+                i, j = i + row, j + col
+                inter = _convex_intersection_areas(corners1[i], corners2[j])
+                if not bev:
+                    inter *= np.maximum(
+                        0,
+                        np.minimum(
+                            boxes1[i, 2] + boxes1[i, 5] / 2,
+                            boxes2[j, 2] + boxes2[j, 5] / 2,
+                        )
+                        - np.maximum(
+                            boxes1[i, 2] - boxes1[i, 5] / 2,
+                            boxes2[j, 2] - boxes2[j, 5] / 2,
+                        ),
+                    )
+                union = sizes1[i] + sizes2[j] - inter
+                result[i, j] = np.divide(
+                    inter, union, out=np.zeros_like(inter), where=union > 0
+                )
+        return result
+
+    @staticmethod
+    def bev_ious(
+        boxes1: Union[List[Box3d], np.ndarray, Box3dArray],
+        boxes2: Union[List[Box3d], np.ndarray, Box3dArray],
+    ) -> np.ndarray:
+        """Compute the N*M bird's-eye-view (BEV) IoU matrix of rotated boxes,
+        i.e., the IoU of their footprints on the x-y plane.
+
+        The boxes are compared tile by tile, and the exact footprint
+        intersections are only computed for the pairs of boxes that are close
+        enough to overlap.
+
+        Parameters
+        ----------
+        boxes1 : list of Box3d, :py:class:`numpy.ndarray` or :py:class:`Box3dArray`
+            N boxes, or a ``(N, 7)`` array of
+            ``(x, y, z, length, width, height, heading)``.
+        boxes2 : list of Box3d, :py:class:`numpy.ndarray` or :py:class:`Box3dArray`
+            M boxes.
+
+        Return
+        ------
+        np.ndarray
+            A ``N x M`` matrix.
+        """  # noqa: E501
+        return Box3d._rotated_ious(boxes1, boxes2, bev=True)
+
+    @staticmethod
+    def ious(
+        boxes1: Union[List[Box3d], np.ndarray, Box3dArray],
+        boxes2: Union[List[Box3d], np.ndarray, Box3dArray],
+    ) -> np.ndarray:
+        """Compute the N*M 3-D IoU matrix of rotated boxes.
+
+        See Also
+        --------
+        :py:meth:`bev_ious`
+        """
+        return Box3d._rotated_ious(boxes1, boxes2, bev=False)
+
+    def bev_iou(self, other: Box3d) -> float:
+        """The bird's-eye-view IoU of two boxes."""
+        return float(Box3d.bev_ious([self], [other])[0, 0])
+
+    def iou(self, other: Box3d) -> float:
+        """The 3-D IoU of two boxes."""
+        return float(Box3d.ious([self], [other])[0, 0])
 
     def to_dict(self) -> dict:
         return {
@@ -461,6 +1761,246 @@ class Box3d(ToNumpy, ToDict):
         }
 
 
+def _inside_convex(points: np.ndarray, polygons: np.ndarray) -> np.ndarray:
+    """Whether each of ``(P, K, 2)`` points is inside or on the ``(P, 4, 2)``
+    counter-clockwise polygon of its pair.
+    """
+    edges = np.roll(polygons, -1, axis=1) - polygons
+    # (P, K, 4) cross products of the edges and the points.
+    cross = edges[:, None, :, 0] * (
+        points[:, :, None, 1] - polygons[:, None, :, 1]
+    ) - edges[:, None, :, 1] * (
+        points[:, :, None, 0] - polygons[:, None, :, 0]
+    )
+    return np.all(cross >= -1e-9, axis=-1)
+
+
+def _convex_intersection_areas(
+    polygons1: np.ndarray, polygons2: np.ndarray
+) -> np.ndarray:
+    """The intersection areas of pairs of ``(P, 4, 2)`` counter-clockwise
+    quadrilaterals, e.g., the footprints of rotated boxes.
+
+    The intersection of two convex polygons is the convex polygon of the
+    vertices of each polygon inside the other, and of the crossings of their
+    edges. All the candidate vertices of a pair are sorted by their angle
+    around their centroid, and the area is given by the shoelace formula.
+    """
+    if len(polygons1) == 0:
+        return np.zeros(0)
+    # (P, 4, 4) crossings of each edge p + t * r of polygon 1 with each
+    # edge q + u * s of polygon 2.
+    p = polygons1[:, :, None]
+    r = (np.roll(polygons1, -1, axis=1) - polygons1)[:, :, None]
+    q = polygons2[:, None]
+    s = (np.roll(polygons2, -1, axis=1) - polygons2)[:, None]
+    denom = r[..., 0] * s[..., 1] - r[..., 1] * s[..., 0]
+    qp = q - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (qp[..., 0] * s[..., 1] - qp[..., 1] * s[..., 0]) / denom
+        u = (qp[..., 0] * r[..., 1] - qp[..., 1] * r[..., 0]) / denom
+    crossing = (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    # Parallel edges have an infinite or NaN t, but no crossing.
+    t = np.where(crossing, t, 0)
+    crossings = (p + t[..., None] * r).reshape(-1, 16, 2)
+
+    points = np.concatenate([polygons1, polygons2, crossings], axis=1)
+    valid = np.concatenate(
+        [
+            _inside_convex(polygons1, polygons2),
+            _inside_convex(polygons2, polygons1),
+            crossing.reshape(-1, 16),
+        ],
+        axis=1,
+    )
+    count = valid.sum(axis=1)
+    points = np.where(valid[..., None], points, 0)
+    centroid = points.sum(axis=1) / np.maximum(count, 1)[:, None]
+    angle = np.arctan2(
+        points[..., 1] - centroid[:, None, 1],
+        points[..., 0] - centroid[:, None, 0],
+    )
+    order = np.argsort(np.where(valid, angle, np.inf), axis=1)
+    points = np.take_along_axis(points, order[..., None], axis=1)
+    # Invalid points, sorted last, collapse onto the first point, so that
+    # they add nothing to the area.
+    valid = np.arange(points.shape[1]) < count[:, None]
+    points = np.where(valid[..., None], points, points[:, :1])
+    following = np.roll(points, -1, axis=1)
+    area = (
+        np.sum(
+            points[..., 0] * following[..., 1]
+            - points[..., 1] * following[..., 0],
+            axis=1,
+        )
+        / 2
+    )
+    return np.where(count >= 3, np.abs(area), 0.0)
+
+
+class Box3dArray(ToNumpy, Sequence):
+    """A columnar array of 3-D bounding boxes, backed by a ``(N, 7)``
+    array of ``(x, y, z, length, width, height, heading)``.
+
+    Indexing with an integer builds a :py:class:`Box3d` on access, while
+    indexing with a slice, a boolean mask or an index array returns a
+    :py:class:`Box3dArray`.
+
+    Parameters
+    ----------
+    data : array-like
+        A ``(N, 7)`` array of ``(x, y, z, length, width, height, heading)``.
+
+    Example
+    -------
+
+    >>> boxes = Box3dArray.from_arrow(table.column("box"))
+    >>> boxes.corners.shape
+    (1000, 8, 3)
+    >>> boxes.bev_ious(boxes)
+    """
+
+    _FIELDS = ["length", "width", "height", "heading"]
+
+    def __init__(self, data: Union[np.ndarray, Sequence]):
+        data = np.asarray(data, dtype=np.float64)
+        if data.size == 0:
+            data = data.reshape(0, 7)
+        if data.ndim != 2 or data.shape[1] != 7:
+            raise ValueError(
+                f"Box3dArray expects a (N, 7) array, got {data.shape}"
+            )
+        self._data = data
+
+    @classmethod
+    def from_boxes(cls, boxes: Sequence[Box3d]) -> Box3dArray:
+        """Build from a sequence of :py:class:`Box3d`."""
+        return cls(Box3d._to_array(boxes))
+
+    @classmethod
+    def from_arrow(
+        cls, array: Union[pa.StructArray, pa.ChunkedArray]
+    ) -> Box3dArray:
+        """Build from an Arrow struct column of ``Box3dType``, without
+        creating a :py:class:`Box3d` per row.
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = (
+                pa.concat_arrays(array.chunks)
+                if array.num_chunks
+                else pa.array([], type=array.type)
+            )
+        center = array.field("center")
+        columns = [center.field(name) for name in ["x", "y", "z"]] + [
+            array.field(name) for name in cls._FIELDS
+        ]
+        return cls(
+            np.stack(
+                [c.to_numpy(zero_copy_only=False) for c in columns], axis=-1
+            )
+        )
+
+    def to_arrow(self) -> pa.StructArray:
+        """Convert to an Arrow struct column of ``Box3dType``."""
+        center = pa.StructArray.from_arrays(
+            [pa.array(self._data[:, i]) for i in range(3)],
+            names=["x", "y", "z"],
+        )
+        return pa.StructArray.from_arrays(
+            [center] + [pa.array(self._data[:, i]) for i in range(3, 7)],
+            names=["center"] + self._FIELDS,
+        )
+
+    def __repr__(self) -> str:
+        return f"Box3dArray({self._data})"
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __getitem__(
+        self, key: Union[int, slice, np.ndarray]
+    ) -> Union[Box3d, Box3dArray]:
+        if isinstance(key, (int, np.integer)):
+            x, y, z, length, width, height, heading = self._data[key].tolist()
+            return Box3d._from_trusted(
+                Point._from_trusted(x, y, z), length, width, height, heading
+            )
+        return Box3dArray(self._data[key])
+
+    def __iter__(self) -> Iterator[Box3d]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, Box3dArray) and np.array_equal(
+            self._data, o._data
+        )
+
+    @property
+    def center(self) -> np.ndarray:
+        """The ``(N, 3)`` centers of the boxes."""
+        return self._data[:, :3]
+
+    @property
+    def length(self) -> np.ndarray:
+        return self._data[:, 3]
+
+    @property
+    def width(self) -> np.ndarray:
+        return self._data[:, 4]
+
+    @property
+    def height(self) -> np.ndarray:
+        return self._data[:, 5]
+
+    @property
+    def heading(self) -> np.ndarray:
+        return self._data[:, 6]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.length * self.width * self.height
+
+    @property
+    def corners(self) -> np.ndarray:
+        """The ``(N, 8, 3)`` corners of the boxes. The 4 bottom corners come
+        first, counter-clockwise from the front left one when seen from
+        above, followed by the 4 top corners in the same order.
+        """
+        return Box3d._corners(self._data)
+
+    def bev_ious(
+        self, other: Union[Box3dArray, List[Box3d], np.ndarray]
+    ) -> np.ndarray:
+        """Compute the N*M bird's-eye-view IoU matrix.
+
+        See Also
+        --------
+        :py:meth:`Box3d.bev_ious`
+        """
+        return Box3d.bev_ious(self, other)
+
+    def ious(
+        self, other: Union[Box3dArray, List[Box3d], np.ndarray]
+    ) -> np.ndarray:
+        """Compute the N*M 3-D IoU matrix.
+
+        See Also
+        --------
+        :py:meth:`Box3d.ious`
+        """
+        return Box3d.ious(self, other)
+
+    def to_numpy(self) -> np.ndarray:
+        """Returns the ``(N, 7)`` array of
+        ``(x, y, z, length, width, height, heading)``.
+        """
+        return self._data
+
+    def to_list(self) -> List[Box3d]:
+        return list(self)
+
+
 class Mask(ToNumpy, ToDict, Drawable):
     """2-d Mask over an image
 
@@ -475,13 +2015,18 @@ class Mask(ToNumpy, ToDict, Drawable):
     Parameters
     ----------
     data: list or :py:class:`np.ndarray`
-        The mask data. Can be a numpy array or a list.
+        The mask data. Can be a numpy array or a list. The coordinates of
+        polygons are also stored flat in :py:attr:`polygons`.
     width: int, optional
         The width of the image this mask applies to.
     height: int, optional
         The height of the image this mask applies to.
     mask_type: :py:class:`Mask.Type`
         The type of the mask.
+    cache_rle: bool, default False
+        Memoize the run-length encoding of this mask once computed, so that
+        polygons are only rasterized once across :py:meth:`to_mask`,
+        :py:meth:`iou` and the other operations.
 
     Examples
     --------
@@ -524,6 +2069,7 @@ class Mask(ToNumpy, ToDict, Drawable):
         width: Optional[int] = None,
         height: Optional[int] = None,
         mask_type: Mask.Type = Type.POLYGON,
+        cache_rle: bool = False,
     ):
         if mask_type != Mask.Type.POLYGON and (
             height is None or width is None
@@ -535,6 +2081,7 @@ class Mask(ToNumpy, ToDict, Drawable):
 
         self.width = width
         self.height = height
+        self._rle_cache: Optional[dict] = {} if cache_rle else None
 
     @staticmethod
     def from_rle(data: list[int], width: int, height: int) -> Mask:
@@ -570,7 +2117,9 @@ class Mask(ToNumpy, ToDict, Drawable):
         )
 
     @staticmethod
-    def from_polygon(data: list[list[float]], width: int, height: int) -> Mask:
+    def from_polygon(
+        data: list[list[float]], width: int, height: int, cache_rle=False
+    ) -> Mask:
         """Build mask from a Polygon
 
         Parameters
@@ -582,9 +2131,15 @@ class Mask(ToNumpy, ToDict, Drawable):
             The width of the image which the mask applies to.
         height: int
             The height of the image which the mask applies to.
+        cache_rle: bool, default False
+            Memoize the rasterized polygons as RLE.
         """
         return Mask(
-            data, width=width, height=height, mask_type=Mask.Type.POLYGON
+            data,
+            width=width,
+            height=height,
+            mask_type=Mask.Type.POLYGON,
+            cache_rle=cache_rle,
         )
 
     @staticmethod
@@ -596,8 +2151,33 @@ class Mask(ToNumpy, ToDict, Drawable):
         mask : np.ndarray
             A binary-valued (0/1) numpy array
         """
-        assert len(mask.shape) > 1, "Must have more than 2-dimensions"
-        return Mask(data=rle.encode(mask), mask_type=Mask.Type.RLE)
+        assert len(mask.shape) == 2, "Must be a 2-D array"
+        height, width = mask.shape
+        return Mask(
+            data=rle.encode(mask),
+            width=width,
+            height=height,
+            mask_type=Mask.Type.RLE,
+        )
+
+    @property
+    def data(self) -> Union[list, np.ndarray]:
+        """The mask data, polygons as ``[x0, y0, x1, y1, ...]`` lists."""
+        if self._data is None and self.polygons is not None:
+            self._data = self.polygons.to_list()
+        return self._data
+
+    @data.setter
+    def data(self, data: Union[list, np.ndarray]):
+        if self.type == Mask.Type.POLYGON:
+            self.polygons = polygon.PolygonList.from_lists(data)
+            # A PolygonList, e.g., views of Arrow buffers, is only converted
+            # to lists on access.
+            if isinstance(data, polygon.PolygonList):
+                data = None
+        else:
+            self.polygons = None
+        self._data = data
 
     def __repr__(self):
         return f"Mask(type={self.type}, data=...)"
@@ -608,17 +2188,41 @@ class Mask(ToNumpy, ToDict, Drawable):
             and self.type == other.type
             and self.height == other.height
             and self.width == other.width
-            and np.array_equal(self.data, other.data)
+            and (
+                self.polygons == other.polygons
+                if self.type == Mask.Type.POLYGON
+                else np.array_equal(self.data, other.data)
+            )
         )
 
-    def _polygon_to_mask(self) -> np.ndarray:
+    @staticmethod
+    def _scanline() -> bool:
+        """Whether polygons are rasterized by :py:mod:`rikai.types.polygon`
+        instead of PIL.
+        """
+        rasterizer = get_option(CONF_RIKAI_MASK_RASTERIZER)
+        if rasterizer not in ("pil", "scanline"):
+            raise ValueError(
+                f"{CONF_RIKAI_MASK_RASTERIZER} must be 'pil' or 'scanline', "
+                f"got {rasterizer!r}"
+            )
+        return rasterizer == "scanline"
+
+    def _rasterize(self) -> np.ndarray:
+        if self._scanline():
+            return polygon.rasterize(self.polygons, (self.height, self.width))
         arr = np.zeros((self.height, self.width), dtype=np.uint8)
         with Image.fromarray(arr) as im:
             draw = ImageDraw.Draw(im)
-            for polygon in self.data:
-                draw.polygon(list(np.array(polygon)), fill=1)
+            for segmentation in self.polygons:
+                draw.polygon(segmentation.tolist(), fill=1)
             return np.array(im)
 
+    def _polygon_to_mask(self) -> np.ndarray:
+        if self._rle_cache is not None:
+            return rle.decode(self._rle("C"), (self.height, self.width))
+        return self._rasterize()
+
     def _render(self, render, **kwargs):
         """Render a Mask"""
         if self.type == Mask.Type.POLYGON:
@@ -628,7 +2232,12 @@ class Mask(ToNumpy, ToDict, Drawable):
             render.mask(self.to_mask())
 
     def to_mask(self) -> np.ndarray:
-        """Convert this mask to a numpy array."""
+        """Convert this mask to a numpy array.
+
+        Polygons are drawn by PIL, or by the scanline rasterizer of
+        :py:mod:`rikai.types.polygon` if the ``rikai.mask.rasterizer`` option
+        is ``"scanline"``.
+        """
         if self.type == Mask.Type.POLYGON:
             return self._polygon_to_mask()
         elif self.type == Mask.Type.RLE:
@@ -640,6 +2249,56 @@ class Mask(ToNumpy, ToDict, Drawable):
         else:
             raise ValueError("Unrecognized type")
 
+    @staticmethod
+    def to_masks(
+        masks: Sequence[Mask], out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Convert masks of the same image size to one ``(N, height, width)``
+        array.
+
+        With the ``"scanline"`` ``rikai.mask.rasterizer``, the polygons of
+        all the masks are rasterized together.
+
+        Parameters
+        ----------
+        masks : Sequence[Mask]
+            The masks to convert.
+        out : np.ndarray, optional
+            A preallocated ``(N, height, width)`` array to convert into.
+        """
+        if len(masks) == 0:
+            raise ValueError("Must convert at least one mask")
+        shape = (masks[0].height, masks[0].width)
+        if out is None:
+            out = np.empty((len(masks),) + shape, dtype=np.uint8)
+        elif out.shape != (len(masks),) + shape:
+            raise ValueError(
+                f"out must be of shape {(len(masks),) + shape}, "
+                f"got {out.shape}"
+            )
+
+        scanline = Mask._scanline()
+        polygons = []
+        for i, mask in enumerate(masks):
+            if (mask.height, mask.width) != shape:
+                raise ValueError("Masks must have the same size")
+            if (
+                scanline
+                and mask.type == Mask.Type.POLYGON
+                and not mask._rle_cache
+            ):
+                polygons.append(i)
+            else:
+                out[i] = mask.to_mask()
+        rles = polygon.rasterize_rle_batch(
+            [masks[i].polygons for i in polygons], shape
+        )
+        for i, counts in zip(polygons, rles):
+            if masks[i]._rle_cache is not None:
+                masks[i]._rle_cache["C"] = counts
+            out[i] = rle.decode(counts, shape)
+        return out
+
     def to_numpy(self) -> np.ndarray:
         return self.to_mask()
 
@@ -652,12 +2311,104 @@ class Mask(ToNumpy, ToDict, Drawable):
         }
         return ret
 
+    @property
+    def _order(self) -> str:
+        """The numpy array order of the RLE form of this mask."""
+        return "F" if self.type == Mask.Type.COCO_RLE else "C"
+
+    def _rle(self, order: str) -> np.ndarray:
+        """The RLE counts of this mask, in the given order."""
+        if self.type != Mask.Type.POLYGON and self._order == order:
+            return np.asarray(self.data)
+        if self._rle_cache is not None and order in self._rle_cache:
+            return self._rle_cache[order]
+        if self.type == Mask.Type.POLYGON and order == "C":
+            if self._scanline():
+                counts = polygon.rasterize_rle(
+                    self.polygons, (self.height, self.width)
+                )
+            else:
+                counts = rle.encode(self._rasterize(), order=order)
+        else:
+            counts = rle.encode(self.to_mask(), order=order)
+        if self._rle_cache is not None:
+            self._rle_cache[order] = counts
+        return counts
+
+    def _from_rle(self, counts: np.ndarray, order: str) -> Mask:
+        return Mask(
+            counts,
+            width=self.width,
+            height=self.height,
+            mask_type=Mask.Type.COCO_RLE if order == "F" else Mask.Type.RLE,
+        )
+
+    @property
+    def area(self) -> int:
+        """The number of pixels of this mask, computed without decoding
+        RLE masks.
+        """
+        return rle.area(self._rle(self._order))
+
+    @property
+    def bbox(self) -> Box2d:
+        """The bounding box of this mask, computed without decoding RLE
+        masks.
+        """
+        return Box2d(
+            *rle.bbox(
+                self._rle(self._order), (self.height, self.width), self._order
+            )
+        )
+
+    @staticmethod
+    def merge(masks: Sequence[Mask], intersect: bool = False) -> Mask:
+        """Merge masks of the same image into one RLE mask, by their union
+        or, if ``intersect``, their intersection.
+
+        The masks are merged on their run-length encodings, in the RLE
+        order of the first mask.
+        """
+        if len(masks) == 0:
+            raise ValueError("Must merge at least one mask")
+        order = masks[0]._order
+        return masks[0]._from_rle(
+            rle.merge([m._rle(order) for m in masks], intersect=intersect),
+            order,
+        )
+
+    def intersection(self, other: Mask) -> Mask:
+        """The intersection of two masks, as a RLE mask."""
+        return Mask.merge([self, other], intersect=True)
+
+    def union(self, other: Mask) -> Mask:
+        """The union of two masks, as a RLE mask."""
+        return Mask.merge([self, other])
+
     def iou(self, other: Mask) -> float:
-        this_mask = self.to_mask()
-        other_mask = other.to_mask()
-        intersection = np.count_nonzero(np.logical_and(this_mask, other_mask))
-        union = np.count_nonzero(np.logical_or(this_mask, other_mask))
-        try:
-            return intersection / union
-        except ZeroDivisionError:
-            return 0
+        return float(Mask.ious([self], [other])[0, 0])
+
+    @staticmethod
+    def ious(masks1: Sequence[Mask], masks2: Sequence[Mask]) -> np.ndarray:
+        """Compute the IoU matrix between two lists of masks of the same
+        image size, on their run-length encodings.
+
+        Parameters
+        ----------
+        masks1 : Sequence[Mask]
+            N masks.
+        masks2 : Sequence[Mask]
+            M masks.
+
+        Return
+        ------
+        np.ndarray
+            A ``N x M`` matrix. The IoU of two empty masks is 0.
+        """
+        masks = list(masks1) + list(masks2)
+        if not masks:
+            return np.zeros((0, 0))
+        order = masks[0]._order
+        return rle.ious(
+            [m._rle(order) for m in masks1], [m._rle(order) for m in masks2]
+        )
@@ -0,0 +1,362 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Polygons of masks, and their scanline rasterization.
+
+Polygons are ``[x0, y0, x1, y1, ...]`` lists, with integer coordinates at the
+pixel centers. The polygons of a mask are stored flat in a
+:py:class:`PolygonList`.
+
+The scanlines follow the rules of :py:meth:`PIL.ImageDraw.ImageDraw.polygon`,
+but the masks are not pixel-exact to the ones drawn by PIL: a few pixels at
+the corners and along steep edges of simple polygons may differ, and more for
+self-intersecting polygons. :py:meth:`rikai.types.Mask.to_mask` thus draws
+polygons with PIL, unless the ``rikai.mask.rasterizer`` option is set to
+``"scanline"``. The Spark SQL mask functions always use this rasterizer.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from rikai.types import rle
+
+__all__ = [
+    "PolygonList",
+    "rasterize",
+    "rasterize_batch",
+    "rasterize_rle",
+    "rasterize_rle_batch",
+]
+
+
+class PolygonList(Sequence):
+    """The polygons of a mask, stored as one float32 coordinate buffer and
+    the offsets of each polygon into it, like an Arrow list array.
+
+    Polygon ``i`` is ``coords[offsets[i]:offsets[i + 1]]``, a view of the
+    buffer. Each polygon must have an even number of coordinates.
+
+    Parameters
+    ----------
+    coords : np.ndarray
+        The ``[x0, y0, x1, y1, ...]`` coordinates of all the polygons.
+    offsets : np.ndarray
+        The ``N + 1`` offsets of the ``N`` polygons into ``coords``.
+    """
+
+    def __init__(self, coords: np.ndarray, offsets: np.ndarray):
+        self.coords = np.asarray(coords, dtype=np.float32).reshape(-1)
+        self.offsets = np.asarray(offsets, dtype=np.int64).reshape(-1)
+        if len(self.offsets) == 0:
+            self.offsets = np.zeros(1, dtype=np.int64)
+        if (
+            self.offsets[0] != 0
+            or self.offsets[-1] != len(self.coords)
+            or np.any(np.diff(self.offsets) < 0)
+        ):
+            raise ValueError(
+                f"Offsets must increase from 0 to {len(self.coords)}, "
+                f"got {self.offsets.tolist()}"
+            )
+        if np.any(self.offsets % 2):
+            raise ValueError(
+                "Polygons must have an even number of coordinates, got "
+                f"{np.diff(self.offsets).tolist()}"
+            )
+
+    @classmethod
+    def from_lists(
+        cls, polygons: Union[PolygonList, Iterable[Sequence[float]]]
+    ) -> PolygonList:
+        """Build from a list of ``[x0, y0, x1, y1, ...]`` polygons."""
+        if isinstance(polygons, PolygonList):
+            return polygons
+        arrays = [
+            np.asarray(polygon, dtype=np.float32).reshape(-1)
+            for polygon in polygons
+        ]
+        if not arrays:
+            return cls(np.zeros(0, dtype=np.float32), [0])
+        return cls(
+            np.concatenate(arrays),
+            np.r_[0, np.cumsum([len(a) for a in arrays])],
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(len(self))[key]]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("polygon index out of range")
+        return self.coords[self.offsets[key] : self.offsets[key + 1]]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PolygonList):
+            try:
+                other = PolygonList.from_lists(other)
+            except (TypeError, ValueError):
+                return False
+        return np.array_equal(self.offsets, other.offsets) and np.array_equal(
+            self.coords, other.coords
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"PolygonList(polygons={len(self)}, "
+            f"points={len(self.coords) // 2})"
+        )
+
+    def to_list(self) -> List[List[float]]:
+        """Convert to a list of ``[x0, y0, x1, y1, ...]`` lists."""
+        return [polygon.tolist() for polygon in self]
+
+
+def _round_half_up(values: np.ndarray) -> np.ndarray:
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def _edges(
+    polygon_lists: Sequence[Sequence[Sequence[float]]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The edges ``(x0, y0, x1, y1)`` of all polygons, with the index of the
+    mask and of the polygon of each edge.
+    """
+    polygon_lists = [PolygonList.from_lists(p) for p in polygon_lists]
+    if not polygon_lists:
+        return np.zeros((0, 4)), np.zeros(0, int), np.zeros(0, int)
+    coord_counts = [len(p.coords) for p in polygon_lists]
+    bases = np.cumsum(coord_counts) - coord_counts
+    starts = np.concatenate(
+        [p.offsets[:-1] + base for p, base in zip(polygon_lists, bases)]
+    )
+    ends = np.concatenate(
+        [p.offsets[1:] + base for p, base in zip(polygon_lists, bases)]
+    )
+    polygon_masks = np.repeat(
+        np.arange(len(polygon_lists)), [len(p) for p in polygon_lists]
+    )
+    # Vertices are truncated to integers like in PIL.
+    points = np.trunc(
+        np.concatenate([p.coords for p in polygon_lists]).astype(np.float64)
+    ).reshape(-1, 2)
+
+    starts, ends = starts // 2, ends // 2
+    nonempty = ends > starts
+    polygons = np.repeat(np.arange(len(starts)), ends - starts)
+    # Each vertex connects to the next one, and the last vertex of a polygon
+    # to the first one.
+    following = np.arange(1, len(points) + 1)
+    following[ends[nonempty] - 1] = starts[nonempty]
+    return (
+        np.hstack([points, points[following]]),
+        polygon_masks[polygons],
+        polygons,
+    )
+
+
+def _expand(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The index of the item, and the offset within the item, of each
+    element of items that are repeated ``counts`` times.
+    """
+    item = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(len(item)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    return item, offset
+
+
+def _spans(
+    edges: np.ndarray,
+    masks: np.ndarray,
+    polygons: np.ndarray,
+    shape: Tuple[int, int],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """The horizontal spans ``(mask, y, x_start, x_end)`` covered by the
+    polygons, clipped to the image, with ``x_end`` exclusive.
+    """
+    height, width = shape
+    x0, y0, x1, y1 = edges.T
+    # Horizontal edges are drawn as they are.
+    horizontal = y0 == y1
+    spans = [
+        (
+            masks[horizontal],
+            y0[horizontal],
+            np.minimum(x0, x1)[horizontal],
+            np.maximum(x0, x1)[horizontal],
+        )
+    ]
+
+    edges, masks, polygons = (
+        edges[~horizontal],
+        masks[~horizontal],
+        polygons[~horizontal],
+    )
+    if len(edges) > 0:
+        x0, y0, x1, y1 = edges.T
+        ymin, ymax = np.minimum(y0, y1), np.maximum(y0, y1)
+        polygon_ymax = np.full(polygons.max() + 1, -np.inf)
+        np.maximum.at(polygon_ymax, polygons, ymax)
+        # Each edge crosses the scanlines in [ymin, ymax]. An edge crosses
+        # its last scanline twice, unless it is the last scanline of the
+        # polygon.
+        first = np.maximum(ymin, 0)
+        last = np.minimum(ymax, height - 1)
+        rows = np.maximum(last - first + 1, 0).astype(np.int64)
+        rows += (ymax <= height - 1) & (ymax < polygon_ymax[polygons])
+        edge, offset = _expand(rows)
+        y = np.minimum(first[edge] + offset, last[edge])
+        x = x0[edge] + (y - y0[edge]) * (x1 - x0)[edge] / (y1 - y0)[edge]
+
+        # Pair up the sorted crossings of each scanline of each polygon.
+        polygon = polygons[edge]
+        order = np.lexsort((x, y, polygon))
+        x, y, polygon = x[order], y[order], polygon[order]
+        new_group = np.r_[
+            True, (y[1:] != y[:-1]) | (polygon[1:] != polygon[:-1])
+        ]
+        group_start = np.maximum.accumulate(
+            np.where(new_group, np.arange(len(y)), 0)
+        )
+        rank = np.arange(len(y)) - group_start
+        has_pair = np.r_[~new_group[1:], False]
+        left = np.flatnonzero((rank % 2 == 0) & has_pair)
+        spans.append(
+            (
+                masks[edge][order][left],
+                y[left],
+                _round_half_up(x[left]),
+                np.ceil(x[left + 1] - 0.5),
+            )
+        )
+
+    mask, y, x_start, x_end = (np.concatenate(a) for a in zip(*spans))
+    x_start = np.clip(x_start, 0, width).astype(np.int64)
+    x_end = np.clip(x_end + 1, 0, width).astype(np.int64)
+    keep = (x_start < x_end) & (y >= 0) & (y < height)
+    return mask[keep], y[keep].astype(np.int64), x_start[keep], x_end[keep]
+
+
+def rasterize_rle_batch(
+    polygon_lists: Sequence[Sequence[Sequence[float]]],
+    shape: Tuple[int, int],
+) -> List[np.ndarray]:
+    """Rasterize the polygons of many masks of the same size directly into
+    their row-based run-length encodings, without a dense mask.
+
+    Parameters
+    ----------
+    polygon_lists : Sequence[Sequence[Sequence[float]]]
+        The polygons of each mask, i.e.,
+        ``[[[x0, y0, x1, y1, ...], ...], ...]``.
+    shape: tuple of ints
+        (height, width)
+
+    Return
+    ------
+    List[np.ndarray]
+        The RLE of each mask, see :py:mod:`rikai.types.rle`.
+    """
+    height, width = shape
+    total = height * width
+    edges, masks, polygons = _edges(polygon_lists)
+    if len(edges) > 0:
+        mask, y, x_start, x_end = _spans(edges, masks, polygons, shape)
+    if len(edges) == 0 or len(mask) == 0:
+        return [np.array([total]) for _ in polygon_lists]
+
+    # Merge the overlapping or adjacent spans of each mask.
+    starts, ends = y * width + x_start, y * width + x_end
+    order = np.lexsort((starts, mask))
+    mask, starts, ends = mask[order], starts[order], ends[order]
+    reach = np.maximum.accumulate(ends + mask * (total + 1)) - mask * (
+        total + 1
+    )
+    new_run = np.r_[True, (mask[1:] != mask[:-1]) | (starts[1:] > reach[:-1])]
+    run_starts = starts[new_run]
+    run_ends = reach[np.r_[np.flatnonzero(new_run)[1:] - 1, len(reach) - 1]]
+    run_masks = mask[new_run]
+
+    rles = []
+    bounds = np.searchsorted(run_masks, np.arange(len(polygon_lists) + 1))
+    for i in range(len(polygon_lists)):
+        begin, end = bounds[i], bounds[i + 1]
+        boundaries = np.column_stack(
+            [run_starts[begin:end], run_ends[begin:end]]
+        ).reshape(-1)
+        rles.append(np.diff(np.r_[0, boundaries, total]))
+    return rles
+
+
+def rasterize_rle(
+    polygons: Sequence[Sequence[float]], shape: Tuple[int, int]
+) -> np.ndarray:
+    """Rasterize the polygons of one mask into its row-based RLE."""
+    return rasterize_rle_batch([polygons], shape)[0]
+
+
+def rasterize_batch(
+    polygon_lists: Sequence[Sequence[Sequence[float]]],
+    shape: Tuple[int, int],
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Rasterize the polygons of many masks of the same size into one
+    ``(N, height, width)`` array.
+
+    Parameters
+    ----------
+    polygon_lists : Sequence[Sequence[Sequence[float]]]
+        The polygons of each mask, i.e.,
+        ``[[[x0, y0, x1, y1, ...], ...], ...]``.
+    shape: tuple of ints
+        (height, width)
+    out : np.ndarray, optional
+        A preallocated ``(N, height, width)`` array to rasterize into.
+
+    Return
+    ------
+    np.ndarray
+        The masks, ``out`` if provided.
+    """
+    return rle.decode_batch(
+        rasterize_rle_batch(polygon_lists, shape), shape, out=out
+    )
+
+
+def rasterize(
+    polygons: Sequence[Sequence[float]],
+    shape: Tuple[int, int],
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Rasterize the polygons of one mask into a ``(height, width)`` array.
+
+    Parameters
+    ----------
+    polygons : Sequence[Sequence[float]]
+        ``[[x0, y0, x1, y1, ...], ...]``
+    shape: tuple of ints
+        (height, width)
+    out : np.ndarray, optional
+        A preallocated ``(height, width)`` array to rasterize into.
+    """
+    return rasterize_batch(
+        [polygons], shape, None if out is None else out[np.newaxis]
+    )[0]
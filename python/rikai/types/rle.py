@@ -12,30 +12,48 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+"""Run-length encoding (RLE) of binary masks.
+
+The counts alternate between runs of zeros and runs of ones, always starting
+with a run of zeros, which may be empty.
+"""
+
 from __future__ import annotations
 
-from typing import Tuple
+from typing import Optional, Sequence, Tuple
 
 import numpy as np
 
+__all__ = [
+    "encode",
+    "decode",
+    "decode_batch",
+    "area",
+    "bbox",
+    "merge",
+    "intersection_areas",
+    "ious",
+]
 
-def encode(arr: np.ndarray) -> np.array:
+
+def encode(arr: np.ndarray, order: str = "C") -> np.ndarray:
     """Run-length encoding a matrix.
 
     Parameters
     ----------
     arr : a data array or n-D metrix/tensor.
+        Non-zero values are encoded as ones.
+    order: str
+        Numpy array order to flatten the matrix. If uses Coco-style RLE,
+        order should set to F.
     """
-    if len(arr.shape) > 1:
-        return encode(arr.reshape(-1))
-
-    if len(arr) == 0:
-        return []
-    total = len(arr)
-    conti_idx = np.r_[0, np.flatnonzero(~np.equal(arr[1:], [arr[:-1]])) + 1]
-    counts = np.diff(np.r_[conti_idx, total])
-    if arr[0]:
-        counts = np.insert(counts, 0, 0)
+    flat = np.asarray(arr).reshape(-1, order=order) != 0
+    if len(flat) == 0:
+        return np.zeros(0, dtype=np.int64)
+    boundaries = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    counts = np.diff(np.r_[0, boundaries, len(flat)])
+    if flat[0]:
+        counts = np.r_[0, counts]
     return counts
 
 
@@ -53,13 +71,189 @@ def decode(
     order: str
         Numpy array order. If uses Coco-style RLE, order should set to F.
     """
-    val = 0
-    start_idx = 0
-    n = np.sum(rle)
-    arr = np.full(n, 0, dtype=np.uint8)
-    for length in rle:
-        arr[start_idx: start_idx + length] = val  # fmt:skip
-        start_idx += length
-        val = 1 - val
-
-    return arr.reshape(shape, order=order)
+    counts = np.asarray(rle, dtype=np.int64).reshape(-1)
+    values = np.arange(len(counts), dtype=np.uint8) & 1
+    return np.repeat(values, counts).reshape(shape, order=order)
+
+
+def decode_batch(
+    rles: Sequence[np.ndarray],
+    shape: Tuple[int, int],
+    order: str = "C",
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Decode many RLEs of the same shape into one ``(N, height, width)``
+    array.
+
+    Parameters
+    ----------
+    rles : Sequence[np.ndarray]
+        The RLE encoded masks.
+    shape: tuple of ints
+        (height, width)
+    order: str
+        Numpy array order. If uses Coco-style RLE, order should set to F.
+    out : np.ndarray, optional
+        A preallocated ``(N, height, width)`` array to decode into.
+
+    Return
+    ------
+    np.ndarray
+        The decoded masks, ``out`` if provided.
+    """
+    height, width = shape
+    if out is None:
+        out = np.empty((len(rles), height, width), dtype=np.uint8)
+    elif out.shape != (len(rles), height, width):
+        raise ValueError(
+            f"out must be of shape {(len(rles), height, width)}, "
+            f"got {out.shape}"
+        )
+    for i, counts in enumerate(rles):
+        counts = np.asarray(counts, dtype=np.int64).reshape(-1)
+        if np.sum(counts) != height * width:
+            raise ValueError(
+                f"Each RLE must decode to a mask of shape {shape}"
+            )
+        # Decoding one mask at a time keeps the runs in cache, which is
+        # faster than one repeat over the whole batch.
+        out[i] = decode(counts, shape, order=order)
+    return out
+
+
+def _counts(rle) -> np.ndarray:
+    return np.asarray(rle, dtype=np.int64).reshape(-1)
+
+
+def area(rle: np.ndarray) -> int:
+    """The number of ones of a RLE encoded mask."""
+    return int(np.sum(_counts(rle)[1::2]))
+
+
+def bbox(
+    rle: np.ndarray, shape: Tuple[int, int], order: str = "C"
+) -> Tuple[int, int, int, int]:
+    """The bounding box ``(xmin, ymin, xmax, ymax)`` of the ones of a RLE
+    encoded mask, in pixel edges, or all zeros for an empty mask.
+
+    Parameters
+    ----------
+    rle : np.array
+        A 1-D array of RLE encoded data.
+    shape: tuple of ints
+        (height, width)
+    order: str
+        Numpy array order. If uses Coco-style RLE, order should set to F.
+    """
+    counts = _counts(rle)
+    ends = np.cumsum(counts)[1::2]
+    lengths = counts[1::2]
+    ends, starts = ends[lengths > 0], (ends - lengths)[lengths > 0]
+    if len(starts) == 0:
+        return 0, 0, 0, 0
+    height, width = shape
+    # Positions along the major (row in C order) and the minor axis.
+    minor_size = width if order == "C" else height
+    first_major, first_minor = np.divmod(starts, minor_size)
+    last_major, last_minor = np.divmod(ends - 1, minor_size)
+    # A run that wraps over the end of a line covers the whole minor axis.
+    wraps = first_major != last_major
+    major = (int(first_major.min()), int(last_major.max()) + 1)
+    minor = (
+        int(np.where(wraps, 0, first_minor).min()),
+        int(np.where(wraps, minor_size - 1, last_minor).max()) + 1,
+    )
+    if order == "C":
+        return minor[0], major[0], minor[1], major[1]
+    return major[0], minor[0], major[1], minor[1]
+
+
+def _ones_before(counts: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """The number of ones before each position of a RLE encoded mask."""
+    ends = np.cumsum(counts)
+    ones = counts.copy()
+    ones[::2] = 0
+    ones_before_run = np.r_[0, np.cumsum(ones)]
+    run = np.searchsorted(ends, positions, side="right")
+    inside = np.minimum(run, len(counts) - 1)
+    partial = np.where(
+        (run < len(counts)) & (run % 2 == 1),
+        positions - (ends[inside] - counts[inside]),
+        0,
+    )
+    return ones_before_run[run] + partial
+
+
+def intersection_areas(
+    rle: np.ndarray, others: Sequence[np.ndarray]
+) -> np.ndarray:
+    """The intersection areas of a RLE encoded mask with many other masks
+    of the same shape and order, without decoding any of them.
+    """
+    counts = _counts(rle)
+    if len(others) == 0 or len(counts) == 0:
+        return np.zeros(len(others), dtype=np.int64)
+    starts, ends, owners = [], [], []
+    for i, other in enumerate(others):
+        other = _counts(other)
+        run_ends = np.cumsum(other)[1::2]
+        starts.append(run_ends - other[1::2])
+        ends.append(run_ends)
+        owners.append(np.full(len(run_ends), i))
+    starts, ends, owners = (np.concatenate(a) for a in (starts, ends, owners))
+    overlaps = _ones_before(counts, ends) - _ones_before(counts, starts)
+    return np.bincount(owners, weights=overlaps, minlength=len(others)).astype(
+        np.int64
+    )
+
+
+def ious(
+    rles1: Sequence[np.ndarray], rles2: Sequence[np.ndarray]
+) -> np.ndarray:
+    """The ``(N, M)`` IoU matrix of two lists of RLE encoded masks of the
+    same shape and order. The IoU of two empty masks is 0.
+    """
+    result = np.zeros((len(rles1), len(rles2)))
+    if len(rles1) == 0 or len(rles2) == 0:
+        return result
+    areas2 = np.array([area(r) for r in rles2])
+    for i, rle in enumerate(rles1):
+        inter = intersection_areas(rle, rles2)
+        union = area(rle) + areas2 - inter
+        np.divide(inter, union, out=result[i], where=union > 0)
+    return result
+
+
+def merge(rles: Sequence[np.ndarray], intersect: bool = False) -> np.ndarray:
+    """Merge RLE encoded masks of the same shape and order, by their union
+    or, if ``intersect``, their intersection.
+    """
+    if len(rles) == 0:
+        raise ValueError("Must merge at least one RLE")
+    merged = _counts(rles[0])
+    for other in rles[1:]:
+        merged = _merge_two(merged, _counts(other), intersect)
+    return merged
+
+
+def _merge_two(
+    counts1: np.ndarray, counts2: np.ndarray, intersect: bool
+) -> np.ndarray:
+    ends1, ends2 = np.cumsum(counts1), np.cumsum(counts2)
+    total = ends1[-1] if len(ends1) else 0
+    if total != (ends2[-1] if len(ends2) else 0):
+        raise ValueError("RLEs must encode masks of the same size")
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Split both masks into the segments between any of their run ends,
+    # over which both masks are constant.
+    ends = np.union1d(ends1, ends2)
+    ends = ends[ends > 0]
+    values1 = np.searchsorted(ends1, ends, side="left") % 2 == 1
+    values2 = np.searchsorted(ends2, ends, side="left") % 2 == 1
+    values = values1 & values2 if intersect else values1 | values2
+    last = np.r_[np.flatnonzero(values[1:] != values[:-1]), len(values) - 1]
+    counts = np.diff(np.r_[0, ends[last]])
+    if values[0]:
+        counts = np.r_[0, counts]
+    return counts
@@ -19,10 +19,12 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO, IOBase
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import List, Optional, Sequence, Union
+from typing import List, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
 # Third-party libraries
@@ -30,15 +32,38 @@ import numpy as np
 from PIL import Image as PILImage
 
 # Rikai
-from rikai.conf import options
+from rikai.conf import CONF_RIKAI_IMAGE_CACHE_SIZE, get_option, options
+from rikai.internal.cache import LRUCache
 from rikai.internal.uri_utils import normalize_uri
-from rikai.io import copy, open_output_stream
+from rikai.io import copy, open_output_stream, read_range
 from rikai.mixin import Asset, Displayable, Drawable, ToDict, ToNumpy, ToPIL
 from rikai.spark.types import ImageType
 from rikai.types.geometry import Box2d
 from rikai.viz import Draw, PILRenderer
 
-__all__ = ["Image"]
+__all__ = ["Image", "decode_batch", "ENCODER_PROFILES"]
+
+# Named encoder settings for Image.from_array / Image.from_pil. Each profile
+# is a format plus the arguments passed to PIL.Image.save.
+ENCODER_PROFILES = {
+    "png": {"format": "PNG"},
+    # Low zlib compression level, several times faster than the default.
+    "png_fast": {"format": "PNG", "compress_level": 1},
+    # Lossless, stores the pixels without zlib compression.
+    "lossless_fast": {"format": "PNG", "compress_level": 0},
+    "jpeg": {"format": "JPEG", "quality": 95, "optimize": True},
+    "jpeg_fast": {"format": "JPEG", "quality": 85},
+}
+
+# Process-level cache of decoded images, bounded by
+# ``rikai.image.cache.size`` bytes.
+_decoded_cache = LRUCache(lambda: get_option(CONF_RIKAI_IMAGE_CACHE_SIZE))
+
+# Number of bytes to read from an external image to probe its header.
+_HEADER_PROBE_BYTES = 64 * 1024
+
+# Default number of threads of decode_batch() outside of DataLoader workers.
+_DECODE_WORKERS = 4
 
 
 class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
@@ -66,6 +91,7 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         else:
             uri = image
         super().__init__(data=data, uri=uri)
+        self._header = None
 
     @classmethod
     def from_array(
@@ -74,6 +100,7 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         uri: Optional[Union[str, Path]] = None,
         mode: Optional[str] = None,
         format: Optional[str] = None,
+        profile: Optional[str] = None,
         **kwargs,
     ) -> Image:
         """Create an image in memory from numpy array.
@@ -90,6 +117,10 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         format : str, optional
             The image format to save as. See
             `supported formats <https://pillow.readthedocs.io/en/stable/reference/Image.html#PIL.Image.Image.save>`_ for details.
+        profile : str, optional
+            The name of an encoder profile in :py:data:`ENCODER_PROFILES`,
+            i.e., ``"png_fast"`` or ``"jpeg"``.
+            See :py:meth:`Image.from_pil` for details.
         kwargs : dict, optional
             Optional arguments to pass to `PIL.Image.save <https://pillow.readthedocs.io/en/stable/reference/Image.html#PIL.Image.Image.save>`_.
 
@@ -102,7 +133,9 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
 
         assert array is not None
         with PILImage.fromarray(array, mode=mode) as img:
-            return cls.from_pil(img, uri, format=format, **kwargs)
+            return cls.from_pil(
+                img, uri, format=format, profile=profile, **kwargs
+            )
 
     @staticmethod
     def read(
@@ -122,6 +155,7 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         img: PILImage,
         uri: Optional[Union[str, Path]] = None,
         format: Optional[str] = None,
+        profile: Optional[str] = None,
         **kwargs,
     ) -> Image:
         """Create an image in memory from a :py:class:`PIL.Image`.
@@ -135,26 +169,75 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         format : str, optional
             The image format to save as. See
             `supported formats <https://pillow.readthedocs.io/en/stable/reference/Image.html#PIL.Image.Image.save>`_ for details.
+        profile : str, optional
+            The name of an encoder profile in :py:data:`ENCODER_PROFILES`.
+            Default to the ``rikai.image.default.profile`` option, which only
+            applies if ``format`` is not set or matches the format of the
+            profile. An explicit profile must match ``format``. ``kwargs``
+            take precedence over the profile.
         kwargs : dict, optional
             Optional arguments to pass to `PIL.Image.save <https://pillow.readthedocs.io/en/stable/reference/Image.html#PIL.Image.Image.save>`_.
         """  # noqa: E501
 
-        format = format if format else options.rikai.image.default.format
+        format, kwargs = _encoder_options(format, profile, kwargs)
+
+        parsed = urlparse(normalize_uri(uri)) if uri is not None else None
+        if parsed is not None and parsed.scheme == "file":
+            img.save(uri, format=format, **kwargs)
+            return Image(uri)
 
+        buf = BytesIO()
+        img.save(buf, format=format, **kwargs)
         if uri is None:
-            buf = BytesIO()
-            img.save(buf, format=format, **kwargs)
             return Image(buf.getvalue())
+        # Stream the encoded image to the remote storage directly.
+        with open_output_stream(str(uri)) as fobj:
+            fobj.write(buf.getbuffer())
+        return Image(uri)
 
-        parsed = urlparse(normalize_uri(uri))
-        if parsed.scheme == "file":
-            img.save(uri, format=format, **kwargs)
+    @property
+    def size(self) -> Tuple[int, int]:
+        """The ``(width, height)`` of the image, read from its header."""
+        return self._probe()[0]
+
+    @property
+    def format(self) -> Optional[str]:
+        """The format of the image, i.e., ``"JPEG"`` or ``"PNG"``."""
+        return self._probe()[1]
+
+    @property
+    def mode(self) -> str:
+        """The `PIL mode <https://pillow.readthedocs.io/en/stable/handbook/concepts.html#concept-modes>`_
+        of the image, i.e., ``"RGB"`` or ``"L"``.
+        """  # noqa: E501
+        return self._probe()[2]
+
+    def _probe(self) -> Tuple[Tuple[int, int], Optional[str], str]:
+        """Read the size, format and mode of the image without decoding it.
+
+        For an external image, only the first ``_HEADER_PROBE_BYTES`` bytes
+        are fetched, unless the header does not fit in them.
+        """
+        # Images unpickled from older versions have no _header.
+        header = getattr(self, "_header", None)
+        if header is not None:
+            return header
+
+        if self.is_embedded:
+            fobj = BytesIO(self.data)
         else:
-            with NamedTemporaryFile() as fobj:
-                img.save(fobj, format=format, **kwargs)
-                fobj.flush()
-                copy(fobj.name, uri)
-        return Image(uri)
+            fobj = BytesIO(read_range(self.uri, 0, _HEADER_PROBE_BYTES))
+        try:
+            with PILImage.open(fobj) as img:
+                self._header = (img.size, img.format, img.mode)
+        except (OSError, SyntaxError):
+            if self.is_embedded:
+                raise
+            # The header is larger than the probed bytes, i.e., JPEG images
+            # with a large EXIF segment.
+            with self.open() as fobj, PILImage.open(fobj) as img:
+                self._header = (img.size, img.format, img.mode)
+        return self._header
 
     def display(self, **kwargs):
         """
@@ -205,20 +288,90 @@ class Image(ToNumpy, ToPIL, Asset, Displayable, ToDict):
         """
         return self.draw(other)
 
-    def to_pil(self) -> PILImage:
+    def to_pil(
+        self, size: Optional[Tuple[int, int]] = None, mode: str = "RGB"
+    ) -> PILImage:
         """Return an PIL image.
 
+        Parameters
+        ----------
+        size : Tuple[int, int], optional
+            The ``(width, height)`` to decode the image into. JPEG images are
+            scaled down while being decoded, which is much cheaper than
+            decoding the full image and resizing it afterwards.
+        mode : str, default "RGB"
+            The `PIL mode <https://pillow.readthedocs.io/en/stable/handbook/concepts.html#concept-modes>`_
+            to convert the image into.
+
         Note
         ----
         The caller should close the image.
         https://pillow.readthedocs.io/en/stable/reference/open_files.html#image-lifecycle
-        """
-        return PILImage.open(self.open()).convert("RGB")
+        """  # noqa: E501
+        if _decoded_cache.enabled:
+            return PILImage.fromarray(self.to_numpy(size=size, mode=mode))
+        return self._decode(size=size, mode=mode)
 
-    def to_numpy(self) -> np.ndarray:
-        """Convert this image into an :py:class:`numpy.ndarray`."""
-        with self.to_pil() as pil_img:
-            return np.asarray(pil_img)
+    def to_numpy(
+        self, size: Optional[Tuple[int, int]] = None, mode: str = "RGB"
+    ) -> np.ndarray:
+        """Convert this image into an :py:class:`numpy.ndarray`.
+
+        Parameters
+        ----------
+        size : Tuple[int, int], optional
+            The ``(width, height)`` to decode the image into.
+        mode : str, default "RGB"
+            The PIL mode to convert the image into.
+
+        Note
+        ----
+        If the decoded image cache is enabled via ``rikai.image.cache.size``,
+        the returned array is shared with the cache and is read-only.
+        """
+        if not _decoded_cache.enabled:
+            with self._decode(size=size, mode=mode) as pil_img:
+                return np.asarray(pil_img)
+
+        key = (self._cache_key(), size and tuple(size), mode)
+        arr = _decoded_cache.get(key)
+        if arr is None:
+            with self._decode(size=size, mode=mode) as pil_img:
+                arr = np.asarray(pil_img)
+            arr.setflags(write=False)
+            _decoded_cache.put(key, arr, arr.nbytes)
+        return arr
+
+    def _decode(
+        self, size: Optional[Tuple[int, int]] = None, mode: str = "RGB"
+    ) -> PILImage:
+        # The source image and its stream are closed once converted.
+        with self.open() as fobj, PILImage.open(fobj) as img:
+            if size is not None:
+                size = tuple(size)
+                # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 in the
+                # DCT domain, while keeping the image at least as large as
+                # ``size``. It is a no-op for other formats.
+                img.draft(mode, size)
+            converted = img.convert(mode)
+        if size is None or converted.size == size:
+            return converted
+        # ``reducing_gap`` reduces the image by an integer factor before
+        # resampling the rest of the way.
+        with converted:
+            return converted.resize(
+                size, resample=PILImage.BILINEAR, reducing_gap=2.0
+            )
+
+    def _cache_key(self) -> str:
+        """Key of this image in the decoded image cache.
+
+        External images are keyed by URI, and embedded images are keyed by
+        the hash of their content.
+        """
+        if self.is_embedded:
+            return "sha1:" + hashlib.sha1(self.data).hexdigest()
+        return normalize_uri(self.uri)
 
     def to_dict(self) -> dict:
         if self.is_embedded:
@@ -321,3 +474,111 @@ class ImageDraw(Draw):
         img: IPython.display.Image
         """
         return self.to_image().display(**kwargs)
+
+
+def _encoder_options(
+    format: Optional[str], profile: Optional[str], kwargs: dict
+) -> Tuple[str, dict]:
+    """Resolve the image format and the PIL save arguments."""
+    explicit = profile is not None
+    if not explicit:
+        profile = options.rikai.image.default.profile
+    if profile is None:
+        return format or options.rikai.image.default.format, kwargs
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(
+            f"Unknown encoder profile: {profile}, "
+            f"must be one of {list(ENCODER_PROFILES)}"
+        )
+    profile_kwargs = dict(ENCODER_PROFILES[profile])
+    profile_format = profile_kwargs.pop("format")
+    if format is not None and format.upper() != profile_format:
+        if explicit:
+            raise ValueError(
+                f"Encoder profile {profile} is for {profile_format} images, "
+                f"got format {format}"
+            )
+        return format, kwargs
+    return profile_format, {**profile_kwargs, **kwargs}
+
+
+def _default_decode_workers() -> int:
+    """The default number of threads of :py:func:`decode_batch`.
+
+    In a :py:class:`torch.utils.data.DataLoader` worker process, the
+    DataLoader workers already decode batches in parallel.
+    """
+    torch_data = sys.modules.get("torch.utils.data")
+    if torch_data is not None and torch_data.get_worker_info() is not None:
+        return 1
+    return _DECODE_WORKERS
+
+
+def decode_batch(
+    images: Sequence[Image],
+    size: Optional[Tuple[int, int]] = None,
+    mode: str = "RGB",
+    workers: Optional[int] = None,
+) -> Union[np.ndarray, List[np.ndarray]]:
+    """Decode a batch of images in parallel.
+
+    Images are decoded by a thread pool, as PIL releases the GIL while
+    decoding. Each thread opens one image at a time. If all the images have
+    the same size, they are returned as one ``(N, H, W, C)`` uint8 array.
+
+    Parameters
+    ----------
+    images : Sequence[Image]
+        The images to decode.
+    size : Tuple[int, int], optional
+        Decode all images into ``(width, height)``, directly into a
+        preallocated array. See :py:meth:`Image.to_numpy`.
+    mode : str, default "RGB"
+        The PIL mode to convert the images into.
+    workers : int, optional
+        The number of decoding threads. Default to 4, or to 1 in a
+        :py:class:`torch.utils.data.DataLoader` worker process.
+
+    Returns
+    -------
+    :py:class:`numpy.ndarray` or a list of :py:class:`numpy.ndarray`
+        A ``(N, H, W, C)`` array, or ``(N, H, W)`` for single-band modes,
+        if all images have the same size. Otherwise, a list of arrays.
+    """
+    images = list(images)
+    bands = PILImage.getmodebands(mode)
+    channels = (bands,) if bands > 1 else ()
+    if workers is None:
+        workers = _default_decode_workers()
+    workers = max(1, min(workers, len(images)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if size is not None:
+            width, height = size
+            out = np.empty(
+                (len(images), height, width) + channels, dtype=np.uint8
+            )
+
+            def _fill(idx: int) -> None:
+                with images[idx]._decode(size=size, mode=mode) as pil_img:
+                    out[idx] = np.asarray(pil_img)
+
+            list(pool.map(_fill, range(len(images))))
+            return out
+
+        arrays = list(
+            pool.map(
+                lambda img: _convert(PILImage.open(img.open()), mode), images
+            )
+        )
+    if not arrays:
+        return np.empty((0, 0, 0) + channels, dtype=np.uint8)
+    if len({arr.shape for arr in arrays}) > 1:
+        return arrays
+    return np.stack(arrays)
+
+
+def _convert(pil_img: PILImage, mode: str) -> np.ndarray:
+    """Convert a (lazily opened) PIL image into an array, and close it."""
+    with pil_img, pil_img.convert(mode) as converted:
+        return np.asarray(converted)
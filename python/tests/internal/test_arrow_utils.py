@@ -0,0 +1,94 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pyarrow as pa
+from pyspark.sql.types import ArrayType, DataType, StructType
+
+from rikai.internal.arrow_utils import deserialize_struct, struct_columns
+from rikai.spark.types import Box2dType, ImageType, MaskType, NDArrayType
+from rikai.types import Box2d, Image, Mask
+
+
+def test_struct_columns():
+    array = pa.array(
+        [
+            {"id": 1, "values": [1.0, 2.0]},
+            {"id": 2, "values": None},
+            {"id": 3, "values": [3.0]},
+        ],
+        type=pa.struct(
+            [("id", pa.int32()), ("values", pa.list_(pa.float32()))]
+        ),
+    ).slice(1)
+    ids, values = struct_columns(array, views=["values"])
+    assert ids == [2, 3]
+    assert values[0] is None
+    assert isinstance(values[1], np.ndarray) and values[1].tolist() == [3.0]
+
+
+def test_deserialize_struct_nulls():
+    array = pa.chunked_array(
+        [
+            pa.array([{"x": 1}, None], type=pa.struct([("x", pa.int64())])),
+            pa.array([{"x": 3}], type=pa.struct([("x", pa.int64())])),
+        ]
+    )
+    assert deserialize_struct(array, lambda row: row[0] * 2) == [2, None, 6]
+
+
+def _arrow_type(data_type: DataType) -> pa.DataType:
+    if isinstance(data_type, StructType):
+        return pa.struct(
+            [(f.name, _arrow_type(f.dataType)) for f in data_type.fields]
+        )
+    if isinstance(data_type, ArrayType):
+        return pa.list_(_arrow_type(data_type.elementType))
+    return {
+        "binary": pa.binary(),
+        "double": pa.float64(),
+        "float": pa.float32(),
+        "int": pa.int32(),
+        "smallint": pa.int16(),
+        "string": pa.string(),
+    }[data_type.simpleString()]
+
+
+def _to_arrow(udt, values) -> pa.StructArray:
+    return pa.array(
+        [None if v is None else tuple(udt.serialize(v)) for v in values],
+        type=_arrow_type(udt.sqlType()),
+    )
+
+
+def test_udt_deserialize_arrow():
+    cases = [
+        (Box2dType(), [Box2d(1, 2, 3, 4), None, Box2d(0, 0, 1, 1)]),
+        (ImageType(), [Image("s3://bucket/a.png"), Image(b"abc")]),
+        (
+            MaskType(),
+            [
+                Mask.from_polygon([[1, 1, 5, 1, 5, 6]], height=10, width=10),
+                None,
+                Mask.from_rle([3, 4, 5], height=4, width=3),
+            ],
+        ),
+    ]
+    for udt, values in cases:
+        assert udt.deserialize_arrow(_to_arrow(udt, values)) == values
+
+    arrays = NDArrayType().deserialize_arrow(
+        _to_arrow(NDArrayType(), [np.arange(6).reshape(2, 3)])
+    )
+    assert np.array_equal(arrays[0], np.arange(6).reshape(2, 3))
@@ -0,0 +1,46 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from rikai.internal.cache import LRUCache
+
+
+def test_lru_eviction():
+    cache = LRUCache(10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1  # "b" becomes the least recently used.
+    cache.put("c", 3, 4)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.nbytes == 8
+
+    # Values larger than the budget are not cached.
+    cache.put("d", 4, 11)
+    assert "d" not in cache
+    assert len(cache) == 2
+
+
+def test_dynamic_capacity():
+    capacity = {"value": 0}
+    cache = LRUCache(lambda: capacity["value"])
+    assert not cache.enabled
+
+    capacity["value"] = 8
+    assert cache.enabled
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    capacity["value"] = 4
+    cache.put("c", 3, 4)
+    assert len(cache) == 1
+    assert cache.get("c") == 3
@@ -0,0 +1,79 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from rikai.io import open_uri
+from rikai.parquet.blobs import (
+    BlobPacker,
+    BlobStore,
+    blob_uri,
+    content_hash,
+    parse_blob_uri,
+)
+
+
+def test_blob_uri():
+    digest = content_hash(b"abc")
+    assert parse_blob_uri(blob_uri(digest)) == digest
+    assert parse_blob_uri("s3://bucket/abc.png") is None
+    assert parse_blob_uri(None) is None
+
+
+def test_blob_store(tmp_path: Path):
+    blob_dir = tmp_path / "_rikai" / "blobs"
+    blob_dir.mkdir(parents=True)
+    blobs = [f"blob-{i}".encode() for i in range(10)]
+    table = pa.table(
+        {
+            "hash": [content_hash(b) for b in blobs],
+            "data": blobs,
+        }
+    )
+    pq.write_table(table, blob_dir / "part-0.parquet", row_group_size=3)
+
+    store = BlobStore(str(tmp_path))
+    for blob in reversed(blobs):
+        assert store.get(content_hash(blob)) == blob
+    with pytest.raises(KeyError):
+        store.get(content_hash(b"missing"))
+
+
+def test_blob_packer(tmp_path: Path):
+    uri = str(tmp_path / "0.pack")
+    blobs = [f"blob-{i}".encode() * i for i in range(5)]
+    with BlobPacker(uri) as packer:
+        uris = [packer.append(b) for b in blobs]
+    for blob, ranged in zip(blobs, uris):
+        with open_uri(ranged) as fobj:
+            assert fobj.read() == blob
+
+    with BlobPacker(str(tmp_path / "empty.pack")):
+        pass
+    assert not (tmp_path / "empty.pack").exists()
+
+
+def test_blob_packer_creates_directory(tmp_path: Path):
+    for uri in [
+        str(tmp_path / "a" / "_rikai" / "packs" / "0.pack"),
+        (tmp_path / "b" / "_rikai" / "packs" / "0.pack").as_uri(),
+    ]:
+        with BlobPacker(uri) as packer:
+            ranged = packer.append(b"abc")
+        with open_uri(ranged) as fobj:
+            assert fobj.read() == b"abc"
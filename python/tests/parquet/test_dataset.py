@@ -26,7 +26,7 @@ from pyspark.sql import Row, SparkSession
 from rikai.exceptions import ColumnNotFoundError
 from rikai.parquet import Dataset
 from rikai.testing.asserters import assert_count_equal
-from rikai.types import Image
+from rikai.types import Box2d, Image, Mask
 
 
 def _select_columns(spark: SparkSession, tmpdir: str):
@@ -165,6 +165,110 @@ def test_group_size(spark: SparkSession, tmp_path: Path):
     _verify_group_size(tmp_path, 8 * 1024 * 1024)
 
 
+def test_nested_udt_columns(spark: SparkSession, tmp_path: Path):
+    mask = Mask.from_polygon([[1, 1, 5, 1, 5, 6]], height=10, width=10)
+    rows = [
+        Row(
+            id=i,
+            box=Box2d(i, i, i + 1, i + 2) if i % 3 else None,
+            annotations=[
+                Row(label=f"label-{j}", box=Box2d(j, 0, j + 1, 1), mask=mask)
+                for j in range(i % 4)
+            ],
+        )
+        for i in range(30)
+    ]
+    spark.createDataFrame(rows).write.format("rikai").save(str(tmp_path))
+
+    actual = sorted(Dataset(tmp_path), key=lambda r: r["id"])
+    assert [r["box"] for r in actual] == [r.box for r in rows]
+    for row, expected in zip(actual, rows):
+        assert row["annotations"] == [
+            ann.asDict() for ann in expected.annotations
+        ]
+
+    pdf = Dataset(tmp_path).to_pandas().sort_values("id")
+    assert pdf["box"].tolist() == [r.box for r in rows]
+
+
+def test_dedup_images(spark: SparkSession, tmp_path: Path):
+    from rikai.spark.utils import df_to_rikai
+
+    arrays = [
+        np.full((8, 8, 3), fill_value=i, dtype=np.uint8) for i in range(3)
+    ]
+    df = spark.createDataFrame(
+        [Row(id=i, image=Image.from_array(arrays[i % 3])) for i in range(30)]
+    )
+    df_to_rikai(df, str(tmp_path), dedup_images=True)
+
+    blobs = spark.read.parquet(str(tmp_path / "_rikai" / "blobs"))
+    assert blobs.count() == 3
+    raw = spark.read.format("rikai").load(str(tmp_path)).collect()
+    assert all(row.image.uri.startswith("blob:") for row in raw)
+
+    rows = sorted(Dataset(tmp_path), key=lambda r: r["id"])
+    assert len(rows) == 30
+    for row in rows:
+        assert row["image"].is_embedded
+        assert np.array_equal(row["image"].to_numpy(), arrays[row["id"] % 3])
+
+    pdf = Dataset(tmp_path).to_pandas()
+    assert all(img.is_embedded for img in pdf["image"])
+
+
+def test_build_box_index(spark: SparkSession, tmp_path: Path):
+    boxes = [Box2d(i, i, i + 2, i + 2) if i % 4 else None for i in range(40)]
+    df = spark.createDataFrame(
+        [Row(id=i, box=box) for i, box in enumerate(boxes)]
+    ).repartition(3)
+    df.write.format("rikai").save(str(tmp_path))
+
+    dataset = Dataset(tmp_path)
+    index = dataset.build_box_index("box")
+    assert len(index) == 30
+    assert (tmp_path / "_rikai" / "index" / "box.npz").exists()
+    # The index is not picked up as a part of the dataset.
+    assert len(list(Dataset(tmp_path))) == 40
+
+    rows = list(dataset)
+    ids = dataset.box_index("box").intersection(Box2d(10, 10, 11, 11))
+    assert sorted(rows[i]["id"] for i in ids) == [9, 10, 11]
+
+    with pytest.raises(ColumnNotFoundError):
+        dataset.build_box_index("nonexistent")
+
+
+def test_out_of_line_blobs(spark: SparkSession, tmp_path: Path):
+    from rikai.numpy import view
+    from rikai.spark.utils import df_to_rikai
+
+    df = spark.createDataFrame(
+        [
+            Row(
+                id=i,
+                image=Image.from_array(
+                    np.random.randint(0, 128, size=(32, 32, 3), dtype=np.uint8)
+                ),
+                mask=view(np.random.rand(32, 32)),
+                small=view(np.arange(4)),
+            )
+            for i in range(20)
+        ]
+    )
+    df_to_rikai(df, str(tmp_path), blob_threshold=1024)
+    assert list((tmp_path / "_rikai" / "packs").glob("*.pack"))
+
+    expected = {row.id: row for row in df.collect()}
+    for row in Dataset(tmp_path):
+        assert not row["image"].is_embedded
+        assert "#offset=" in row["image"].uri
+        source = expected[row["id"]]
+        assert np.array_equal(row["image"].to_numpy(), source.image.to_numpy())
+        assert np.array_equal(row["mask"], source.mask)
+        assert np.array_equal(row["small"], source.small)
+
+
 def test_select_columns_on_gcs(spark: SparkSession, gcs_tmpdir: str):
     _select_columns(spark, gcs_tmpdir)
 
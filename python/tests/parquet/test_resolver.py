@@ -46,6 +46,26 @@ def test_resolve_local_fs(tmp_path):
     assert_count_equal(expected_files, files)
 
 
+def test_resolve_skips_hidden_dirs(tmp_path):
+    (tmp_path / "_rikai" / "blobs").mkdir(parents=True)
+    (tmp_path / ".staging").mkdir()
+    (tmp_path / "part=1").mkdir()
+    for path in [
+        "_rikai/blobs/0.parquet",
+        ".staging/0.parquet",
+        "part=1/0.parquet",
+        "0.parquet",
+    ]:
+        (tmp_path / path).write_text("123")
+
+    files = Resolver.resolve(tmp_path)
+    expected_files = [
+        "file://" + str(tmp_path / "part=1" / "0.parquet"),
+        "file://" + str(tmp_path / "0.parquet"),
+    ]
+    assert_count_equal(expected_files, files)
+
+
 def test_resolve_empty_dir(tmp_path):
     assert [] == list(Resolver.resolve(tmp_path))
 
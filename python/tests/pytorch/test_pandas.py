@@ -18,6 +18,7 @@ import pandas as pd
 
 from rikai.pytorch.pandas import PandasDataset
 from rikai.types.geometry import Box2d
+from rikai.types.vision import Image
 
 
 def test_pandas_dataframe():
@@ -59,3 +60,34 @@ def test_pandas_series_with_udt():
     assert len(dataset) == 10
     for i in range(10):
         assert np.array_equal(dataset[i], np.array([i, i + 1, i + 2, i + 3]))
+
+
+def test_pandas_series_getitems_images():
+    arrays = [
+        np.random.randint(0, 255, size=(32, 48, 3), dtype=np.uint8)
+        for _ in range(4)
+    ]
+    dataset = PandasDataset(pd.Series([Image.from_array(a) for a in arrays]))
+    batch = dataset.__getitems__([2, 0])
+    assert np.array_equal(batch[0], arrays[2])
+    assert np.array_equal(batch[1], arrays[0])
+
+    dataset = PandasDataset(
+        pd.Series([Image.from_array(a) for a in arrays]),
+        use_pil=True,
+        image_size=(24, 16),
+    )
+    assert [img.size for img in dataset.__getitems__([1, 3])] == [
+        (24, 16),
+        (24, 16),
+    ]
+
+
+def test_decode_workers_in_dataloader(monkeypatch):
+    import torch.utils.data
+
+    from rikai.types.vision import _default_decode_workers
+
+    assert _default_decode_workers() > 1
+    monkeypatch.setattr(torch.utils.data, "get_worker_info", lambda: object())
+    assert _default_decode_workers() == 1
@@ -35,6 +35,7 @@ from rikai.spark.functions import (
     box2d_from_center,
     crop,
     image_copy,
+    image_info,
     init,
     numpy_to_image,
     spectrogram_image,
@@ -44,17 +45,30 @@ from rikai.spark.functions import (
 )
 from rikai.spark.types.geometry import Box2dType
 from rikai.spark.types.vision import ImageType
-from rikai.types import Box2d, Image, Segment, VideoStream, YouTubeVideo
+from rikai.types import (
+    Box2d,
+    Image,
+    Mask,
+    Segment,
+    VideoStream,
+    YouTubeVideo,
+)
 
 
 def test_init(spark):
     init(spark)
+    functions = {x.name: x.className for x in spark.catalog.listFunctions()}
     rikai_udf_names = [
-        x.name
-        for x in spark.catalog.listFunctions()
-        if x.className.startswith("org.apache.spark.sql.UDFRegistration")
+        name
+        for name, class_name in functions.items()
+        if class_name.startswith("org.apache.spark.sql.UDFRegistration")
     ]
-    assert "area" in rikai_udf_names
+    # Geometry functions are native Catalyst expressions.
+    for name in ["area", "box2d", "box2d_from_center", "box2d_from_top_left"]:
+        assert name not in rikai_udf_names
+        assert functions[name].startswith(
+            "org.apache.spark.sql.rikai.expressions"
+        )
     assert "copy" in rikai_udf_names
     assert "to_image" in rikai_udf_names
     assert len(rikai_udf_names) > 10
@@ -105,6 +119,34 @@ def test_box2d_center(spark):
     assert_area_equals([1.0, 5.0], df)
 
 
+def test_native_geometry_functions(spark: SparkSession):
+    init(spark)
+    df = spark.createDataFrame(
+        [
+            Row(values=[2.0, 3.0, 4.0, 5.0]),
+            Row(values=[10.0, 12.0, 11.0, 17.0]),
+        ]
+    )
+    df.createOrReplaceTempView("coords")
+    rows = spark.sql(
+        """SELECT box2d(values) AS box,
+        box2d_from_center(values) AS center,
+        area(box2d(values)) AS area,
+        iou(box2d(values), box2d_from_top_left(values)) AS iou,
+        scale(box2d(values), 2) AS scaled,
+        clip(box2d(values), 10, 10) AS clipped
+        FROM coords"""
+    ).collect()
+    assert [r.box for r in rows] == [Box2d(2, 3, 4, 5), Box2d(10, 12, 11, 17)]
+    assert rows[0].center == Box2d.from_center(2, 3, 4, 5)
+    assert [r.area for r in rows] == [4.0, 5.0]
+    assert rows[0].iou == pytest.approx(
+        Box2d(2, 3, 4, 5).iou(Box2d.from_top_left(2, 3, 4, 5))
+    )
+    assert rows[0].scaled == Box2d(2, 3, 4, 5) * 2
+    assert rows[1].clipped == Box2d(10, 10, 10, 10)
+
+
 def test_box2d_top_left(spark: SparkSession):
     df = spark.createDataFrame(
         [
@@ -187,6 +229,20 @@ def test_numpy_to_image(spark: SparkSession, tmp_path: Path):
     assert (tmp_path / "1.png").exists()
 
 
+def test_image_info(spark: SparkSession, tmp_path: Path):
+    uri = str(tmp_path / "test.jpg")
+    PILImage.fromarray(np.zeros((24, 32, 3), dtype=np.uint8)).save(uri)
+    df = spark.createDataFrame(
+        [Row(image=Image(uri)), Row(image=Image.read(uri))]
+    )
+    infos = [
+        row.info.asDict()
+        for row in df.select(image_info(col("image")).alias("info")).collect()
+    ]
+    expected = {"width": 32, "height": 24, "format": "JPEG", "mode": "RGB"}
+    assert infos == [expected, expected]
+
+
 def test_crops(spark: SparkSession, tmp_path: Path, two_flickr_images: list):
     img = two_flickr_images[0]
     data = img.to_numpy()
@@ -302,3 +358,34 @@ def test_video_metadata(spark: SparkSession, asset_path: Path):
     err = result["_errors"].asDict()
     assert err["message"].startswith("ffprobe error")
     assert "bad_uri: No such file or directory" in err["stderr"]
+
+
+def test_native_mask_functions(spark: SparkSession):
+    rng = np.random.default_rng(42)
+    masks = [
+        Mask.from_polygon(
+            [rng.uniform(-5, 40, size=8).tolist()], height=32, width=24
+        )
+        for _ in range(20)
+    ]
+    masks += [
+        Mask.from_rle(m._rle("C").tolist(), height=32, width=24) for m in masks
+    ]
+    masks += [
+        Mask.from_coco_rle(m._rle("F").tolist(), height=32, width=24)
+        for m in masks[:20]
+    ]
+    df = spark.createDataFrame(
+        [Row(id=i, mask=m, other=masks[-i - 1]) for i, m in enumerate(masks)]
+    )
+    df.createOrReplaceTempView("masks")
+    rows = spark.sql(
+        """SELECT id, mask_area(mask) AS area, mask_bbox(mask) AS bbox,
+        mask_iou(mask, other) AS iou, mask_to_rle(mask) AS rle
+        FROM masks ORDER BY id"""
+    ).collect()
+    for row, mask in zip(rows, masks):
+        assert row.area == mask.area
+        assert row.bbox == mask.bbox
+        assert row.iou == pytest.approx(mask.iou(masks[-row.id - 1]))
+        assert np.array_equal(row.rle.to_mask(), mask.to_mask())
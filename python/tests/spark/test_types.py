@@ -15,6 +15,7 @@
 import secrets
 from pathlib import Path
 
+import numpy as np
 from pyspark.sql import DataFrame, Row, SparkSession
 
 # Rikai
@@ -25,6 +26,7 @@ from rikai.types import (
     Image,
     Mask,
     Point,
+    PointCloud,
     Segment,
     VideoStream,
     YouTubeVideo,
@@ -62,6 +64,41 @@ def test_mask(spark, tmpdir):
     _check_roundtrip(spark, df, tmpdir)
 
 
+def test_polygon_mask(spark, tmpdir):
+    df = spark.createDataFrame(
+        [
+            Row(
+                mask=Mask.from_polygon(
+                    [[1, 1, 5, 1, 5, 5], [10, 10, 20, 10, 20, 20, 10, 20]],
+                    height=30,
+                    width=40,
+                )
+            ),
+            Row(mask=Mask.from_polygon([], height=30, width=40)),
+        ]
+    )
+    _check_roundtrip(spark, df, tmpdir)
+
+
+def test_legacy_polygon_mask():
+    from rikai.spark.types.geometry import MaskType
+
+    polygons = [[1.0, 1.0, 5.0, 1.0, 5.0, 5.0]]
+    mask = MaskType().deserialize(Row(1, 30, 40, polygons, None))
+    assert mask == Mask.from_polygon(polygons, height=30, width=40)
+
+
+def test_point_cloud(spark, tmpdir):
+    rng = np.random.default_rng(0)
+    df = spark.createDataFrame(
+        [
+            Row(cloud=PointCloud(rng.uniform(size=(100, 4)), "xyzi")),
+            Row(cloud=PointCloud(np.zeros((0, 3)))),
+        ]
+    )
+    _check_roundtrip(spark, df, tmpdir)
+
+
 def test_embedded_images(spark, tmpdir):
     df = spark.createDataFrame([Row(Image(secrets.token_bytes(128)))])
     _check_roundtrip(spark, df, tmpdir)
@@ -14,11 +14,14 @@
 
 from pathlib import Path
 
+import numpy as np
+import pyarrow.parquet as pq
 from pyspark.sql import DataFrame, Row, SparkSession
 
-from rikai.spark.utils import df_to_rikai
+from rikai.spark.utils import df_to_rikai, iou_join
 from rikai.testing.asserters import assert_count_equal
-from rikai.types import Box2d
+from rikai.types import Box2d, Image
+from rikai.types.geometry import Box2dIndex, match_boxes
 
 
 def test_df_to_rikai(spark: SparkSession, tmp_path: Path):
@@ -28,3 +31,90 @@ def test_df_to_rikai(spark: SparkSession, tmp_path: Path):
     df_to_rikai(df, str(tmp_path))
     actual_df = spark.read.format("rikai").load(str(tmp_path))
     assert_count_equal(df.collect(), actual_df.collect())
+
+
+def test_df_to_rikai_rows_per_group(spark: SparkSession, tmp_path: Path):
+    df = spark.createDataFrame(
+        [
+            Row(
+                id=i,
+                image=Image.from_array(
+                    np.random.randint(0, 255, size=(64, 64, 3), dtype=np.uint8)
+                ),
+            )
+            for i in range(2000)
+        ]
+    ).repartition(1)
+    df_to_rikai(df, str(tmp_path), rows_per_group=100, groups_per_file=4)
+
+    files = sorted(tmp_path.glob("*.parquet"))
+    assert len(files) > 1
+    group_rows = []
+    for path in files:
+        metadata = pq.read_metadata(path)
+        assert metadata.num_row_groups <= 8
+        group_rows.extend(
+            metadata.row_group(i).num_rows
+            for i in range(metadata.num_row_groups)
+        )
+    assert sum(group_rows) == 2000
+    # The row group size is estimated, so allow some slack.
+    assert max(group_rows) <= 300
+
+
+def test_iou_join(spark: SparkSession):
+    rng = np.random.default_rng(7)
+
+    def random_boxes(count):
+        xy = rng.integers(0, 20, size=(count, 2))
+        return np.column_stack([xy, xy + rng.integers(5, 20, (count, 2))])
+
+    ground_truth = {i: random_boxes(10) for i in range(5)}
+    predictions = {i: random_boxes(12) for i in range(5)}
+    scores = {i: rng.random(12) for i in range(5)}
+    gt_df = spark.createDataFrame(
+        [
+            Row(image_id=i, label=f"gt-{j}", box=Box2d(*box.tolist()))
+            for i, boxes in ground_truth.items()
+            for j, box in enumerate(boxes)
+        ]
+    )
+    pred_df = spark.createDataFrame(
+        [
+            Row(
+                image_id=i,
+                label=f"pred-{j}",
+                box=Box2d(*box.tolist()),
+                score=float(scores[i][j]),
+            )
+            for i, boxes in predictions.items()
+            for j, box in enumerate(boxes)
+        ]
+    )
+
+    pairs = iou_join(gt_df, pred_df, on="image_id", threshold=0.2).collect()
+    expected = []
+    for i in ground_truth:
+        query, ids, _ = Box2dIndex(predictions[i]).iou_pairs(
+            ground_truth[i], threshold=0.2
+        )
+        expected += [(i, f"gt-{q}", f"pred-{p}") for q, p in zip(query, ids)]
+    assert_count_equal(
+        expected,
+        [(r.image_id, r.left.label, r.right.label) for r in pairs],
+    )
+    assert all(r.iou >= 0.2 for r in pairs)
+
+    matches = iou_join(
+        gt_df, pred_df, on="image_id", greedy=True, score="score"
+    ).collect()
+    expected = []
+    for i in ground_truth:
+        gt, pred = match_boxes(
+            ground_truth[i], predictions[i], 0.5, scores=scores[i]
+        )
+        expected += [(i, f"gt-{g}", f"pred-{p}") for g, p in zip(gt, pred)]
+    assert_count_equal(
+        expected,
+        [(r.image_id, r.left.label, r.right.label) for r in matches],
+    )
@@ -13,6 +13,7 @@
 #  limitations under the License.
 
 import base64
+import mmap
 from io import BytesIO
 from pathlib import Path
 
@@ -21,7 +22,15 @@ import PIL
 import requests
 import requests_mock
 
-from rikai.io import exists, open_uri
+import rikai.conf
+from rikai.io import (
+    copy,
+    exists,
+    open_input_stream,
+    open_uri,
+    range_uri,
+    read_range,
+)
 from rikai.types.vision import Image
 
 WIKIPEDIA = (
@@ -72,3 +81,59 @@ def test_exists(tmp_path: Path):
     with (tmp_path / "a.txt").open(mode="w") as fobj:
         fobj.write("blabla")
     assert exists(str(tmp_path / "a.txt"))
+
+
+def test_open_uri_memory_map(tmp_path: Path):
+    data = np.random.randint(0, 255, size=(32, 32, 3), dtype=np.uint8)
+    uri = str(tmp_path / "test.png")
+    PIL.Image.fromarray(data).save(uri)
+    empty_uri = tmp_path / "empty.bin"
+    empty_uri.touch()
+
+    rikai.conf.set_option(rikai.conf.CONF_RIKAI_IO_MEMORY_MAP, True)
+    try:
+        with open_uri(uri) as fobj:
+            assert isinstance(fobj, mmap.mmap)
+        with open_uri(str(empty_uri)) as fobj:
+            assert fobj.read() == b""
+        assert np.array_equal(Image(uri).to_numpy(), data)
+        assert np.array_equal(Image("file://" + uri).to_numpy(), data)
+        with open_input_stream(uri) as fobj:
+            with open(uri, mode="rb") as expected:
+                assert fobj.read() == expected.read()
+    finally:
+        rikai.conf.reset_option(rikai.conf.CONF_RIKAI_IO_MEMORY_MAP)
+
+
+def test_read_range(tmp_path: Path):
+    uri = str(tmp_path / "data.bin")
+    with open(uri, mode="wb") as fobj:
+        fobj.write(bytes(range(100)))
+    assert read_range(uri, 10, 5) == bytes(range(10, 15))
+    assert read_range(uri, 95, 10) == bytes(range(95, 100))
+
+    with requests_mock.Mocker() as mock:
+        mock.get("http://test.com/a.jpg", content=bytes(range(100)))
+        # The server ignores the range request.
+        assert read_range("http://test.com/a.jpg", 10, 5) == bytes(
+            range(10, 15)
+        )
+        assert mock.request_history[0].headers["Range"] == "bytes=10-14"
+
+
+def test_range_uri(tmp_path: Path):
+    uri = str(tmp_path / "data.bin")
+    with open(uri, mode="wb") as fobj:
+        fobj.write(bytes(range(100)))
+    ranged = range_uri(uri, 10, 20)
+    assert ranged == f"{uri}#offset=10&length=20"
+
+    with open_uri(ranged) as fobj:
+        assert fobj.read() == bytes(range(10, 30))
+    assert read_range(ranged, 5, 100) == bytes(range(15, 30))
+    assert read_range(ranged, 30, 10) == b""
+    assert exists(ranged)
+
+    dest = copy(ranged, str(tmp_path / "copied.bin"))
+    with open_uri(dest) as fobj:
+        assert fobj.read() == bytes(range(10, 30))
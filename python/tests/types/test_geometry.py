@@ -12,13 +12,33 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import pickle
 from typing import Sequence
 
 import numpy as np
+import pyarrow as pa
 import pytest
 from PIL import Image, ImageDraw
-
-from rikai.types import Box2d, Box3d, Mask, Point
+from pyspark.sql import Row
+
+from rikai.conf import CONF_RIKAI_MASK_RASTERIZER, reset_option, set_option
+from rikai.types import (
+    Box2d,
+    Box2dArray,
+    Box3d,
+    Mask,
+    Point,
+    PointCloud,
+    polygon,
+    rle,
+)
+from rikai.types.geometry import (
+    Box2dIndex,
+    Box3dArray,
+    match_boxes,
+    nms,
+    soft_nms,
+)
 
 
 def test_scale_box2d():
@@ -71,6 +91,98 @@ def test_box2d_matrix_iou():
     assert np.allclose([[0.25, 0.0], [0.0625, 0.25]], Box2d.ious(vec1, vec2))
 
 
+def _random_boxes(rng, count):
+    xy = rng.uniform(0, 100, size=(count, 2))
+    return np.hstack([xy, xy + rng.uniform(1, 30, size=(count, 2))])
+
+
+def test_box2d_tiled_ious(monkeypatch):
+    import rikai.types.geometry
+
+    rng = np.random.default_rng(7)
+    boxes1, boxes2 = _random_boxes(rng, 50), _random_boxes(rng, 30)
+    expected = Box2d.ious(boxes1, boxes2)
+
+    monkeypatch.setattr(rikai.types.geometry, "_IOU_TILE_SIZE", 8)
+    assert np.allclose(Box2d.ious(boxes1, boxes2), expected)
+
+    out = np.empty((50, 30), dtype=np.float32)
+    assert Box2d.ious(boxes1, boxes2, out=out) is out
+    assert np.allclose(out, expected, atol=1e-6)
+    assert Box2d.ious(boxes1, boxes2, dtype=np.float32).dtype == np.float32
+    with pytest.raises(ValueError):
+        Box2d.ious(boxes1, boxes2, out=np.empty((30, 50)))
+
+
+def test_box2d_iou_pairs(monkeypatch):
+    import rikai.types.geometry
+
+    rng = np.random.default_rng(7)
+    boxes1, boxes2 = _random_boxes(rng, 50), _random_boxes(rng, 30)
+    dense = Box2d.ious(boxes1, boxes2)
+    monkeypatch.setattr(rikai.types.geometry, "_IOU_TILE_SIZE", 8)
+
+    rows, cols, ious = Box2d.iou_pairs(boxes1, boxes2, threshold=0.1)
+    expected_rows, expected_cols = np.nonzero(dense > 0.1)
+    assert rows.tolist() == expected_rows.tolist()
+    assert cols.tolist() == expected_cols.tolist()
+    assert np.allclose(ious, dense[rows, cols], atol=1e-6)
+
+    rows, cols, ious = Box2d.iou_pairs(boxes1, boxes2, topk=2)
+    for row in range(50):
+        expected = np.sort(dense[row][dense[row] > 0])[::-1][:2]
+        assert np.allclose(ious[rows == row], expected, atol=1e-6)
+    assert np.allclose(ious, dense[rows, cols], atol=1e-6)
+
+    rows, cols, ious = Box2d.iou_pairs([], boxes2)
+    assert rows.size == 0 and cols.size == 0 and ious.size == 0
+
+
+def test_box2d_index():
+    rng = np.random.default_rng(11)
+    boxes, queries = _random_boxes(rng, 500), _random_boxes(rng, 40)
+    index = Box2dIndex(boxes, node_capacity=4)
+    assert len(index) == 500
+
+    query, ids = index.intersection_pairs(queries)
+    expected = (
+        (queries[:, None, 0] <= boxes[None, :, 2])
+        & (boxes[None, :, 0] <= queries[:, None, 2])
+        & (queries[:, None, 1] <= boxes[None, :, 3])
+        & (boxes[None, :, 1] <= queries[:, None, 3])
+    )
+    expected_query, expected_ids = np.nonzero(expected)
+    assert query.tolist() == expected_query.tolist()
+    assert ids.tolist() == expected_ids.tolist()
+    assert index.intersection(Box2d(*queries[3])).tolist() == (
+        expected_ids[expected_query == 3].tolist()
+    )
+
+    dense = Box2d.ious(queries, boxes)
+    query, ids, ious = index.iou_pairs(queries, threshold=0.2)
+    expected_query, expected_ids = np.nonzero(dense >= 0.2)
+    assert query.tolist() == expected_query.tolist()
+    assert ids.tolist() == expected_ids.tolist()
+    assert np.allclose(ious, dense[query, ids])
+
+
+def test_box2d_index_ids_and_save(tmp_path):
+    boxes = [Box2d(0, 0, 10, 10), Box2d(20, 20, 30, 30), Box2d(5, 5, 15, 15)]
+    index = Box2dIndex(boxes, ids=[100, 200, 300])
+    assert index.intersection(Box2d(8, 8, 9, 9)).tolist() == [100, 300]
+
+    # Saved into a directory that does not exist yet.
+    uri = str(tmp_path / "_rikai" / "index" / "box.npz")
+    index.save(uri)
+    loaded = Box2dIndex.load(uri)
+    assert loaded.intersection(Box2d(8, 8, 9, 9)).tolist() == [100, 300]
+    assert loaded.intersection(Box2d(40, 40, 50, 50)).size == 0
+
+    empty = Box2dIndex([])
+    assert len(empty) == 0
+    assert empty.intersection(Box2d(0, 0, 1, 1)).size == 0
+
+
 def test_box2d_empty_ious():
     boxes = [Box2d(0, 0, 10, 10), Box2d(0, 0, 20, 20)]
     assert Box2d.ious([], boxes) is None
@@ -91,6 +203,164 @@ def test_box2d_empty_iou():
     assert box1.iou([]).size == 0
 
 
+def test_box_slots():
+    box2d = Box2d(1, 2, 3, 4)
+    box3d = Box3d(Point(1, 2, 3), 4, 5, 6, 0.5)
+    for obj in [box2d, box3d, box3d.center]:
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.label = "car"
+        assert pickle.loads(pickle.dumps(obj)) == obj
+
+    assert Box2d._from_trusted(1.0, 2.0, 3.0, 4.0) == box2d
+    assert Point._from_trusted(1.0, 2.0, 3.0) == box3d.center
+    assert (
+        Box3d._from_trusted(Point._from_trusted(1.0, 2.0, 3.0), 4, 5, 6, 0.5)
+        == box3d
+    )
+
+
+def test_box_udt_deserialize():
+    assert Box2d.__UDT__.deserialize(Row(1.0, 2.0, 3.0, 4.0)) == Box2d(
+        1, 2, 3, 4
+    )
+    assert Point.__UDT__.deserialize(Row(1.0, 2.0, 3.0)) == Point(1, 2, 3)
+
+    expected = Box3d(Point(1, 2, 3), 4, 5, 6, 0.5)
+    # The nested center is already a Point in Spark, and a dict in parquet.
+    for center in [Point(1, 2, 3), {"x": 1.0, "y": 2.0, "z": 3.0}]:
+        datum = Row(
+            center=center, length=4.0, width=5.0, height=6.0, heading=0.5
+        )
+        assert Box3d.__UDT__.deserialize(datum) == expected
+
+
+def test_box2d_array():
+    boxes = [Box2d(0, 0, 10, 10), Box2d(5, 5, 20, 10), Box2d(1, 2, 3, 4)]
+    arr = Box2dArray.from_boxes(boxes)
+    assert len(arr) == 3
+    assert list(arr) == boxes
+    assert arr[1] == boxes[1]
+    assert arr[1:] == Box2dArray.from_boxes(boxes[1:])
+    assert arr[arr.area > 10] == Box2dArray.from_boxes(boxes[:2])
+    assert np.allclose(arr.area, [b.area for b in boxes])
+    assert (arr * (2, 4)).to_list() == [b * (2, 4) for b in boxes]
+    assert (arr / 2).to_list() == [b / 2 for b in boxes]
+    assert arr.clip(8, 6)[1] == Box2d(5, 5, 8, 6)
+    assert np.allclose(arr.ious(boxes), Box2d.ious(boxes, boxes))
+
+    centered = Box2dArray.from_center([5], [5], [10], [4])
+    assert centered[0] == Box2d.from_center(5, 5, 10, 4)
+    top_left = Box2dArray.from_top_left([1], [2], [3], [4])
+    assert top_left[0] == Box2d.from_top_left(1, 2, 3, 4)
+
+    assert len(Box2dArray([])) == 0
+    with pytest.raises(ValueError):
+        Box2dArray(np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        Box2dArray([[5, 5, 1, -3]])
+    with pytest.raises(ValueError):
+        Box2dArray.from_top_left([-1], [2], [3], [4])
+
+
+def test_box2d_array_arrow():
+    arr = Box2dArray.from_top_left(*np.random.rand(4, 10) * 100)
+    struct = arr.to_arrow()
+    assert struct.type.names == ["xmin", "ymin", "xmax", "ymax"]
+    assert Box2dArray.from_arrow(struct) == arr
+    assert (
+        Box2dArray.from_arrow(pa.chunked_array([struct[:4], struct[4:]]))
+        == arr
+    )
+
+
+def _naive_nms(boxes, scores, iou_threshold):
+    kept = []
+    for i in np.argsort(-scores, kind="stable"):
+        if all(boxes[i].iou(boxes[k]) <= iou_threshold for k in kept):
+            kept.append(i)
+    return kept
+
+
+def test_nms():
+    boxes = [
+        Box2d(0, 0, 10, 10),
+        Box2d(1, 1, 11, 11),
+        Box2d(20, 20, 30, 30),
+        Box2d(0, 0, 9, 9),
+    ]
+    scores = np.array([0.9, 0.95, 0.5, 0.3])
+    assert nms(boxes, scores, iou_threshold=0.5).tolist() == [1, 2]
+    assert nms(boxes, scores, labels=[0, 1, 0, 0]).tolist() == [1, 0, 2]
+    # Classes are kept apart with negative coordinates too.
+    negative = np.array([[-100, -100, 10, 10], [-90, -90, 10, 10]])
+    assert nms(negative, [0.9, 0.8], 0.5).tolist() == [0]
+    assert nms(negative, [0.9, 0.8], 0.5, labels=[0, 1]).tolist() == [0, 1]
+    assert nms([], []).size == 0
+
+
+def test_nms_tiles(monkeypatch):
+    import rikai.types.geometry
+
+    rng = np.random.default_rng(42)
+    xy = rng.uniform(0, 100, size=(200, 2))
+    boxes = np.hstack([xy, xy + rng.uniform(1, 30, size=(200, 2))])
+    scores = rng.random(200)
+    expected = _naive_nms(Box2dArray(boxes), scores, 0.3)
+
+    monkeypatch.setattr(rikai.types.geometry, "_IOU_TILE_SIZE", 16)
+    assert nms(boxes, scores, iou_threshold=0.3).tolist() == expected
+
+
+def test_soft_nms():
+    boxes = [Box2d(0, 0, 10, 10), Box2d(1, 1, 11, 11), Box2d(20, 20, 30, 30)]
+    indices, scores = soft_nms(boxes, [0.9, 0.8, 0.7])
+    assert indices.tolist() == [0, 2, 1]
+    iou = boxes[0].iou(boxes[1])
+    assert np.allclose(scores, [0.9, 0.7, 0.8 * np.exp(-(iou**2) / 0.5)])
+
+    indices, scores = soft_nms(
+        boxes, [0.9, 0.8, 0.7], method="linear", iou_threshold=0.5
+    )
+    assert np.allclose(scores, [0.9, 0.7, 0.8 * (1 - iou)])
+
+    indices, _ = soft_nms(boxes, [0.9, 0.8, 0.7], score_threshold=0.75)
+    assert indices.tolist() == [0]
+    with pytest.raises(ValueError):
+        soft_nms(boxes, [0.9, 0.8, 0.7], method="unknown")
+
+
+def test_match_boxes():
+    ground_truth = [Box2d(0, 0, 10, 10), Box2d(0, 0, 10, 12)]
+    predictions = [
+        Box2d(0, 0, 10, 11),
+        Box2d(0, 0, 10, 13),
+        Box2d(50, 50, 60, 60),
+    ]
+
+    # The first prediction takes the best ground truth box.
+    gt_ind, pred_ind = match_boxes(ground_truth, predictions)
+    assert gt_ind.tolist() == [1, 0]
+    assert pred_ind.tolist() == [0, 1]
+
+    # Visit the predictions by scores.
+    gt_ind, pred_ind = match_boxes(
+        ground_truth, predictions, scores=[0.1, 0.9, 0.5]
+    )
+    assert gt_ind.tolist() == [1, 0]
+    assert pred_ind.tolist() == [1, 0]
+
+    # The Hungarian matching maximizes the total IoU.
+    gt_ind, pred_ind = match_boxes(
+        ground_truth, predictions, method="hungarian"
+    )
+    assert gt_ind.tolist() == [0, 1]
+    assert pred_ind.tolist() == [0, 1]
+
+    gt_ind, pred_ind = match_boxes(ground_truth, [])
+    assert gt_ind.size == 0 and pred_ind.size == 0
+
+
 def test_to_dict():
     b = Box2d(0, 0, 20, 20)
     exp = {"xmin": b.xmin, "ymin": b.ymin, "xmax": b.xmax, "ymax": b.ymax}
@@ -122,3 +392,244 @@ def test_mask_from_rle():
         full_mask,
         Mask.from_rle([0, 100 * 100], height=100, width=100).to_mask(),
     )
+
+
+def test_mask_rle_operations():
+    mask1 = np.zeros((20, 30), dtype=np.uint8)
+    mask1[2:10, 5:15] = 1
+    mask2 = np.zeros((20, 30), dtype=np.uint8)
+    mask2[6:16, 10:25] = 1
+    rle_mask = Mask.from_rle(rle.encode(mask1), width=30, height=20)
+    coco_mask = Mask.from_coco_rle(
+        rle.encode(mask2, order="F"), width=30, height=20
+    )
+    polygon = Mask.from_polygon(
+        [[10, 6, 24, 6, 24, 15, 10, 15]], width=30, height=20
+    )
+
+    assert rle_mask.area == 80
+    assert rle_mask.bbox == Box2d(5, 2, 15, 10)
+    assert coco_mask.bbox == Box2d(10, 6, 25, 16)
+    assert np.array_equal(
+        rle_mask.intersection(coco_mask).to_mask(), mask1 & mask2
+    )
+    assert np.array_equal(rle_mask.union(coco_mask).to_mask(), mask1 | mask2)
+    assert coco_mask.union(rle_mask).type == Mask.Type.COCO_RLE
+    assert np.array_equal(
+        Mask.merge([rle_mask, coco_mask, polygon], intersect=True).to_mask(),
+        mask1 & mask2 & polygon.to_mask(),
+    )
+
+    expected = (mask1 & mask2).sum() / (mask1 | mask2).sum()
+    assert rle_mask.iou(coco_mask) == pytest.approx(expected)
+    ious = Mask.ious([rle_mask, coco_mask], [coco_mask, polygon])
+    assert ious.shape == (2, 2)
+    assert ious[0, 0] == pytest.approx(expected)
+    assert ious[1, 0] == pytest.approx(1.0)
+    assert ious[1, 1] == pytest.approx(1.0)
+    assert Mask.ious([], [coco_mask]).shape == (0, 1)
+
+
+def test_mask_from_mask():
+    arr = np.zeros((20, 30), dtype=np.uint8)
+    arr[2:10, 5:15] = 1
+    mask = Mask.from_mask(arr)
+    assert (mask.height, mask.width) == (20, 30)
+    assert np.array_equal(mask.to_mask(), arr)
+
+
+def test_mask_polygon_data():
+    data = [[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 12]]
+    mask = Mask.from_polygon(
+        polygon.PolygonList.from_lists(data), width=30, height=20
+    )
+    assert mask.data == data
+    assert all(isinstance(p, list) for p in mask.data)
+    assert mask.polygons.offsets.tolist() == [0, 6, 12]
+    assert mask == Mask.from_polygon(data, width=30, height=20)
+    assert mask.to_dict()["data"] == data
+
+    with pytest.raises(ValueError):
+        Mask.from_polygon([[1, 2, 3, 4, 5], [6, 7, 8, 9]], 30, 20)
+
+
+def test_mask_cache_rle():
+    data = [[10, 6, 24, 6, 24, 15, 10, 15]]
+    mask = Mask.from_polygon(data, width=30, height=20, cache_rle=True)
+    other = Mask.from_polygon(data, width=30, height=20)
+    assert mask.iou(other) == pytest.approx(1.0)
+    cached = mask._rle_cache["C"]
+    assert np.array_equal(mask.to_mask(), other.to_mask())
+    assert mask.area == 150
+    assert mask._rle_cache["C"] is cached
+    assert other._rle_cache is None
+    assert mask == other
+
+    mask = Mask.from_polygon(data, width=30, height=20, cache_rle=True)
+    arr = mask.to_mask()
+    assert np.array_equal(rle.decode(mask._rle_cache["C"], (20, 30)), arr)
+
+
+def test_mask_rasterizer():
+    data = [[2, 2, 27, 5, 4, 17, 25, 14]]
+    img = Image.new("L", (30, 20))
+    ImageDraw.Draw(img).polygon(data[0], fill=1)
+    mask = Mask.from_polygon(data, width=30, height=20)
+    assert np.array_equal(mask.to_mask(), np.array(img))
+
+    set_option(CONF_RIKAI_MASK_RASTERIZER, "scanline")
+    try:
+        assert np.array_equal(
+            mask.to_mask(), polygon.rasterize(data, (20, 30))
+        )
+        assert np.array_equal(
+            Mask.to_masks([mask])[0], polygon.rasterize(data, (20, 30))
+        )
+    finally:
+        reset_option(CONF_RIKAI_MASK_RASTERIZER)
+
+
+def test_masks_to_numpy():
+    arr = np.zeros((20, 30), dtype=np.uint8)
+    arr[2:10, 5:15] = 1
+    masks = [
+        Mask.from_polygon([[10, 6, 24, 6, 24, 15, 10, 15]], 30, 20),
+        Mask.from_coco_rle(rle.encode(arr, order="F"), 30, 20),
+        Mask.from_polygon([[0, 0, 5, 0, 5, 5]], 30, 20, cache_rle=True),
+    ]
+    out = np.zeros((3, 20, 30), dtype=np.uint8)
+    assert Mask.to_masks(masks, out=out) is out
+    for mask, expected in zip(masks, out):
+        assert np.array_equal(mask.to_mask(), expected)
+    assert "C" in masks[2]._rle_cache
+
+    with pytest.raises(ValueError):
+        Mask.to_masks(masks + [Mask.from_mask(np.zeros((3, 3)))])
+
+
+def test_box3d_corners():
+    box = Box3d(Point(1, 2, 3), 4, 2, 1, np.pi / 2)
+    assert np.allclose(box.to_numpy(), [1, 2, 3, 4, 2, 1, np.pi / 2])
+    assert np.allclose(
+        box.corners,
+        [
+            [0, 4, 2.5],
+            [0, 0, 2.5],
+            [2, 0, 2.5],
+            [2, 4, 2.5],
+            [0, 4, 3.5],
+            [0, 0, 3.5],
+            [2, 0, 3.5],
+            [2, 4, 3.5],
+        ],
+    )
+    assert box.volume == 8
+
+
+def _random_box3ds(rng, count):
+    return np.column_stack(
+        [
+            rng.uniform(0, 10, size=(count, 3)),
+            rng.uniform(1, 5, size=(count, 3)),
+            rng.uniform(-np.pi, np.pi, size=count),
+        ]
+    )
+
+
+def test_box3d_ious():
+    box1 = Box3d(Point(0, 0, 0), 2, 2, 2, 0)
+    # The same footprint, rotated by 90 degrees and shifted up by half.
+    box2 = Box3d(Point(0, 0, 1), 2, 2, 2, np.pi / 2)
+    assert box1.bev_iou(box2) == pytest.approx(1.0)
+    assert box1.iou(box2) == pytest.approx(4 / 12)
+    # A diamond over a square: the intersection is an octagon.
+    box3 = Box3d(Point(0, 0, 0), 2, 2, 2, np.pi / 4)
+    octagon = 8 * (np.sqrt(2) - 1)
+    assert box1.bev_iou(box3) == pytest.approx(octagon / (8 - octagon))
+    assert box1.iou(Box3d(Point(5, 5, 0), 2, 2, 2, 0)) == 0
+
+    # Axis-aligned boxes match Box2d.
+    rng = np.random.default_rng(3)
+    boxes = _random_box3ds(rng, 30)
+    boxes[:, 6] = 0
+    footprints = np.column_stack(
+        [
+            boxes[:, 0] - boxes[:, 3] / 2,
+            boxes[:, 1] - boxes[:, 4] / 2,
+            boxes[:, 0] + boxes[:, 3] / 2,
+            boxes[:, 1] + boxes[:, 4] / 2,
+        ]
+    )
+    assert np.allclose(
+        Box3d.bev_ious(boxes, boxes), Box2d.ious(footprints, footprints)
+    )
+
+
+def test_box3d_tiled_ious(monkeypatch):
+    import rikai.types.geometry
+
+    rng = np.random.default_rng(3)
+    boxes1, boxes2 = _random_box3ds(rng, 20), _random_box3ds(rng, 30)
+    bev, ious = Box3d.bev_ious(boxes1, boxes2), Box3d.ious(boxes1, boxes2)
+    assert bev.shape == (20, 30)
+    assert np.all(ious <= bev + 1e-9)
+    assert np.allclose(np.diag(Box3d.ious(boxes1, boxes1)), 1)
+
+    monkeypatch.setattr(rikai.types.geometry, "_ROTATED_IOU_TILE_SIZE", 7)
+    assert np.allclose(Box3d.bev_ious(boxes1, boxes2), bev)
+    assert np.allclose(Box3d.ious(boxes1, boxes2), ious)
+    assert Box3d.ious([], boxes2).shape == (0, 30)
+
+
+def test_box3d_array():
+    rng = np.random.default_rng(3)
+    data = _random_box3ds(rng, 5)
+    boxes = Box3dArray(data)
+    assert len(boxes) == 5
+    assert isinstance(boxes[0], Box3d)
+    assert np.allclose(boxes[0].to_numpy(), data[0])
+    assert boxes[1:3] == Box3dArray(data[1:3])
+    assert Box3dArray.from_boxes(boxes.to_list()) == boxes
+    assert boxes.corners.shape == (5, 8, 3)
+    assert np.allclose(boxes.volume, np.prod(data[:, 3:6], axis=1))
+    assert np.allclose(boxes.ious(boxes), Box3d.ious(data, data))
+
+    arrow = boxes.to_arrow()
+    assert arrow.type.names == [
+        "center",
+        "length",
+        "width",
+        "height",
+        "heading",
+    ]
+    assert Box3dArray.from_arrow(pa.chunked_array([arrow])) == boxes
+    with pytest.raises(ValueError):
+        Box3dArray(np.zeros((2, 4)))
+
+
+def test_point_cloud():
+    data = np.array(
+        [[0.1, 0.1, 0.1, 1], [0.3, 0.2, 0.1, 3], [1.5, 0.5, 0.5, 5]],
+        dtype=np.float32,
+    )
+    cloud = PointCloud(data, fields=["x", "y", "z", "intensity"])
+    assert len(cloud) == 3
+    assert cloud.points.shape == (3, 3)
+    assert cloud["intensity"].tolist() == [1, 3, 5]
+
+    decoded = PointCloud.from_bytes(cloud.to_bytes(), cloud.fields)
+    assert decoded == cloud
+    assert decoded.to_numpy().dtype == np.float32
+
+    downsampled = cloud.voxel_downsample(1.0)
+    assert len(downsampled) == 2
+    assert np.allclose(sorted(downsampled["intensity"].tolist()), [2, 5])
+
+    box = Box3d(Point(1.5, 0.5, 0.5), 0.5, 0.5, 0.5, np.pi / 4)
+    assert cloud.crop(box)["intensity"].tolist() == [5]
+    assert len(cloud.crop(Box3d(Point(9, 9, 9), 1, 1, 1, 0))) == 0
+
+    with pytest.raises(ValueError):
+        PointCloud(data, fields=["x", "y", "z"])
+    with pytest.raises(ValueError):
+        PointCloud(data[:, :2], fields=["x", "y"])
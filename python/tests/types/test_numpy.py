@@ -21,7 +21,7 @@ from pyspark.sql import Row, SparkSession
 from pyspark.sql.functions import udf
 
 # Rikai
-from rikai.numpy import view
+from rikai.numpy import ArrayRef, view
 from rikai.spark.types import NDArrayType
 from rikai.types import Box2d, Image
 
@@ -71,3 +71,22 @@ def test_numpy_in_udf(spark: SparkSession, tmp_path: Path):
     df.show()
 
     df.write.format("rikai").save(str(tmp_path))
+
+
+def test_ndarray_out_of_line(tmp_path: Path):
+    from rikai.io import range_uri
+
+    arr = np.random.rand(4, 5)
+    uri = str(tmp_path / "blob.pack")
+    with open(uri, mode="wb") as fobj:
+        fobj.write(b"header")
+        fobj.write(arr.tobytes())
+
+    udt = NDArrayType()
+    ref = ArrayRef(str(arr.dtype), arr.shape, range_uri(uri, 6, arr.nbytes))
+    datum = udt.serialize(ref)
+    assert datum[2] is None
+    assert np.array_equal(udt.deserialize(datum), arr)
+
+    # Inline arrays written before the uri field existed.
+    assert np.array_equal(udt.deserialize(udt.serialize(arr)[:3]), arr)
@@ -0,0 +1,97 @@
+#  Copyright 2022 Rikai Authors
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from rikai.types import rle
+from rikai.types.polygon import (
+    PolygonList,
+    rasterize,
+    rasterize_batch,
+    rasterize_rle,
+    rasterize_rle_batch,
+)
+
+
+def _draw(polygons, shape):
+    with Image.fromarray(np.zeros(shape, dtype=np.uint8)) as im:
+        draw = ImageDraw.Draw(im)
+        for polygon in polygons:
+            draw.polygon(list(np.array(polygon)), fill=1)
+        return np.array(im)
+
+
+POLYGONS = [
+    [[10, 6, 24, 6, 24, 15, 10, 15]],
+    [[2, 2, 30, 5, 12, 18]],
+    [[5.7, 3.2, 20.9, 8.4, 14.1, 19.6, 3.3, 12.8]],
+    [[0, 0, 8, 0, 8, 8, 0, 8], [4, 4, 12, 4, 12, 12, 4, 12]],
+    [[-5, -5, 40, 3, 20, 30]],
+    [[3, 3, 10, 3]],
+]
+
+
+@pytest.mark.parametrize("polygons", POLYGONS)
+def test_rasterize_like_pil(polygons):
+    mask = rasterize(polygons, (20, 32))
+    assert mask.dtype == np.uint8
+    assert np.array_equal(mask, _draw(polygons, (20, 32)))
+    assert np.array_equal(
+        rle.decode(rasterize_rle(polygons, (20, 32)), (20, 32)), mask
+    )
+
+
+def test_rasterize_batch():
+    out = np.ones((len(POLYGONS), 20, 32), dtype=np.uint8)
+    assert rasterize_batch(POLYGONS, (20, 32), out=out) is out
+    for polygons, mask in zip(POLYGONS, out):
+        assert np.array_equal(mask, _draw(polygons, (20, 32)))
+
+    rles = rasterize_rle_batch(POLYGONS + [[]], (20, 32))
+    assert len(rles) == len(POLYGONS) + 1
+    assert rles[-1].tolist() == [20 * 32]
+
+
+def test_rasterize_empty():
+    assert rasterize([], (4, 5)).sum() == 0
+    assert rasterize([[50, 50, 60, 50, 60, 60]], (4, 5)).sum() == 0
+    assert rasterize_batch([], (4, 5)).shape == (0, 4, 5)
+
+
+def test_polygon_list():
+    polygons = PolygonList.from_lists([[1, 2, 3, 4, 5, 6], [], [7, 8, 9, 10]])
+    assert len(polygons) == 3
+    assert polygons.coords.dtype == np.float32
+    assert polygons.offsets.tolist() == [0, 6, 6, 10]
+    assert polygons[0].tolist() == [1, 2, 3, 4, 5, 6]
+    assert polygons[-1].tolist() == [7, 8, 9, 10]
+    assert np.shares_memory(polygons[2], polygons.coords)
+    assert polygons.to_list() == [[1, 2, 3, 4, 5, 6], [], [7, 8, 9, 10]]
+    assert polygons == [[1, 2, 3, 4, 5, 6], [], [7, 8, 9, 10]]
+    assert polygons != [[1, 2, 3, 4, 5, 6]]
+    assert PolygonList.from_lists(polygons) is polygons
+    with pytest.raises(IndexError):
+        polygons[3]
+
+    assert len(PolygonList.from_lists([])) == 0
+    with pytest.raises(ValueError):
+        PolygonList.from_lists([[1, 2, 3, 4, 5], [6, 7, 8, 9, 10, 11]])
+    with pytest.raises(ValueError):
+        PolygonList([1, 2, 3, 4], [0, 4, 6])
+    assert np.array_equal(
+        rasterize(polygons, (20, 32)),
+        rasterize(polygons.to_list(), (20, 32)),
+    )
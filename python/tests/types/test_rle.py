@@ -13,6 +13,7 @@
 #  limitations under the License.
 
 import numpy as np
+import pytest
 
 from rikai.types import rle
 
@@ -33,3 +34,91 @@ def test_rle_encoding():
     arr = np.asarray([1, 1, 0, 0])
     assert np.array_equal(rle.encode(arr), [0, 2, 2])
     assert np.array_equal(rle.decode(rle.encode(arr), arr.shape), arr)
+
+
+def test_rle_empty():
+    encoded = rle.encode(np.array([], dtype=np.uint8))
+    assert isinstance(encoded, np.ndarray)
+    assert encoded.size == 0
+
+
+def test_rle_order():
+    rng = np.random.default_rng(5)
+    mask = (rng.uniform(size=(6, 9)) > 0.5).astype(np.uint8)
+    for order in ["C", "F"]:
+        encoded = rle.encode(mask, order=order)
+        assert np.array_equal(rle.decode(encoded, mask.shape, order), mask)
+    assert np.array_equal(
+        rle.encode(mask, order="F"), rle.encode(mask.T, order="C")
+    )
+
+
+def test_rle_decode_batch():
+    rng = np.random.default_rng(5)
+    masks = (rng.uniform(size=(4, 6, 9)) > 0.5).astype(np.uint8)
+    for order in ["C", "F"]:
+        rles = [rle.encode(m, order=order) for m in masks]
+        assert np.array_equal(rle.decode_batch(rles, (6, 9), order), masks)
+
+        out = np.zeros((4, 6, 9), dtype=np.uint8)
+        assert rle.decode_batch(rles, (6, 9), order, out=out) is out
+        assert np.array_equal(out, masks)
+
+    assert rle.decode_batch([], (6, 9)).shape == (0, 6, 9)
+    with pytest.raises(ValueError):
+        rle.decode_batch([[3, 2]], (6, 9))
+    with pytest.raises(ValueError):
+        rle.decode_batch([[54]], (6, 9), out=np.zeros((2, 6, 9)))
+
+
+def _random_masks(rng, count, shape):
+    masks = np.zeros((count,) + shape, dtype=np.uint8)
+    for mask in masks:
+        for _ in range(3):
+            y, x = rng.integers(0, shape[0]), rng.integers(0, shape[1])
+            mask[y : y + shape[0] // 2, x : x + shape[1] // 3] = 1
+    return masks
+
+
+def test_rle_area_and_bbox():
+    rng = np.random.default_rng(9)
+    masks = _random_masks(rng, 10, (13, 17))
+    masks[0] = 0
+    for order in ["C", "F"]:
+        for mask in masks:
+            encoded = rle.encode(mask, order=order)
+            assert rle.area(encoded) == mask.sum()
+            ys, xs = np.nonzero(mask)
+            expected = (
+                (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+                if len(xs)
+                else (0, 0, 0, 0)
+            )
+            assert rle.bbox(encoded, mask.shape, order) == expected
+
+
+def test_rle_merge_and_ious():
+    rng = np.random.default_rng(9)
+    masks = _random_masks(rng, 6, (13, 17)).astype(bool)
+    masks[0] = False
+    for order in ["C", "F"]:
+        rles = [rle.encode(m, order=order) for m in masks]
+        assert np.array_equal(
+            rle.decode(rle.merge(rles), masks[0].shape, order),
+            np.logical_or.reduce(masks),
+        )
+        assert np.array_equal(
+            rle.decode(rle.merge(rles[1:3], True), masks[0].shape, order),
+            masks[1] & masks[2],
+        )
+
+        inter = np.einsum("ihw,jhw->ij", masks * 1, masks * 1)
+        union = (masks[:, None] | masks[None]).sum(axis=(2, 3))
+        expected = np.divide(
+            inter, union, out=np.zeros(inter.shape), where=union > 0
+        )
+        assert np.allclose(rle.ious(rles, rles), expected)
+        assert np.array_equal(rle.intersection_areas(rles[1], rles), inter[1])
+
+    with pytest.raises(ValueError):
+        rle.merge([[2, 3], [1, 2, 1]])
@@ -24,9 +24,10 @@ import pytest
 from PIL import Image as PILImage
 from PIL import ImageDraw as PILImageDraw
 
+from rikai.conf import CONF_RIKAI_IMAGE_CACHE_SIZE, reset_option, set_option
 from rikai.io import open_uri
 from rikai.types.geometry import Box2d
-from rikai.types.vision import Image, ImageDraw
+from rikai.types.vision import Image, ImageDraw, decode_batch
 from rikai.viz import Style, Text
 
 
@@ -282,3 +283,140 @@ def test_draw_without_annotations(test_image):
     img = Image.from_pil(test_image)
     rendered = (img | []).to_image()
     assert np.array_equal(rendered.to_numpy(), np.array(test_image))
+
+
+def test_decoded_image_cache(tmp_path, test_image: PILImage):
+    uri = str(tmp_path / "test.png")
+    test_image.save(uri)
+    expected = np.asarray(test_image)
+
+    set_option(CONF_RIKAI_IMAGE_CACHE_SIZE, 10 * expected.nbytes)
+    try:
+        img = Image(uri)
+        arr = img.to_numpy()
+        assert np.array_equal(arr, expected)
+        assert not arr.flags.writeable
+        # Same URI and same content hit the cache.
+        assert Image(uri).to_numpy() is arr
+        embedded = Image.read(uri)
+        assert embedded.to_numpy() is embedded.to_numpy()
+        with img.to_pil() as pil_img:
+            assert np.array_equal(np.asarray(pil_img), expected)
+    finally:
+        reset_option(CONF_RIKAI_IMAGE_CACHE_SIZE)
+    assert Image(uri).to_numpy() is not arr
+
+
+def test_decode_with_size(tmp_path):
+    data = np.random.randint(0, 255, size=(480, 640, 3), dtype=np.uint8)
+    uri = str(tmp_path / "test.jpg")
+    PILImage.fromarray(data).save(uri)
+
+    img = Image(uri)
+    assert img.to_numpy(size=(320, 240)).shape == (240, 320, 3)
+    assert img.to_numpy(size=(100, 50), mode="L").shape == (50, 100)
+    with img.to_pil(size=(300, 300)) as pil_img:
+        assert pil_img.size == (300, 300)
+        assert pil_img.mode == "RGB"
+
+    png = Image.from_array(data)
+    assert png.to_numpy(size=(64, 48)).shape == (48, 64, 3)
+
+
+def test_decode_batch(tmp_path):
+    arrays = [
+        np.random.randint(0, 255, size=(40, 60, 3), dtype=np.uint8)
+        for _ in range(5)
+    ]
+    images = [Image.from_array(arr) for arr in arrays]
+
+    batch = decode_batch(images, workers=2)
+    assert batch.shape == (5, 40, 60, 3) and batch.dtype == np.uint8
+    assert np.array_equal(batch, np.stack(arrays))
+
+    assert decode_batch(images, size=(30, 20)).shape == (5, 20, 30, 3)
+    assert decode_batch(images, mode="L").shape == (5, 40, 60)
+    assert decode_batch([]).shape == (0, 0, 0, 3)
+
+    # Images of different sizes are returned as a list.
+    small = np.random.randint(0, 255, size=(10, 10, 3), dtype=np.uint8)
+    mixed = decode_batch(images[:2] + [Image.from_array(small)])
+    assert isinstance(mixed, list)
+    assert np.array_equal(mixed[2], small)
+
+
+def test_decode_closes_source(tmp_path, test_image: PILImage, monkeypatch):
+    uri = str(tmp_path / "test.jpg")
+    test_image.save(uri)
+    img = Image(uri)
+    streams = []
+    open_asset = Image.open
+
+    def _open(self, *args, **kwargs):
+        streams.append(open_asset(self, *args, **kwargs))
+        return streams[-1]
+
+    monkeypatch.setattr(Image, "open", _open)
+    assert decode_batch([img], size=(50, 50)).shape == (1, 50, 50, 3)
+    assert img.to_numpy().shape == (100, 100, 3)
+    assert streams and all(stream.closed for stream in streams)
+
+
+def test_image_header(tmp_path, test_image: PILImage):
+    uri = str(tmp_path / "test.jpg")
+    test_image.save(uri)
+    for img in [Image(uri), Image.read(uri)]:
+        assert img.size == (100, 100)
+        assert img.format == "JPEG"
+        assert img.mode == "RGB"
+
+    gray = Image.from_array(np.zeros((20, 30), dtype=np.uint8))
+    assert gray.size == (30, 20)
+    assert gray.format == "PNG"
+    assert gray.mode == "L"
+
+    # Images pickled before the header was probed have no _header.
+    del gray._header
+    assert gray.size == (30, 20)
+
+
+def test_image_header_beyond_probe_size(tmp_path):
+    # The header of this JPEG does not fit in the probed bytes.
+    uri = str(tmp_path / "exif.jpg")
+    PILImage.fromarray(np.zeros((20, 30, 3), dtype=np.uint8)).save(
+        uri, icc_profile=b"\0" * 128 * 1024
+    )
+    assert Image(uri).size == (30, 20)
+
+
+def test_encoder_profiles(tmp_path):
+    data = np.random.randint(0, 255, size=(50, 60, 3), dtype=np.uint8)
+
+    fast = Image.from_array(data, profile="png_fast")
+    assert fast.format == "PNG"
+    assert np.array_equal(fast.to_numpy(), data)
+    assert np.array_equal(
+        Image.from_array(data, profile="lossless_fast").to_numpy(), data
+    )
+
+    jpeg = Image.from_array(data, tmp_path / "a.jpg", profile="jpeg")
+    assert jpeg.format == "JPEG"
+    # kwargs take precedence over the profile.
+    expected = tmp_path / "expected.jpg"
+    PILImage.fromarray(data).save(expected, quality=50, optimize=True)
+    Image.from_array(data, tmp_path / "b.jpg", profile="jpeg", quality=50)
+    assert filecmp.cmp(tmp_path / "b.jpg", expected)
+
+    with pytest.raises(ValueError):
+        Image.from_array(data, format="PNG", profile="jpeg_fast")
+    with pytest.raises(ValueError):
+        Image.from_array(data, profile="foo")
+
+    set_option("rikai.image.default.profile", "jpeg_fast")
+    try:
+        assert Image.from_array(data).format == "JPEG"
+        # The default profile does not apply to other formats.
+        assert Image.from_array(data, format="PNG").format == "PNG"
+    finally:
+        reset_option("rikai.image.default.profile")
+    assert Image.from_array(data).format == "PNG"
@@ -28,6 +28,10 @@ private[rikai] class RikaiOptions(parameters: Map[String, String]) {
       .getOrElse("rikai.block.size", s"${RikaiOptions.defaultBlockSize}")
       .toInt
 
+  /** Max number of records of a parquet file, if set. */
+  val maxRecordsPerFile: Option[Long] =
+    parameters.get("maxRecordsPerFile").map(_.toLong)
+
   /** Extract options */
   val options: Map[String, String] =
     parameters
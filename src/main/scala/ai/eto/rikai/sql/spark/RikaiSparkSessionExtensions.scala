@@ -33,7 +33,22 @@ import org.apache.spark.sql.catalyst.expressions.{
 }
 import org.apache.spark.sql.catalyst.plans.logical.LogicalPlan
 import org.apache.spark.sql.catalyst.rules.Rule
-import org.apache.spark.sql.rikai.expressions.{Area, IOU, ToStruct}
+import org.apache.spark.sql.rikai.expressions.{
+  Area,
+  Box2dFromCenter,
+  Box2dFromCorners,
+  Box2dFromTopLeft,
+  Clip,
+  IOU,
+  IouPairs,
+  MaskArea,
+  MaskBbox,
+  MaskIOU,
+  MaskToRle,
+  MatchBoxes,
+  Scale,
+  ToStruct
+}
 import org.apache.spark.sql.{SparkSession, SparkSessionExtensions}
 
 private class MlPredictRule(val session: SparkSession)
@@ -127,6 +142,105 @@ class RikaiSparkSessionExtensions extends (SparkSessionExtensions => Unit) {
       (exprs: Seq[Expression]) => IOU(exprs.head, exprs(1))
     )
 
+    extensions.injectFunction(
+      new FunctionIdentifier("box2d"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "Box2dFromCorners"
+      ),
+      (exprs: Seq[Expression]) => Box2dFromCorners(exprs.head)
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("box2d_from_center"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "Box2dFromCenter"
+      ),
+      (exprs: Seq[Expression]) => Box2dFromCenter(exprs.head)
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("box2d_from_top_left"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "Box2dFromTopLeft"
+      ),
+      (exprs: Seq[Expression]) => Box2dFromTopLeft(exprs.head)
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("scale"),
+      new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "Scale"),
+      (exprs: Seq[Expression]) =>
+        exprs match {
+          case Seq(box, factor)         => Scale(box, factor, factor)
+          case Seq(box, scaleX, scaleY) => Scale(box, scaleX, scaleY)
+          case _ =>
+            throw new UnsupportedOperationException(
+              s"SCALE requires 2 or 3 parameters, got ${exprs.size}"
+            )
+        }
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("clip"),
+      new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "Clip"),
+      (exprs: Seq[Expression]) => Clip(exprs.head, exprs(1), exprs(2))
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("iou_pairs"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "IouPairs"
+      ),
+      (exprs: Seq[Expression]) => IouPairs(exprs.head, exprs(1), exprs(2))
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("match_boxes"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "MatchBoxes"
+      ),
+      (exprs: Seq[Expression]) =>
+        if (exprs.size == 3 || exprs.size == 4) {
+          MatchBoxes(exprs)
+        } else {
+          throw new UnsupportedOperationException(
+            s"MATCH_BOXES requires 3 or 4 parameters, got ${exprs.size}"
+          )
+        }
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("mask_area"),
+      new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "MaskArea"),
+      (exprs: Seq[Expression]) => MaskArea(exprs.head)
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("mask_bbox"),
+      new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "MaskBbox"),
+      (exprs: Seq[Expression]) => MaskBbox(exprs.head)
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("mask_iou"),
+      new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "MaskIOU"),
+      (exprs: Seq[Expression]) => MaskIOU(exprs.head, exprs(1))
+    )
+
+    extensions.injectFunction(
+      new FunctionIdentifier("mask_to_rle"),
+      new ExpressionInfo(
+        "org.apache.spark.sql.rikai.expressions",
+        "MaskToRle"
+      ),
+      (exprs: Seq[Expression]) => MaskToRle(exprs.head)
+    )
+
     extensions.injectFunction(
       new FunctionIdentifier("to_struct"),
       new ExpressionInfo("org.apache.spark.sql.rikai.expressions", "ToStruct"),
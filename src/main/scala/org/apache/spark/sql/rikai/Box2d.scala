@@ -67,30 +67,15 @@ class Box2d(
     * }}}
     */
   def intersect(that: Box2d): Option[Box2d] = {
-    if (this.xmin > that.xmin) {
-      return that intersect this
+    val xmin = this.xmin max that.xmin
+    val ymin = this.ymin max that.ymin
+    val xmax = this.xmax min that.xmax
+    val ymax = this.ymax min that.ymax
+    if (xmin >= xmax || ymin >= ymax) {
+      None
+    } else {
+      Some(new Box2d(xmin, ymin, xmax, ymax))
     }
-
-    if (this.xmax <= that.xmin) {
-      return None
-    }
-
-    if (this.ymin > that.ymin) {
-      return that intersect this
-    }
-
-    if (this.ymax <= that.ymin) {
-      return None
-    }
-
-    Some(
-      new Box2d(
-        xmin = this.xmin max that.xmin,
-        xmax = this.ymax min that.ymax,
-        ymin = this.ymin max that.ymin,
-        ymax = this.ymax min that.ymax
-      )
-    )
   }
 
   /** Return True of the two bounding box overlaps. */
@@ -21,7 +21,6 @@ import org.apache.spark.sql.catalyst.expressions.{
   GenericInternalRow,
   UnsafeArrayData
 }
-import org.apache.spark.sql.catalyst.util.GenericArrayData
 import org.apache.spark.sql.types._
 
 object MaskTypeEnum extends Enumeration {
@@ -34,6 +33,10 @@ object MaskTypeEnum extends Enumeration {
 }
 
 /** Mask of an 2-D image.
+  *
+  * Polygons are stored flat, as one float coordinate buffer `coords` and the
+  * offsets of each polygon into it. Datasets written before used a nested
+  * `polygon` array, which is still read.
   */
 @SQLUserDefinedType(udt = classOf[MaskType])
 @SerialVersionUID(1L)
@@ -57,6 +60,15 @@ object Mask {
     new Mask(MaskTypeEnum.Polygon, polygon = Some(data))
   }
 
+  def fromPolygon(data: Array[Array[Float]], height: Int, width: Int): Mask = {
+    new Mask(
+      MaskTypeEnum.Polygon,
+      polygon = Some(data),
+      height = Some(height),
+      width = Some(width)
+    )
+  }
+
   def fromRLE(data: Array[Int], height: Int, width: Int): Mask = {
     new Mask(
       MaskTypeEnum.Rle,
@@ -87,14 +99,16 @@ private[spark] class MaskType extends UserDefinedType[Mask] {
         "polygon",
         ArrayType(ArrayType(FloatType))
       ),
-      StructField("rle", ArrayType(IntegerType))
+      StructField("rle", ArrayType(IntegerType)),
+      StructField("coords", ArrayType(FloatType, containsNull = false)),
+      StructField("offsets", ArrayType(IntegerType, containsNull = false))
     )
   )
 
   override def pyUDT: String = "rikai.spark.types.geometry.MaskType"
 
   override def serialize(m: Mask): InternalRow = {
-    val row = new GenericInternalRow(5)
+    val row = new GenericInternalRow(7)
     row.setInt(0, m.maskType.id)
     m.maskType match {
       case MaskTypeEnum.Rle | MaskTypeEnum.CocoRle =>
@@ -102,15 +116,21 @@ private[spark] class MaskType extends UserDefinedType[Mask] {
         row.setInt(2, m.width.get)
         row.setNullAt(3)
         row.update(4, UnsafeArrayData.fromPrimitiveArray(m.rle.get))
+        row.setNullAt(5)
+        row.setNullAt(6)
       case MaskTypeEnum.Polygon =>
-        val arrayData = new GenericArrayData(
-          m.polygon.get.map(arr => UnsafeArrayData.fromPrimitiveArray(arr))
-        )
+        row.setInt(1, m.height.getOrElse(0))
+        row.setInt(2, m.width.getOrElse(0))
+        val polygons = m.polygon.get
+        row.setNullAt(3)
+        row.setNullAt(4)
+        row.update(5, UnsafeArrayData.fromPrimitiveArray(polygons.flatten))
         row.update(
-          3,
-          arrayData
+          6,
+          UnsafeArrayData.fromPrimitiveArray(
+            polygons.scanLeft(0)((offset, arr) => offset + arr.length)
+          )
         )
-        row.setNullAt(4)
       case _ => throw new NotImplementedError()
     }
     row
@@ -123,11 +143,23 @@ private[spark] class MaskType extends UserDefinedType[Mask] {
 
         maskType match {
           case MaskTypeEnum.Polygon =>
-            val data = row.getArray(3)
-            val polygon = (0 until data.numElements())
-              .map(idx => data.getArray(idx).toFloatArray())
-              .toArray
-            Mask.fromPolygon(polygon)
+            val polygon =
+              if (row.numFields > 5 && !row.isNullAt(5)) {
+                val coords = row.getArray(5).toFloatArray()
+                val offsets = row.getArray(6).toIntArray()
+                offsets
+                  .sliding(2)
+                  .collect { case Array(from, until) =>
+                    coords.slice(from, until)
+                  }
+                  .toArray
+              } else {
+                val data = row.getArray(3)
+                (0 until data.numElements())
+                  .map(idx => data.getArray(idx).toFloatArray())
+                  .toArray
+              }
+            Mask.fromPolygon(polygon, row.getInt(1), row.getInt(2))
           case MaskTypeEnum.Rle =>
             val height = row.getInt(1)
             val width = row.getInt(2)
@@ -151,4 +183,10 @@ private[spark] class MaskType extends UserDefinedType[Mask] {
   override def userClass: Class[Mask] = classOf[Mask]
 
   override def toString: String = "mask"
+
+  override def equals(other: Any): Boolean = {
+    other.isInstanceOf[MaskType]
+  }
 }
+
+private[spark] object MaskType extends MaskType
@@ -48,14 +48,15 @@ private[spark] class NDArrayType extends UserDefinedType[NDArray] {
       Seq(
         StructField("type", StringType, false),
         StructField("shape", ArrayType(IntegerType, false)),
-        StructField("data", BinaryType, false)
+        StructField("data", BinaryType, true),
+        StructField("uri", StringType, true)
       )
     )
 
   override def pyUDT: String = "rikai.spark.types.NDArrayType"
 
   override def serialize(obj: NDArray): Any = {
-    val row = new GenericInternalRow(3)
+    val row = new GenericInternalRow(4)
     row.update(0, UTF8String.fromString(obj.dtype))
     row
   }
@@ -0,0 +1,130 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai
+
+import org.apache.spark.sql.catalyst.InternalRow
+import org.apache.spark.sql.catalyst.expressions.GenericInternalRow
+import org.apache.spark.sql.catalyst.util.GenericArrayData
+import org.apache.spark.sql.types._
+import org.apache.spark.unsafe.types.UTF8String
+
+import java.nio.{ByteBuffer, ByteOrder}
+
+/** A point cloud, i.e., a LiDAR sweep.
+  *
+  * The points are stored in one binary buffer of little-endian float32, row
+  * by row, with one value per field. The first three fields are the
+  * ''(x, y, z)'' coordinates, followed by optional channels, i.e.,
+  * ''intensity''.
+  *
+  * @constructor Create a point cloud.
+  * @param fields the names of the values of each point.
+  * @param data the ''(N, fields)'' float32 values of the points.
+  */
+@SQLUserDefinedType(udt = classOf[PointCloudType])
+@SerialVersionUID(1L)
+class PointCloud(
+    val fields: Seq[String],
+    val data: Array[Byte]
+) extends Serializable {
+
+  require(fields.length >= 3, "A point cloud has at least x, y and z")
+  require(
+    data.length % (4 * fields.length) == 0,
+    s"Data size ${data.length} does not match the fields $fields"
+  )
+
+  /** Number of points */
+  def numPoints: Int = data.length / (4 * fields.length)
+
+  /** Values of the points, row by row. */
+  def values: Array[Float] = {
+    val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+    val result = new Array[Float](data.length / 4)
+    buffer.asFloatBuffer().get(result)
+    result
+  }
+
+  override def equals(p: Any): Boolean =
+    p match {
+      case other: PointCloud =>
+        fields == other.fields && data.sameElements(other.data)
+      case _ => false
+    }
+
+  override def hashCode(): Int =
+    (fields, java.util.Arrays.hashCode(data)).hashCode()
+
+  override def toString: String =
+    s"PointCloud(points=$numPoints, fields=${fields.mkString(",")})"
+}
+
+object PointCloud {
+
+  /** Create a point cloud from the values of the points, row by row. */
+  def fromValues(fields: Seq[String], values: Array[Float]): PointCloud = {
+    val buffer =
+      ByteBuffer.allocate(values.length * 4).order(ByteOrder.LITTLE_ENDIAN)
+    buffer.asFloatBuffer().put(values)
+    new PointCloud(fields, buffer.array())
+  }
+}
+
+/** User defined type of [[PointCloud]]
+  */
+class PointCloudType extends UserDefinedType[PointCloud] {
+
+  override def sqlType: DataType =
+    StructType(
+      Seq(
+        StructField(
+          "fields",
+          ArrayType(StringType, containsNull = false),
+          nullable = false
+        ),
+        StructField("data", BinaryType, nullable = false)
+      )
+    )
+
+  override def pyUDT: String = "rikai.spark.types.geometry.PointCloudType"
+
+  override def serialize(obj: PointCloud): Any = {
+    val row = new GenericInternalRow(2)
+    row.update(
+      0,
+      new GenericArrayData(obj.fields.map(UTF8String.fromString).toArray)
+    )
+    row.update(1, obj.data)
+    row
+  }
+
+  override def deserialize(datum: Any): PointCloud = {
+    datum match {
+      case row: InternalRow =>
+        val fieldArray = row.getArray(0)
+        val fields = (0 until fieldArray.numElements())
+          .map(idx => fieldArray.getUTF8String(idx).toString)
+        new PointCloud(fields, row.getBinary(1))
+    }
+  }
+
+  override def userClass: Class[PointCloud] = classOf[PointCloud]
+
+  override def typeName: String = "pointcloud"
+}
+
+case object PointCloudType extends PointCloudType
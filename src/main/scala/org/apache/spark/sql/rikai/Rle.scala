@@ -0,0 +1,301 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai
+
+import scala.collection.mutable.ArrayBuffer
+
+/** Run-length encoded (RLE) masks.
+  *
+  * The counts alternate between runs of zeros and runs of ones, starting
+  * with zeros, over the pixels of a mask in row-major order or, for COCO RLE,
+  * in column-major order.
+  *
+  * These are the algorithms of the Python `rikai.types.rle` and
+  * `rikai.types.polygon` modules, so that masks give the same results in
+  * Spark SQL as in Python.
+  */
+object Rle {
+
+  /** The number of ones of a mask. */
+  def area(counts: Array[Int]): Long = {
+    var total = 0L
+    var i = 1
+    while (i < counts.length) {
+      total += counts(i)
+      i += 2
+    }
+    total
+  }
+
+  /** The bounding box `(xmin, ymin, xmax, ymax)` of the ones of a mask, in
+    * pixel edges, or all zeros for an empty mask.
+    */
+  def bbox(
+      counts: Array[Int],
+      height: Int,
+      width: Int,
+      columnMajor: Boolean
+  ): (Int, Int, Int, Int) = {
+    // Positions along the major (row in row-major order) and the minor axis.
+    val minorSize = if (columnMajor) height else width
+    var majorMin = Long.MaxValue
+    var majorMax = -1L
+    var minorMin = Long.MaxValue
+    var minorMax = -1L
+    var pos = 0L
+    var i = 0
+    while (i < counts.length) {
+      val start = pos
+      pos += counts(i)
+      if (i % 2 == 1 && counts(i) > 0) {
+        val firstMajor = start / minorSize
+        val lastMajor = (pos - 1) / minorSize
+        majorMin = majorMin min firstMajor
+        majorMax = majorMax max lastMajor
+        if (firstMajor != lastMajor) {
+          // A run that wraps over the end of a line covers the whole line.
+          minorMin = 0
+          minorMax = minorMax max (minorSize - 1)
+        } else {
+          minorMin = minorMin min (start % minorSize)
+          minorMax = minorMax max ((pos - 1) % minorSize)
+        }
+      }
+      i += 1
+    }
+    if (majorMax < 0) {
+      (0, 0, 0, 0)
+    } else if (columnMajor) {
+      (
+        majorMin.toInt,
+        minorMin.toInt,
+        majorMax.toInt + 1,
+        minorMax.toInt + 1
+      )
+    } else {
+      (
+        minorMin.toInt,
+        majorMin.toInt,
+        minorMax.toInt + 1,
+        majorMax.toInt + 1
+      )
+    }
+  }
+
+  /** The number of ones two masks of the same shape and order have in
+    * common, computed by walking both encodings at once.
+    */
+  def intersectionArea(left: Array[Int], right: Array[Int]): Long = {
+    var inter = 0L
+    var pos = 0L
+    var i = 0
+    var j = 0
+    var leftEnd = if (left.nonEmpty) left(0).toLong else 0L
+    var rightEnd = if (right.nonEmpty) right(0).toLong else 0L
+    while (i < left.length && j < right.length) {
+      val next = leftEnd min rightEnd
+      if (i % 2 == 1 && j % 2 == 1) {
+        inter += next - pos
+      }
+      pos = next
+      if (leftEnd == next) {
+        i += 1
+        if (i < left.length) leftEnd += left(i)
+      }
+      if (rightEnd == next) {
+        j += 1
+        if (j < right.length) rightEnd += right(j)
+      }
+    }
+    inter
+  }
+
+  /** The IoU of two masks of the same shape and order. The IoU of two empty
+    * masks is 0.
+    */
+  def iou(left: Array[Int], right: Array[Int]): Double = {
+    val inter = intersectionArea(left, right)
+    val union = area(left) + area(right) - inter
+    if (union > 0) inter.toDouble / union else 0.0
+  }
+
+  /** Re-encode a mask from column-major into row-major order or, if not
+    * `columnMajor`, from row-major into column-major order.
+    */
+  def transpose(
+      counts: Array[Int],
+      height: Int,
+      width: Int,
+      columnMajor: Boolean
+  ): Array[Int] = {
+    val total = height * width
+    if (total == 0) {
+      return Array.empty[Int]
+    }
+    val pixels = new Array[Boolean](total)
+    var pos = 0
+    var i = 0
+    while (i < counts.length) {
+      if (i % 2 == 1) {
+        java.util.Arrays.fill(pixels, pos, pos + counts(i), true)
+      }
+      pos += counts(i)
+      i += 1
+    }
+
+    val (fromMinor, toMinor) =
+      if (columnMajor) (height, width) else (width, height)
+    val result = ArrayBuffer.empty[Int]
+    var value = false
+    var run = 0
+    var k = 0
+    while (k < total) {
+      if (pixels((k % toMinor) * fromMinor + k / toMinor) == value) {
+        run += 1
+      } else {
+        result += run
+        value = !value
+        run = 1
+      }
+      k += 1
+    }
+    result += run
+    result.toArray
+  }
+
+  /** Rasterize polygons into the row-major RLE of a `height` x `width` mask,
+    * without a dense mask. Like in PIL, vertices are truncated to integers.
+    *
+    * @param coords the flat `x, y` coordinates of all the polygons.
+    * @param offsets the offset of each polygon in `coords`, followed by the
+    *                length of `coords`.
+    */
+  def fromPolygons(
+      coords: Array[Float],
+      offsets: Array[Int],
+      height: Int,
+      width: Int
+  ): Array[Int] = {
+    val total = height.toLong * width
+    val spanStarts = ArrayBuffer.empty[Long]
+    val spanEnds = ArrayBuffer.empty[Long]
+
+    // Keep a span [xStart, xEnd] of scanline y, clipped to the image.
+    def addSpan(y: Double, xStart: Double, xEnd: Double): Unit = {
+      val start = (xStart max 0 min width).toLong
+      val end = ((xEnd + 1) max 0 min width).toLong
+      if (start < end && y >= 0 && y < height) {
+        spanStarts += y.toLong * width + start
+        spanEnds += y.toLong * width + end
+      }
+    }
+
+    for (polygon <- 0 until offsets.length - 1) {
+      val first = offsets(polygon) / 2
+      val numPoints = offsets(polygon + 1) / 2 - first
+      val xs = Array.tabulate(numPoints)(p => truncate(coords(2 * (first + p))))
+      val ys =
+        Array.tabulate(numPoints)(p => truncate(coords(2 * (first + p) + 1)))
+      var polygonYmax = Double.NegativeInfinity
+      for (p <- 0 until numPoints) {
+        val q = (p + 1) % numPoints
+        if (ys(p) != ys(q)) {
+          polygonYmax = polygonYmax max ys(p) max ys(q)
+        }
+      }
+
+      val crossings = ArrayBuffer.empty[(Double, Double)]
+      for (p <- 0 until numPoints) {
+        val q = (p + 1) % numPoints
+        val (x0, y0, x1, y1) = (xs(p), ys(p), xs(q), ys(q))
+        if (y0 == y1) {
+          // Horizontal edges are drawn as they are.
+          addSpan(y0, x0 min x1, x0 max x1)
+        } else {
+          // An edge crosses the scanlines in [ymin, ymax], and its last
+          // scanline twice, unless it is the last scanline of the polygon.
+          val ymax = y0 max y1
+          val firstRow = (y0 min y1) max 0
+          val lastRow = ymax min (height - 1)
+          var rows = ((lastRow - firstRow + 1) max 0).toLong
+          if (ymax <= height - 1 && ymax < polygonYmax) {
+            rows += 1
+          }
+          for (k <- 0L until rows) {
+            val y = (firstRow + k) min lastRow
+            crossings += ((y, x0 + (y - y0) * (x1 - x0) / (y1 - y0)))
+          }
+        }
+      }
+
+      // Pair up the sorted crossings of each scanline.
+      val sorted = crossings.sortWith { case ((ya, xa), (yb, xb)) =>
+        ya < yb || (ya == yb && xa < xb)
+      }
+      var groupStart = 0
+      while (groupStart < sorted.length) {
+        val y = sorted(groupStart)._1
+        var groupEnd = groupStart
+        while (groupEnd < sorted.length && sorted(groupEnd)._1 == y) {
+          groupEnd += 1
+        }
+        var k = groupStart
+        while (k + 1 < groupEnd) {
+          addSpan(
+            y,
+            roundHalfUp(sorted(k)._2),
+            math.ceil(sorted(k + 1)._2 - 0.5)
+          )
+          k += 2
+        }
+        groupStart = groupEnd
+      }
+    }
+
+    // Merge the overlapping or adjacent spans into runs of ones.
+    val order = spanStarts.indices.sortBy(spanStarts)
+    val counts = ArrayBuffer.empty[Int]
+    var pos = 0L
+    var runStart = -1L
+    var runEnd = -1L
+    for (idx <- order) {
+      if (runStart >= 0 && spanStarts(idx) <= runEnd) {
+        runEnd = runEnd max spanEnds(idx)
+      } else {
+        if (runStart >= 0) {
+          counts += (runStart - pos).toInt
+          counts += (runEnd - runStart).toInt
+          pos = runEnd
+        }
+        runStart = spanStarts(idx)
+        runEnd = spanEnds(idx)
+      }
+    }
+    if (runStart >= 0) {
+      counts += (runStart - pos).toInt
+      counts += (runEnd - runStart).toInt
+      pos = runEnd
+    }
+    counts += (total - pos).toInt
+    counts.toArray
+  }
+
+  private def truncate(x: Float): Double = x.toLong.toDouble
+
+  private def roundHalfUp(x: Double): Double =
+    math.signum(x) * math.floor(math.abs(x) + 0.5)
+}
@@ -16,29 +16,328 @@ package org.apache.spark.sql.rikai.expressions
 
 import com.thoughtworks.enableIf
 import com.thoughtworks.enableIf._
-import org.apache.spark.sql.catalyst.expressions.codegen.CodegenFallback
+import org.apache.spark.sql.catalyst.InternalRow
+import org.apache.spark.sql.catalyst.expressions.codegen.{
+  CodegenContext,
+  CodegenFallback,
+  ExprCode
+}
 import org.apache.spark.sql.catalyst.expressions.{
   BinaryExpression,
   Expression,
+  GenericInternalRow,
   ImplicitCastInputTypes,
   NullIntolerant,
+  TernaryExpression,
   UnaryExpression
 }
+import org.apache.spark.sql.catalyst.util.{ArrayData, GenericArrayData}
 import org.apache.spark.sql.rikai.Box2dType
-import org.apache.spark.sql.types.{AbstractDataType, DataType, DoubleType}
+import org.apache.spark.sql.types.{
+  AbstractDataType,
+  ArrayType,
+  DataType,
+  DoubleType,
+  IntegerType,
+  StructField,
+  StructType
+}
 
-case class Area(child: Expression)
+import scala.collection.mutable.ArrayBuffer
+
+/** Build the [[Box2dType]] struct of a box, validated like the Python
+  * `Box2d`.
+  */
+private[expressions] object Box2dRow {
+
+  def apply(
+      xmin: Double,
+      ymin: Double,
+      xmax: Double,
+      ymax: Double
+  ): InternalRow = {
+    require(
+      0 <= xmin && xmin <= xmax,
+      s"xmin($xmin) and xmax($xmax) must satisfy 0 <= xmin <= xmax"
+    )
+    require(
+      0 <= ymin && ymin <= ymax,
+      s"ymin($ymin) and ymax($ymax) must satisfy 0 <= ymin <= ymax"
+    )
+    val row = new GenericInternalRow(4)
+    row.setDouble(0, xmin)
+    row.setDouble(1, ymin)
+    row.setDouble(2, xmax)
+    row.setDouble(3, ymax)
+    row
+  }
+}
+
+/** Build a box from an array of four coordinates. */
+abstract class Box2dFromArray
     extends UnaryExpression
     with CodegenFallback
     with ImplicitCastInputTypes
     with NullIntolerant {
 
+  override def inputTypes: Seq[AbstractDataType] = Seq(ArrayType(DoubleType))
+
+  override def nullable: Boolean = true
+
+  override def dataType: DataType = Box2dType
+
+  protected def toBox(a: Double, b: Double, c: Double, d: Double): InternalRow
+
+  override def nullSafeEval(input: Any): Any = {
+    val coords = input.asInstanceOf[ArrayData]
+    require(
+      coords.numElements() == 4,
+      s"$prettyName expects 4 coordinates, got ${coords.numElements()}"
+    )
+    if ((0 until 4).exists(coords.isNullAt)) {
+      null
+    } else {
+      toBox(
+        coords.getDouble(0),
+        coords.getDouble(1),
+        coords.getDouble(2),
+        coords.getDouble(3)
+      )
+    }
+  }
+}
+
+/** Build a box from `[xmin, ymin, xmax, ymax]`. */
+case class Box2dFromCorners(child: Expression) extends Box2dFromArray {
+
+  override protected def toBox(
+      xmin: Double,
+      ymin: Double,
+      xmax: Double,
+      ymax: Double
+  ): InternalRow = Box2dRow(xmin, ymin, xmax, ymax)
+
+  override def prettyName: String = "box2d"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** Build a box from `[center_x, center_y, width, height]`. */
+case class Box2dFromCenter(child: Expression) extends Box2dFromArray {
+
+  override protected def toBox(
+      centerX: Double,
+      centerY: Double,
+      width: Double,
+      height: Double
+  ): InternalRow = {
+    require(
+      width >= 0 && height >= 0,
+      s"Box2d width($width) and height($height) must be non-negative."
+    )
+    Box2dRow(
+      centerX - width / 2,
+      centerY - height / 2,
+      centerX + width / 2,
+      centerY + height / 2
+    )
+  }
+
+  override def prettyName: String = "box2d_from_center"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** Build a box from `[xmin, ymin, width, height]`. */
+case class Box2dFromTopLeft(child: Expression) extends Box2dFromArray {
+
+  override protected def toBox(
+      xmin: Double,
+      ymin: Double,
+      width: Double,
+      height: Double
+  ): InternalRow = {
+    require(
+      width >= 0 && height >= 0,
+      s"Box2d width($width) and height($height) must be non-negative."
+    )
+    Box2dRow(xmin, ymin, xmin + width, ymin + height)
+  }
+
+  override def prettyName: String = "box2d_from_top_left"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** Box2d kernels over the [[Box2dType]] struct, called by the interpreted
+  * and the generated code alike, so that no `Box2d` is allocated per row.
+  */
+object Box2dKernels {
+
+  def area(box: InternalRow): Double =
+    (box.getDouble(2) - box.getDouble(0)) *
+      (box.getDouble(3) - box.getDouble(1))
+
+  def iou(left: InternalRow, right: InternalRow): Double = {
+    val xmin = left.getDouble(0) max right.getDouble(0)
+    val ymin = left.getDouble(1) max right.getDouble(1)
+    val xmax = left.getDouble(2) min right.getDouble(2)
+    val ymax = left.getDouble(3) min right.getDouble(3)
+    val interArea = (xmax - xmin).max(0) * (ymax - ymin).max(0)
+    interArea / (area(left) + area(right) - interArea)
+  }
+
+  /** The non-null boxes of an array of [[Box2dType]], as flat `xmin, ymin,
+    * xmax, ymax` coordinates, and their positions in the array.
+    */
+  def fromArray(array: ArrayData): (Array[Double], Array[Int]) = {
+    val positions =
+      (0 until array.numElements()).filterNot(array.isNullAt).toArray
+    val coords = new Array[Double](4 * positions.length)
+    for ((pos, idx) <- positions.zipWithIndex) {
+      val box = array.getStruct(pos, 4)
+      for (c <- 0 until 4) {
+        coords(4 * idx + c) = box.getDouble(c)
+      }
+    }
+    (coords, positions)
+  }
+
+  private def iou(boxes: Array[Double], a: Int, b: Int): Double = {
+    val xmin = boxes(4 * a) max boxes(4 * b)
+    val ymin = boxes(4 * a + 1) max boxes(4 * b + 1)
+    val xmax = boxes(4 * a + 2) min boxes(4 * b + 2)
+    val ymax = boxes(4 * a + 3) min boxes(4 * b + 3)
+    val interArea = (xmax - xmin).max(0) * (ymax - ymin).max(0)
+    val areaA = (boxes(4 * a + 2) - boxes(4 * a)) *
+      (boxes(4 * a + 3) - boxes(4 * a + 1))
+    val areaB = (boxes(4 * b + 2) - boxes(4 * b)) *
+      (boxes(4 * b + 3) - boxes(4 * b + 1))
+    interArea / (areaA + areaB - interArea)
+  }
+
+  /** The pairs `(i, j, iou)` of the boxes `i` of `left` and `j` of `right`,
+    * given as flat `xmin, ymin, xmax, ymax` coordinates, whose IoU is at
+    * least `threshold`, sorted by `(i, j)`.
+    *
+    * Instead of comparing all the pairs, the boxes are swept in the order of
+    * their `xmin`, and each box is only compared with the boxes of the other
+    * side that it overlaps along the x axis.
+    */
+  def iouPairs(
+      left: Array[Double],
+      right: Array[Double],
+      threshold: Double
+  ): Array[(Int, Int, Double)] = {
+    require(threshold > 0, s"IoU threshold must be positive, got $threshold")
+    val numLeft = left.length / 4
+    val boxes = left ++ right
+    val order = (0 until boxes.length / 4)
+      .sortWith((a, b) => boxes(4 * a) < boxes(4 * b))
+    // The boxes swept so far that may overlap with the next boxes, by side.
+    val active = Array(ArrayBuffer.empty[Int], ArrayBuffer.empty[Int])
+    val pairs = ArrayBuffer.empty[(Int, Int, Double)]
+    for (box <- order) {
+      val side = if (box < numLeft) 0 else 1
+      val others = active(1 - side)
+      // The boxes that end before this one starts can not overlap with it,
+      // nor with any box after it.
+      var kept = 0
+      var idx = 0
+      while (idx < others.length) {
+        if (boxes(4 * others(idx) + 2) > boxes(4 * box)) {
+          others(kept) = others(idx)
+          kept += 1
+        }
+        idx += 1
+      }
+      others.remove(kept, others.length - kept)
+      for (other <- others) {
+        val value = iou(boxes, box, other)
+        if (value >= threshold) {
+          pairs += (
+            if (side == 0) (box, other - numLeft, value)
+            else (other, box - numLeft, value)
+          )
+        }
+      }
+      active(side) += box
+    }
+    pairs
+      .sortWith((a, b) => a._1 < b._1 || (a._1 == b._1 && a._2 < b._2))
+      .toArray
+  }
+
+  /** Greedily match predictions to ground truth boxes, like the Python
+    * `rikai.types.geometry.match_boxes`: in the given order, each prediction
+    * is matched to the unmatched ground truth box with the highest IoU, of
+    * at least `threshold`.
+    *
+    * @return the `(groundTruth, prediction, iou)` of the matches, in the
+    *         order of the predictions.
+    */
+  def matchBoxes(
+      groundTruth: Array[Double],
+      predictions: Array[Double],
+      order: Seq[Int],
+      threshold: Double
+  ): Array[(Int, Int, Double)] = {
+    val pairs = iouPairs(predictions, groundTruth, threshold)
+    // The candidates of prediction p are pairs(starts(p) until starts(p + 1)).
+    val starts = new Array[Int](predictions.length / 4 + 1)
+    for ((pred, _, _) <- pairs) {
+      starts(pred + 1) += 1
+    }
+    for (pred <- 1 until starts.length) {
+      starts(pred) += starts(pred - 1)
+    }
+    val matched = new Array[Boolean](groundTruth.length / 4)
+    val matches = ArrayBuffer.empty[(Int, Int, Double)]
+    for (pred <- order) {
+      var best = -1
+      var bestIou = 0.0
+      for (k <- starts(pred) until starts(pred + 1)) {
+        val (_, gt, value) = pairs(k)
+        // Ties go to the first ground truth box, as pairs are sorted.
+        if (!matched(gt) && (best < 0 || value > bestIou)) {
+          best = gt
+          bestIou = value
+        }
+      }
+      if (best >= 0) {
+        matched(best) = true
+        matches += ((best, pred, bestIou))
+      }
+    }
+    matches.toArray
+  }
+}
+
+case class Area(child: Expression)
+    extends UnaryExpression
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
   override def inputTypes: Seq[AbstractDataType] = Seq(Box2dType)
 
   override def nullable: Boolean = true
 
   override def nullSafeEval(input: Any): Any = {
-    Box2dType.deserialize(input).area
+    Box2dKernels.area(input.asInstanceOf[InternalRow])
+  }
+
+  override protected def doGenCode(
+      ctx: CodegenContext,
+      ev: ExprCode
+  ): ExprCode = {
+    val kernels = Box2dKernels.getClass.getName.stripSuffix("$")
+    defineCodeGen(ctx, ev, box => s"$kernels.area($box)")
   }
 
   override def dataType: DataType = DoubleType
@@ -52,7 +351,6 @@ case class Area(child: Expression)
 
 case class IOU(leftBox: Expression, rightBox: Expression)
     extends BinaryExpression
-    with CodegenFallback
     with ImplicitCastInputTypes
     with NullIntolerant {
 
@@ -65,7 +363,18 @@ case class IOU(leftBox: Expression, rightBox: Expression)
   override def dataType: DataType = DoubleType
 
   override def nullSafeEval(left: Any, right: Any): Any = {
-    Box2dType.deserialize(left).iou(Box2dType.deserialize(right))
+    Box2dKernels.iou(
+      left.asInstanceOf[InternalRow],
+      right.asInstanceOf[InternalRow]
+    )
+  }
+
+  override protected def doGenCode(
+      ctx: CodegenContext,
+      ev: ExprCode
+  ): ExprCode = {
+    val kernels = Box2dKernels.getClass.getName.stripSuffix("$")
+    defineCodeGen(ctx, ev, (l, r) => s"$kernels.iou($l, $r)")
   }
 
   override def prettyName: String = "iou"
@@ -77,3 +386,229 @@ case class IOU(leftBox: Expression, rightBox: Expression)
   ): Expression =
     copy(leftBox = newLeft, rightBox = newRight)
 }
+
+/** Scale a box by `(scaleX, scaleY)`, like `Box2d * (scale_x, scale_y)` in
+  * Python.
+  */
+case class Scale(box: Expression, scaleX: Expression, scaleY: Expression)
+    extends TernaryExpression
+    with CodegenFallback
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
+  def first: Expression = box
+
+  def second: Expression = scaleX
+
+  def third: Expression = scaleY
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.1\\..*".r))
+  override def children: Seq[Expression] = Seq(box, scaleX, scaleY)
+
+  override def inputTypes: Seq[AbstractDataType] =
+    Seq(Box2dType, DoubleType, DoubleType)
+
+  override def dataType: DataType = Box2dType
+
+  override def nullSafeEval(input: Any, x: Any, y: Any): Any = {
+    val row = input.asInstanceOf[InternalRow]
+    val sx = x.asInstanceOf[Double]
+    val sy = y.asInstanceOf[Double]
+    require(sx > 0 && sy > 0, s"scale must be positive, got ($sx, $sy)")
+    Box2dRow(
+      row.getDouble(0) * sx,
+      row.getDouble(1) * sy,
+      row.getDouble(2) * sx,
+      row.getDouble(3) * sy
+    )
+  }
+
+  override def prettyName: String = "scale"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildrenInternal(
+      newFirst: Expression,
+      newSecond: Expression,
+      newThird: Expression
+  ): Expression =
+    copy(box = newFirst, scaleX = newSecond, scaleY = newThird)
+}
+
+/** Clip a box into an image of `width` x `height`. */
+case class Clip(box: Expression, width: Expression, height: Expression)
+    extends TernaryExpression
+    with CodegenFallback
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
+  def first: Expression = box
+
+  def second: Expression = width
+
+  def third: Expression = height
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.1\\..*".r))
+  override def children: Seq[Expression] = Seq(box, width, height)
+
+  override def inputTypes: Seq[AbstractDataType] =
+    Seq(Box2dType, DoubleType, DoubleType)
+
+  override def dataType: DataType = Box2dType
+
+  override def nullSafeEval(input: Any, w: Any, h: Any): Any = {
+    val row = input.asInstanceOf[InternalRow]
+    val maxX = w.asInstanceOf[Double]
+    val maxY = h.asInstanceOf[Double]
+    Box2dRow(
+      row.getDouble(0) max 0 min maxX,
+      row.getDouble(1) max 0 min maxY,
+      row.getDouble(2) max 0 min maxX,
+      row.getDouble(3) max 0 min maxY
+    )
+  }
+
+  override def prettyName: String = "clip"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildrenInternal(
+      newFirst: Expression,
+      newSecond: Expression,
+      newThird: Expression
+  ): Expression =
+    copy(box = newFirst, width = newSecond, height = newThird)
+}
+
+/** The pairs of boxes of two arrays whose IoU is at least `threshold`, as
+  * the positions of the boxes in the arrays. See [[Box2dKernels.iouPairs]].
+  */
+case class IouPairs(
+    leftBoxes: Expression,
+    rightBoxes: Expression,
+    threshold: Expression
+) extends TernaryExpression
+    with CodegenFallback
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
+  def first: Expression = leftBoxes
+
+  def second: Expression = rightBoxes
+
+  def third: Expression = threshold
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.1\\..*".r))
+  override def children: Seq[Expression] =
+    Seq(leftBoxes, rightBoxes, threshold)
+
+  override def inputTypes: Seq[AbstractDataType] =
+    Seq(ArrayType(Box2dType), ArrayType(Box2dType), DoubleType)
+
+  override def dataType: DataType = ArrayType(
+    StructType(
+      Seq(
+        StructField("left", IntegerType, nullable = false),
+        StructField("right", IntegerType, nullable = false),
+        StructField("iou", DoubleType, nullable = false)
+      )
+    ),
+    containsNull = false
+  )
+
+  override def nullSafeEval(left: Any, right: Any, t: Any): Any = {
+    val (leftCoords, leftPositions) =
+      Box2dKernels.fromArray(left.asInstanceOf[ArrayData])
+    val (rightCoords, rightPositions) =
+      Box2dKernels.fromArray(right.asInstanceOf[ArrayData])
+    val pairs = Box2dKernels.iouPairs(
+      leftCoords,
+      rightCoords,
+      t.asInstanceOf[Double]
+    )
+    new GenericArrayData(pairs.map { case (i, j, iou) =>
+      InternalRow(leftPositions(i), rightPositions(j), iou)
+    }.toSeq)
+  }
+
+  override def prettyName: String = "iou_pairs"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildrenInternal(
+      newFirst: Expression,
+      newSecond: Expression,
+      newThird: Expression
+  ): Expression =
+    copy(leftBoxes = newFirst, rightBoxes = newSecond, threshold = newThird)
+}
+
+/** Greedily match an array of predicted boxes to an array of ground truth
+  * boxes, with an IoU of at least `threshold`, visiting the predictions by
+  * descending scores if given. See [[Box2dKernels.matchBoxes]].
+  *
+  * Arguments: `(ground_truth, predictions, threshold[, scores])`.
+  */
+case class MatchBoxes(children: Seq[Expression])
+    extends Expression
+    with CodegenFallback
+    with ImplicitCastInputTypes {
+
+  override def inputTypes: Seq[AbstractDataType] =
+    Seq(ArrayType(Box2dType), ArrayType(Box2dType), DoubleType) ++
+      children.drop(3).map(_ => ArrayType(DoubleType))
+
+  override def nullable: Boolean = true
+
+  override def dataType: DataType = ArrayType(
+    StructType(
+      Seq(
+        StructField("ground_truth", IntegerType, nullable = false),
+        StructField("prediction", IntegerType, nullable = false),
+        StructField("iou", DoubleType, nullable = false)
+      )
+    ),
+    containsNull = false
+  )
+
+  override def eval(input: InternalRow): Any = {
+    val values = children.map(_.eval(input))
+    if (values.take(3).contains(null)) {
+      return null
+    }
+    val (gtCoords, gtPositions) =
+      Box2dKernels.fromArray(values.head.asInstanceOf[ArrayData])
+    val predictions = values(1).asInstanceOf[ArrayData]
+    val (predCoords, predPositions) = Box2dKernels.fromArray(predictions)
+    val order = values.lift(3).orNull match {
+      case scores: ArrayData =>
+        require(
+          scores.numElements() == predictions.numElements(),
+          s"Expect ${predictions.numElements()} scores, " +
+            s"got ${scores.numElements()}"
+        )
+        val score = predPositions.map(pos =>
+          if (scores.isNullAt(pos)) Double.NegativeInfinity
+          else scores.getDouble(pos)
+        )
+        predPositions.indices.sortWith((a, b) =>
+          java.lang.Double.compare(score(a), score(b)) > 0
+        )
+      case _ => predPositions.indices
+    }
+    val matches = Box2dKernels.matchBoxes(
+      gtCoords,
+      predCoords,
+      order,
+      values(2).asInstanceOf[Double]
+    )
+    new GenericArrayData(matches.map { case (gt, pred, iou) =>
+      InternalRow(gtPositions(gt), predPositions(pred), iou)
+    }.toSeq)
+  }
+
+  override def prettyName: String = "match_boxes"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildrenInternal(
+      newChildren: IndexedSeq[Expression]
+  ): Expression =
+    copy(children = newChildren)
+}
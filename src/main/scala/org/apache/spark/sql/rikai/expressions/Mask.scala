@@ -0,0 +1,253 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai.expressions
+
+import com.thoughtworks.enableIf
+import com.thoughtworks.enableIf._
+import org.apache.spark.sql.catalyst.InternalRow
+import org.apache.spark.sql.catalyst.expressions.codegen.{
+  CodegenContext,
+  ExprCode
+}
+import org.apache.spark.sql.catalyst.expressions.{
+  BinaryExpression,
+  Expression,
+  GenericInternalRow,
+  ImplicitCastInputTypes,
+  NullIntolerant,
+  UnaryExpression,
+  UnsafeArrayData
+}
+import org.apache.spark.sql.rikai.{Box2dType, MaskType, MaskTypeEnum, Rle}
+import org.apache.spark.sql.types.{
+  AbstractDataType,
+  DataType,
+  DoubleType,
+  LongType
+}
+
+/** Mask kernels over the [[MaskType]] struct, computed on the run-length
+  * encoding of the masks, without decoding them. Polygons are rasterized
+  * straight into their row-major RLE.
+  *
+  * Like Python's `Mask`, COCO RLE masks are column-major, and the other masks
+  * row-major. Two masks are compared in the order of the first one.
+  */
+object MaskKernels {
+
+  private def isColumnMajor(mask: InternalRow): Boolean =
+    mask.getInt(0) == MaskTypeEnum.CocoRle.id
+
+  private def polygonRle(
+      mask: InternalRow,
+      height: Int,
+      width: Int
+  ): Array[Int] = {
+    if (mask.numFields > 5 && !mask.isNullAt(5)) {
+      Rle.fromPolygons(
+        mask.getArray(5).toFloatArray(),
+        mask.getArray(6).toIntArray(),
+        height,
+        width
+      )
+    } else {
+      val data = mask.getArray(3)
+      val polygons = (0 until data.numElements())
+        .map(idx => data.getArray(idx).toFloatArray())
+      Rle.fromPolygons(
+        polygons.flatten.toArray,
+        polygons.scanLeft(0)((offset, arr) => offset + arr.length).toArray,
+        height,
+        width
+      )
+    }
+  }
+
+  /** The RLE counts of a mask, in column-major order if `columnMajor`. */
+  def rle(mask: InternalRow, columnMajor: Boolean): Array[Int] = {
+    val height = mask.getInt(1)
+    val width = mask.getInt(2)
+    val (counts, countsColumnMajor) =
+      if (mask.getInt(0) == MaskTypeEnum.Polygon.id) {
+        (polygonRle(mask, height, width), false)
+      } else {
+        (mask.getArray(4).toIntArray(), isColumnMajor(mask))
+      }
+    if (countsColumnMajor == columnMajor) {
+      counts
+    } else {
+      Rle.transpose(counts, height, width, countsColumnMajor)
+    }
+  }
+
+  def area(mask: InternalRow): Long =
+    Rle.area(rle(mask, isColumnMajor(mask)))
+
+  def bbox(mask: InternalRow): InternalRow = {
+    val columnMajor = isColumnMajor(mask)
+    val (xmin, ymin, xmax, ymax) = Rle.bbox(
+      rle(mask, columnMajor),
+      mask.getInt(1),
+      mask.getInt(2),
+      columnMajor
+    )
+    Box2dRow(xmin, ymin, xmax, ymax)
+  }
+
+  def iou(left: InternalRow, right: InternalRow): Double = {
+    require(
+      left.getInt(1) == right.getInt(1) && left.getInt(2) == right.getInt(2),
+      s"Masks must be of the same size, got " +
+        s"${left.getInt(1)}x${left.getInt(2)} and " +
+        s"${right.getInt(1)}x${right.getInt(2)}"
+    )
+    val columnMajor = isColumnMajor(left)
+    Rle.iou(rle(left, columnMajor), rle(right, columnMajor))
+  }
+
+  /** A polygon mask as a row-major RLE mask. RLE masks are returned as they
+    * are.
+    */
+  def toRle(mask: InternalRow): InternalRow = {
+    if (mask.getInt(0) != MaskTypeEnum.Polygon.id) {
+      mask
+    } else {
+      val row = new GenericInternalRow(7)
+      row.setInt(0, MaskTypeEnum.Rle.id)
+      row.setInt(1, mask.getInt(1))
+      row.setInt(2, mask.getInt(2))
+      row.setNullAt(3)
+      row.update(
+        4,
+        UnsafeArrayData.fromPrimitiveArray(rle(mask, columnMajor = false))
+      )
+      row.setNullAt(5)
+      row.setNullAt(6)
+      row
+    }
+  }
+}
+
+/** A unary expression over a mask, evaluated by a [[MaskKernels]] function.
+  */
+abstract class MaskFunction
+    extends UnaryExpression
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
+  override def inputTypes: Seq[AbstractDataType] = Seq(MaskType)
+
+  protected def kernel: String
+
+  override protected def doGenCode(
+      ctx: CodegenContext,
+      ev: ExprCode
+  ): ExprCode = {
+    val kernels = MaskKernels.getClass.getName.stripSuffix("$")
+    defineCodeGen(ctx, ev, mask => s"$kernels.$kernel($mask)")
+  }
+}
+
+/** The number of pixels of a mask. */
+case class MaskArea(child: Expression) extends MaskFunction {
+
+  override protected def kernel: String = "area"
+
+  override def nullSafeEval(input: Any): Any =
+    MaskKernels.area(input.asInstanceOf[InternalRow])
+
+  override def dataType: DataType = LongType
+
+  override def prettyName: String = "mask_area"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** The bounding box of a mask, in pixel edges. */
+case class MaskBbox(child: Expression) extends MaskFunction {
+
+  override protected def kernel: String = "bbox"
+
+  override def nullSafeEval(input: Any): Any =
+    MaskKernels.bbox(input.asInstanceOf[InternalRow])
+
+  override def dataType: DataType = Box2dType
+
+  override def prettyName: String = "mask_bbox"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** Convert a polygon mask into a RLE mask. */
+case class MaskToRle(child: Expression) extends MaskFunction {
+
+  override protected def kernel: String = "toRle"
+
+  override def nullSafeEval(input: Any): Any =
+    MaskKernels.toRle(input.asInstanceOf[InternalRow])
+
+  override def dataType: DataType = MaskType
+
+  override def prettyName: String = "mask_to_rle"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildInternal(newChild: Expression): Expression =
+    copy(child = newChild)
+}
+
+/** The IoU of two masks of the same size. */
+case class MaskIOU(leftMask: Expression, rightMask: Expression)
+    extends BinaryExpression
+    with ImplicitCastInputTypes
+    with NullIntolerant {
+
+  override def inputTypes: Seq[AbstractDataType] = Seq(MaskType, MaskType)
+
+  override def left: Expression = leftMask
+
+  override def right: Expression = rightMask
+
+  override def dataType: DataType = DoubleType
+
+  override def nullSafeEval(left: Any, right: Any): Any = {
+    MaskKernels.iou(
+      left.asInstanceOf[InternalRow],
+      right.asInstanceOf[InternalRow]
+    )
+  }
+
+  override protected def doGenCode(
+      ctx: CodegenContext,
+      ev: ExprCode
+  ): ExprCode = {
+    val kernels = MaskKernels.getClass.getName.stripSuffix("$")
+    defineCodeGen(ctx, ev, (l, r) => s"$kernels.iou($l, $r)")
+  }
+
+  override def prettyName: String = "mask_iou"
+
+  @enableIf(classpathMatches(".*spark-catalyst_2\\.\\d+-3\\.[^01]\\..*".r))
+  override def withNewChildrenInternal(
+      newLeft: Expression,
+      newRight: Expression
+  ): Expression =
+    copy(leftMask = newLeft, rightMask = newRight)
+}
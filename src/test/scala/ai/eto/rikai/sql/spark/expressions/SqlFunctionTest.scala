@@ -17,8 +17,10 @@
 package ai.eto.rikai.sql.spark.expressions
 
 import ai.eto.rikai.SparkTestSession
-import org.apache.spark.sql.AnalysisException
-import org.apache.spark.sql.rikai.Box2d
+import org.apache.spark.sql.{AnalysisException, Row}
+import org.apache.spark.sql.execution.WholeStageCodegenExec
+import org.apache.spark.sql.rikai.{Box2d, Mask, MaskTypeEnum}
+import org.apache.spark.sql.rikai.expressions.IOU
 import org.scalactic.TolerantNumerics
 import org.scalatest.funsuite.AnyFunSuite
 
@@ -55,4 +57,170 @@ class SqlFunctionTest extends AnyFunSuite with SparkTestSession {
     val df = spark.sql("SELECT *, iou(box1, box2) as iou FROM boxes")
     assert(df.first().getAs[Double]("iou") === 1.0 / 7)
   }
+
+  test("test iou of non-square boxes") {
+    Seq((1, new Box2d(0, 0, 20, 10), new Box2d(10, 0, 30, 10)))
+      .toDF("id", "box1", "box2")
+      .createOrReplaceTempView("boxes")
+    val df = spark.sql("SELECT iou(box1, box2) as iou FROM boxes")
+    assert(df.first().getAs[Double]("iou") === 1.0 / 3)
+  }
+
+  test("test box2d constructors") {
+    val row = spark
+      .sql("""SELECT
+        |box2d(array(1, 2, 3, 4)) AS corners,
+        |box2d_from_center(array(2.0, 3.0, 2.0, 2.0)) AS center,
+        |box2d_from_top_left(array(1, 2, 2, 2)) AS top_left,
+        |box2d(array(1.0, null, 3.0, 4.0)) AS null_box
+        |""".stripMargin)
+      .first()
+    val expected = new Box2d(1, 2, 3, 4)
+    assert(row.getAs[Box2d]("corners") == expected)
+    assert(row.getAs[Box2d]("center") == expected)
+    assert(row.getAs[Box2d]("top_left") == expected)
+    assert(row.isNullAt(3))
+
+    assertThrows[Exception] {
+      spark.sql("SELECT box2d(array(3, 2, 1, 4))").collect()
+    }
+  }
+
+  test("test scale and clip boxes") {
+    Seq((1, new Box2d(1, 2, 30, 40)))
+      .toDF("id", "box")
+      .createOrReplaceTempView("boxes")
+    val row = spark
+      .sql("""SELECT
+        |scale(box, 2) AS doubled,
+        |scale(box, 0.5, 2) AS scaled,
+        |clip(box, 20, 20) AS clipped,
+        |area(scale(box, 2)) AS area
+        |FROM boxes""".stripMargin)
+      .first()
+    assert(row.getAs[Box2d]("doubled") == new Box2d(2, 4, 60, 80))
+    assert(row.getAs[Box2d]("scaled") == new Box2d(0.5, 4, 15, 80))
+    assert(row.getAs[Box2d]("clipped") == new Box2d(1, 2, 20, 20))
+    assert(row.getAs[Double]("area") === 4 * 29 * 38)
+  }
+
+  test("test area and iou in whole-stage codegen") {
+    val boxes = Seq(
+      (new Box2d(0, 0, 20, 20), new Box2d(10, 10, 30, 30)),
+      (new Box2d(0, 0, 20, 10), new Box2d(10, 0, 30, 10)),
+      (new Box2d(0, 0, 10, 10), new Box2d(10, 10, 20, 20))
+    ).toDF("box1", "box2")
+    // Repartition so that the projection is not folded into a local relation.
+    val df = boxes
+      .repartition(1)
+      .selectExpr("area(box1) AS area", "iou(box1, box2) AS iou")
+      .filter("iou >= 0")
+    assert(df.queryExecution.executedPlan.exists {
+      case plan: WholeStageCodegenExec =>
+        plan.find(_.expressions.exists(_.find(_.isInstanceOf[IOU]).isDefined))
+          .isDefined
+      case _ => false
+    })
+    val rows = df.collect()
+    assert(rows.map(_.getDouble(0)).toSeq == Seq(400.0, 200.0, 100.0))
+    assert(rows(0).getDouble(1) === 1.0 / 7)
+    assert(rows(1).getDouble(1) === 1.0 / 3)
+    assert(rows(2).getDouble(1) == 0)
+  }
+
+  test("test mask functions") {
+    val square = Array(Array[Float](1, 1, 5, 1, 5, 6, 1, 6))
+    val triangle = Array(Array[Float](2, 0, 9, 7, 2, 7))
+    val triangleRle = Array(2, 1, 9, 2, 8, 3, 7, 4, 6, 5, 5, 6, 4, 7, 3, 8)
+    val squareCocoRle = Array(9, 6, 2, 6, 2, 6, 2, 6, 2, 6, 33)
+    Seq(
+      (Mask.fromPolygon(square, 8, 10), Mask.fromRLE(triangleRle, 8, 10)),
+      (
+        Mask.fromCocoRLE(squareCocoRle, 8, 10),
+        Mask.fromPolygon(triangle, 8, 10)
+      )
+    ).toDF("mask1", "mask2")
+      .createOrReplaceTempView("masks")
+    val rows = spark
+      .sql("""SELECT
+        |mask_area(mask1) AS area1,
+        |mask_area(mask2) AS area2,
+        |mask_bbox(mask1) AS bbox,
+        |mask_iou(mask1, mask2) AS iou,
+        |mask_to_rle(mask1) AS rle
+        |FROM masks""".stripMargin)
+      .collect()
+    assert(rows.map(_.getAs[Long]("area1")).toSeq == Seq(30, 30))
+    assert(rows.map(_.getAs[Long]("area2")).toSeq == Seq(36, 36))
+    assert(rows.forall(_.getAs[Box2d]("bbox") == new Box2d(1, 1, 6, 7)))
+    assert(rows.forall(_.getAs[Double]("iou") === 21.0 / 45))
+
+    val rle = rows(0).getAs[Mask]("rle")
+    assert(rle.maskType == MaskTypeEnum.Rle)
+    assert(
+      rle.rle.get sameElements Array(11, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 14)
+    )
+    assert(rows(1).getAs[Mask]("rle").maskType == MaskTypeEnum.CocoRle)
+
+    assert(spark.sql("SELECT mask_area(null)").first().isNullAt(0))
+    assertThrows[AnalysisException] {
+      spark.sql("SELECT mask_area(box2d(array(1, 2, 3, 4)))")
+    }
+  }
+
+  test("test iou_pairs and match_boxes") {
+    Seq(
+      (
+        Seq(new Box2d(0, 0, 10, 10), null, new Box2d(20, 20, 30, 30)),
+        Seq(
+          new Box2d(21, 21, 30, 30),
+          new Box2d(1, 1, 10, 10),
+          new Box2d(0, 0, 9, 10),
+          new Box2d(40, 40, 50, 50)
+        ),
+        Seq(0.9, 0.2, 0.8, 0.5)
+      )
+    ).toDF("gt", "preds", "scores")
+      .createOrReplaceTempView("detections")
+    val row = spark
+      .sql("""SELECT
+        |iou_pairs(gt, preds, 0.5) AS pairs,
+        |match_boxes(gt, preds, 0.5) AS matches,
+        |match_boxes(gt, preds, 0.5, scores) AS scored
+        |FROM detections""".stripMargin)
+      .first()
+
+    def indices(name: String): Seq[(Int, Int)] =
+      row.getSeq[Row](row.fieldIndex(name)).map(r => (r.getInt(0), r.getInt(1)))
+
+    assert(indices("pairs") == Seq((0, 1), (0, 2), (2, 0)))
+    assert(row.getSeq[Row](0).head.getDouble(2) === 0.81)
+    // In the given order, the second prediction takes the first box.
+    assert(indices("matches") == Seq((2, 0), (0, 1)))
+    // By descending scores, the third prediction comes before the second.
+    assert(indices("scored") == Seq((2, 0), (0, 2)))
+    assert(spark.sql("SELECT iou_pairs(null, null, 0.5)").first().isNullAt(0))
+  }
+
+  test("test iou_pairs over many boxes") {
+    val random = new scala.util.Random(42)
+    def randomBoxes(n: Int): Seq[Box2d] = Seq.fill(n) {
+      val (x, y) = (random.nextInt(100), random.nextInt(100))
+      new Box2d(x, y, x + 1 + random.nextInt(30), y + 1 + random.nextInt(30))
+    }
+    val left = randomBoxes(200)
+    val right = randomBoxes(300)
+    val expected = for {
+      (a, i) <- left.zipWithIndex
+      (b, j) <- right.zipWithIndex
+      if a.iou(b) >= 0.3
+    } yield (i, j)
+    val actual = Seq((left, right))
+      .toDF("left", "right")
+      .selectExpr("iou_pairs(left, right, 0.3) AS pairs")
+      .first()
+      .getSeq[Row](0)
+      .map(r => (r.getInt(0), r.getInt(1)))
+    assert(actual == expected)
+  }
 }
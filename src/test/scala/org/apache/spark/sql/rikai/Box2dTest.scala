@@ -36,6 +36,10 @@ class Box2dTest extends AnyFunSuite with SparkTestSession {
     assert(interBox.isDefined)
     assert(interBox.map(b => b.area).getOrElse(0) == 100)
 
+    val wide = new Box2d(5, 15, 40, 18)
+    assert((box1 & wide).contains(new Box2d(5, 15, 20, 18)))
+    assert((wide & box1).contains(new Box2d(5, 15, 20, 18)))
+
     val big = new Box2d(0, 0, 100, 100)
     assert((box2 & big).isDefined)
     assert((box2 & big).contains(box2))
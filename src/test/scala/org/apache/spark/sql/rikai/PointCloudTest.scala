@@ -0,0 +1,64 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai
+
+import ai.eto.rikai.SparkTestSession
+import org.scalatest.funsuite.AnyFunSuite
+
+import java.io.File
+import java.nio.file.Files
+import scala.reflect.io.Directory
+
+class PointCloudTest extends AnyFunSuite with SparkTestSession {
+  import spark.implicits._
+
+  test("test point cloud values") {
+    val cloud = PointCloud.fromValues(
+      Seq("x", "y", "z", "intensity"),
+      Array(1.0f, 2.0f, 3.0f, 0.5f, 4.0f, 5.0f, 6.0f, 0.25f)
+    )
+    assert(cloud.numPoints == 2)
+    assert(cloud.values.sameElements(Array(1, 2, 3, 0.5f, 4, 5, 6, 0.25f)))
+  }
+
+  test("test point cloud equality") {
+    val fields = Seq("x", "y", "z")
+    val cloud = PointCloud.fromValues(fields, Array(1, 2, 3))
+    val same = PointCloud.fromValues(fields, Array(1, 2, 3))
+    assert(cloud == same && cloud.hashCode == same.hashCode)
+    val other = PointCloud.fromValues(fields, Array(4, 5, 6))
+    assert(cloud != other && cloud.hashCode != other.hashCode)
+  }
+
+  test("test serialize point cloud") {
+    val testDir =
+      new File(Files.createTempDirectory("rikai").toFile, "dataset")
+
+    val df = Seq(
+      (1, PointCloud.fromValues(Seq("x", "y", "z"), Array(1, 2, 3))),
+      (2, PointCloud.fromValues(Seq("x", "y", "z"), Array.empty[Float]))
+    ).toDF("id", "points")
+
+    df.write.format("rikai").save(testDir.toString)
+
+    val actualDf = spark.read.format("rikai").load(testDir.toString)
+    assert(df.count() == actualDf.count())
+    assert(df.exceptAll(actualDf).isEmpty)
+
+    new Directory(testDir).deleteRecursively()
+  }
+}
@@ -0,0 +1,66 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai
+
+import org.scalatest.funsuite.AnyFunSuite
+
+/** The expected values are computed by the Python `rikai.types.rle`. */
+class RleTest extends AnyFunSuite {
+
+  private val square = Array(11, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 14)
+
+  private val triangle =
+    Array(2, 1, 9, 2, 8, 3, 7, 4, 6, 5, 5, 6, 4, 7, 3, 8, 0)
+
+  test("rasterize polygons") {
+    val rectangle = Array[Float](1, 1, 5, 1, 5, 6, 1, 6)
+    assert(Rle.fromPolygons(rectangle, Array(0, 8), 8, 10) sameElements square)
+    val corners = Array[Float](2, 0, 9, 7, 2, 7)
+    assert(Rle.fromPolygons(corners, Array(0, 6), 8, 10) sameElements triangle)
+    val empty = Rle.fromPolygons(Array.empty[Float], Array(0), 8, 10)
+    assert(empty sameElements Array(80))
+  }
+
+  test("area and bbox") {
+    assert(Rle.area(square) == 30)
+    assert(Rle.area(triangle) == 36)
+    assert(Rle.bbox(square, 8, 10, columnMajor = false) == (1, 1, 6, 7))
+    assert(Rle.bbox(triangle, 8, 10, columnMajor = false) == (2, 0, 10, 8))
+    assert(Rle.bbox(Array(3, 4, 5), 4, 3, columnMajor = false) == (0, 1, 3, 3))
+    assert(Rle.bbox(Array(3, 4, 5), 4, 3, columnMajor = true) == (0, 0, 2, 4))
+    assert(Rle.bbox(Array(12), 4, 3, columnMajor = false) == (0, 0, 0, 0))
+  }
+
+  test("transpose") {
+    val columnMajor = Rle.transpose(triangle, 8, 10, columnMajor = false)
+    assert(
+      columnMajor sameElements
+        Array(16, 8, 1, 7, 2, 6, 3, 5, 4, 4, 5, 3, 6, 2, 7, 1)
+    )
+    assert(
+      Rle.transpose(columnMajor, 8, 10, columnMajor = true) sameElements
+        Array(2, 1, 9, 2, 8, 3, 7, 4, 6, 5, 5, 6, 4, 7, 3, 8)
+    )
+  }
+
+  test("iou") {
+    assert(Rle.intersectionArea(square, triangle) == 21)
+    assert(math.abs(Rle.iou(square, triangle) - 21.0 / 45) < 1e-9)
+    assert(Rle.iou(square, square) == 1.0)
+    assert(Rle.iou(Array(80), Array(80)) == 0.0)
+  }
+}
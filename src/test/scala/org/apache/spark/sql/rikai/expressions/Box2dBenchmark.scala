@@ -0,0 +1,175 @@
+/*
+ * Copyright 2022 Rikai authors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.rikai.expressions
+
+import org.apache.spark.benchmark.{Benchmark, BenchmarkBase}
+import org.apache.spark.sql.functions.{
+  array,
+  col,
+  collect_list,
+  explode,
+  lit,
+  rand,
+  udf
+}
+import org.apache.spark.sql.rikai.Box2d
+import org.apache.spark.sql.{Column, DataFrame, SparkSession}
+
+/** Benchmark of the Box2d `area` and `iou` expressions.
+  *
+  * Compares the generated code, which reads the coordinates straight from
+  * the struct, with the interpreted expressions, and with a Scala UDF over
+  * deserialized [[Box2d]] objects, which is how the expressions were
+  * evaluated before they had code generation.
+  *
+  * Also compares joining the boxes of the same images by IoU with a join
+  * filtered by `iou`, and with `iou_pairs` over the boxes of each image.
+  *
+  * To run:
+  * {{{
+  *   sbt "Test/runMain org.apache.spark.sql.rikai.expressions.Box2dBenchmark"
+  * }}}
+  */
+object Box2dBenchmark extends BenchmarkBase {
+
+  private val numRows = 10 * 1000 * 1000
+
+  private val numImages = 100 * 1000
+
+  private val boxesPerImage = 20
+
+  private lazy val spark: SparkSession = SparkSession.builder
+    .master("local[1]")
+    .appName("Box2dBenchmark")
+    .getOrCreate()
+
+  private def randomBoxes(seed: Long): Column = {
+    val xmin = rand(seed) * 100
+    val ymin = rand(seed + 1) * 100
+    val corners = array(
+      xmin,
+      ymin,
+      xmin + rand(seed + 2) * 50,
+      ymin + rand(seed + 3) * 50
+    )
+    new Column(Box2dFromCorners(corners.expr))
+  }
+
+  private def run(df: DataFrame): Unit =
+    df.write.format("noop").mode("overwrite").save()
+
+  private def withCodegen(enabled: Boolean)(f: => Unit): Unit = {
+    val factoryMode = if (enabled) "FALLBACK" else "NO_CODEGEN"
+    spark.conf.set("spark.sql.codegen.wholeStage", enabled)
+    spark.conf.set("spark.sql.codegen.factoryMode", factoryMode)
+    try f
+    finally {
+      spark.conf.unset("spark.sql.codegen.wholeStage")
+      spark.conf.unset("spark.sql.codegen.factoryMode")
+    }
+  }
+
+  override def runBenchmarkSuite(mainArgs: Array[String]): Unit = {
+    val boxes = spark
+      .range(numRows)
+      .select(randomBoxes(0).as("a"), randomBoxes(10).as("b"))
+      .cache()
+    boxes.count()
+
+    val areaUdf = udf((box: Box2d) => box.area)
+    val iouUdf = udf((a: Box2d, b: Box2d) => a.iou(b))
+    val area = new Column(Area(col("a").expr))
+    val iou = new Column(IOU(col("a").expr, col("b").expr))
+
+    runBenchmark("Box2d area") {
+      val benchmark = new Benchmark("area", numRows, output = output)
+      benchmark.addCase("Scala UDF over Box2d") { _ =>
+        run(boxes.select(areaUdf(col("a"))))
+      }
+      benchmark.addCase("interpreted") { _ =>
+        withCodegen(enabled = false)(run(boxes.select(area)))
+      }
+      benchmark.addCase("whole-stage codegen") { _ =>
+        withCodegen(enabled = true)(run(boxes.select(area)))
+      }
+      benchmark.run()
+    }
+
+    runBenchmark("Box2d iou") {
+      val benchmark = new Benchmark("iou", numRows, output = output)
+      benchmark.addCase("Scala UDF over Box2d") { _ =>
+        run(boxes.select(iouUdf(col("a"), col("b"))))
+      }
+      benchmark.addCase("interpreted") { _ =>
+        withCodegen(enabled = false)(run(boxes.select(iou)))
+      }
+      benchmark.addCase("whole-stage codegen") { _ =>
+        withCodegen(enabled = true)(run(boxes.select(iou)))
+      }
+      benchmark.addCase("whole-stage codegen, iou(a, b) > 0.5") { _ =>
+        withCodegen(enabled = true)(run(boxes.filter(iou > 0.5)))
+      }
+      benchmark.run()
+    }
+
+    boxes.unpersist()
+
+    val numBoxes = numImages * boxesPerImage
+    def imageBoxes(seed: Long): DataFrame = spark
+      .range(numBoxes)
+      .select(
+        (col("id") % numImages).as("image_id"),
+        randomBoxes(seed).as("box")
+      )
+      .cache()
+    val groundTruth = imageBoxes(20)
+    val predictions = imageBoxes(30)
+    groundTruth.count()
+    predictions.count()
+
+    runBenchmark("Box2d iou join") {
+      val benchmark = new Benchmark("iou join", numBoxes, output = output)
+      benchmark.addCase("join filtered by iou(a, b) >= 0.5") { _ =>
+        val matched = new Column(IOU(col("a.box").expr, col("b.box").expr))
+        run(
+          groundTruth
+            .as("a")
+            .join(predictions.as("b"), "image_id")
+            .filter(matched >= 0.5)
+        )
+      }
+      benchmark.addCase("iou_pairs over the boxes of each image") { _ =>
+        def collect(df: DataFrame, name: String): DataFrame =
+          df.groupBy("image_id").agg(collect_list("box").as(name))
+        val pairs = new Column(
+          IouPairs(col("a").expr, col("b").expr, lit(0.5).expr)
+        )
+        run(
+          collect(groundTruth, "a")
+            .join(collect(predictions, "b"), "image_id")
+            .select(explode(pairs))
+        )
+      }
+      benchmark.run()
+    }
+
+    groundTruth.unpersist()
+    predictions.unpersist()
+  }
+
+  override def afterAll(): Unit = spark.stop()
+}